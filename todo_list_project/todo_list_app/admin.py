@@ -1,6 +1,20 @@
 from django.contrib import admin
 from .models import ToDoList, ListItem, User
 
+# The bulk "delete selected" action deletes through the models, so the item counters,
+# the tombstones of the syncing clients and the cached dashboards stay up to date.
+class ToDoListAdmin(admin.ModelAdmin):
+
+    def delete_queryset(self, request, queryset):
+        for todo_list in queryset:
+            todo_list.delete()
+
+class ListItemAdmin(admin.ModelAdmin):
+
+    def delete_queryset(self, request, queryset):
+        for list_item in queryset.select_related('list'):
+            list_item.delete()
+
 # Register your models here.
-admin.site.register(ToDoList)
-admin.site.register(ListItem)
+admin.site.register(ToDoList, ToDoListAdmin)
+admin.site.register(ListItem, ListItemAdmin)
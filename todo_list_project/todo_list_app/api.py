@@ -0,0 +1,457 @@
+import codecs
+import json
+from functools import wraps
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+from .forms import AddListForm, AddListItemForm
+from .models import ListItem, ToDoList, Tombstone, UserRevision
+from .pagination import KeysetPage, parse_cursor
+from .search import search_items
+from .transfer import IMPORT_PARSERS, TRANSFER_FORMATS, ImportFileError, import_lists, stream_export
+
+# Pagination limits of the list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Maximum number of operations of a batch request
+MAX_BATCH_SIZE = 1000
+
+# Fields that can be selected through ?fields=, id is always returned since it is the pagination cursor
+LIST_FIELDS = ('id', 'name', 'item_count', 'completed_count', 'updated_at')
+ITEM_FIELDS = ('id', 'text', 'isCompleted', 'updated_at')
+
+# Fields of the rows returned by the sync endpoint
+SYNC_LIST_FIELDS = LIST_FIELDS + ('revision',)
+SYNC_ITEM_FIELDS = ('id', 'list_id') + ITEM_FIELDS[1:] + ('revision',)
+
+# Pagination limits of the sync endpoint, the lists, items and deletions of a page count together
+DEFAULT_SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 1000
+
+# Streams of the sync pages, in the order of the rows sharing a revision
+SYNC_STREAMS = ('lists', 'items', 'deleted')
+
+class ApiError(Exception):
+    """ An error reported to the API client as a JSON body with the given HTTP status. """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def api_view(view_func):
+    """
+    Brief: A decorator for the JSON API views.
+
+    Details: Anonymous requests are answered with 401 instead of being redirected to the
+             login page, and raised ApiErrors are turned into JSON error responses.
+
+    Args:
+        view_func: The decorated view.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': "Authentication required."}, status=401)
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': error.message}, status=error.status)
+
+    return wrapper
+
+def parse_json_body(request):
+    """ Returns the decoded JSON object sent in the body of the request. """
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ApiError("Malformed JSON body.")
+
+    if not isinstance(body, dict):
+        raise ApiError("The JSON body must be an object.")
+
+    return body
+
+def parse_page_params(request, allowed_fields):
+    """
+    Brief: Parses the keyset pagination and field selection query parameters.
+
+    Details: ?after=<id> is the cursor returned by the previous page, ?limit= the page size
+             (capped to MAX_PAGE_SIZE) and ?fields= a comma separated subset of the allowed fields.
+
+    Args:
+        request: The received request.
+        allowed_fields: The fields the client can select, all of them by default.
+    """
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ApiError("'after' and 'limit' must be integers.")
+
+    if after < 0 or limit < 1:
+        raise ApiError("'after' must be positive and 'limit' greater than zero.")
+
+    fields = allowed_fields
+    if request.GET.get('fields'):
+        fields = tuple(field.strip() for field in request.GET['fields'].split(','))
+        unknown_fields = set(fields) - set(allowed_fields)
+        if unknown_fields:
+            raise ApiError(f"Unknown fields: {', '.join(sorted(unknown_fields))}.")
+
+    # The cursor column is always selected
+    if 'id' not in fields:
+        fields = ('id',) + fields
+
+    return after, min(limit, MAX_PAGE_SIZE), fields
+
+def keyset_page(request, queryset, after, limit, fields):
+    """
+    Brief: Builds the JSON response of one keyset page of a queryset.
+
+    Details: See KeysetPage, the "next" URL repeats the query parameters of the request
+             with the cursor of the next page.
+
+    Args:
+        request: The received request.
+        queryset: The queryset to paginate.
+        after: Id of the last row of the previous page.
+        limit: The page size.
+        fields: The selected fields.
+    """
+    page = KeysetPage(queryset.values(*fields), after=after, limit=limit)
+
+    next_url = None
+    if page.has_next:
+        query = request.GET.copy()
+        query['after'] = page.next_cursor
+        next_url = f"{request.path}?{query.urlencode()}"
+
+    return JsonResponse({'results': page.rows, 'next_cursor': page.next_cursor, 'next': next_url})
+
+def parse_id_list(body, key):
+    """ Returns the list of integer ids sent under the given key of a batch request. """
+    ids = body.get(key, [])
+    if not isinstance(ids, list) or not all(isinstance(item_id, int) for item_id in ids):
+        raise ApiError(f"'{key}' must be a list of item ids.")
+    return ids
+
+def parse_batch_operations(body):
+    """
+    Brief: Validates the operations of a batch request.
+
+    Details: The body holds up to four keys: "create" (list of texts), "update" (list of
+             {"id", "text", "isCompleted"} objects), "toggle" and "delete" (lists of item ids).
+             The texts are validated with the AddListItemForm used by the dashboard.
+
+    Args:
+        body: The decoded JSON body of the request.
+    """
+    create = body.get('create', [])
+    update = body.get('update', [])
+    if not isinstance(create, list) or not isinstance(update, list):
+        raise ApiError("'create' and 'update' must be lists.")
+
+    operations = {
+        'create': [],
+        'update': [],
+        'toggle': parse_id_list(body, 'toggle'),
+        'delete': parse_id_list(body, 'delete'),
+    }
+
+    if len(create) + len(update) + len(operations['toggle']) + len(operations['delete']) > MAX_BATCH_SIZE:
+        raise ApiError(f"A batch is limited to {MAX_BATCH_SIZE} operations.")
+
+    for text in create:
+        add_list_item_form = AddListItemForm({'list_item_text': text})
+        if not add_list_item_form.is_valid():
+            raise ApiError(f"Invalid item text: {text!r}.")
+        operations['create'].append(add_list_item_form.cleaned_data.get('list_item_text'))
+
+    for change in update:
+        if not isinstance(change, dict) or not isinstance(change.get('id'), int):
+            raise ApiError("Every update must be an object with an integer 'id'.")
+
+        valid_change = {'id': change['id']}
+        if 'text' in change:
+            add_list_item_form = AddListItemForm({'list_item_text': change['text']})
+            if not add_list_item_form.is_valid():
+                raise ApiError(f"Invalid item text: {change['text']!r}.")
+            valid_change['text'] = add_list_item_form.cleaned_data.get('list_item_text')
+        if 'isCompleted' in change:
+            if not isinstance(change['isCompleted'], bool):
+                raise ApiError("'isCompleted' must be a boolean.")
+            valid_change['isCompleted'] = change['isCompleted']
+        operations['update'].append(valid_change)
+
+    return operations
+
+def get_owned_list(user, list_id):
+    """ Returns the list with the given id owned by the user, raises a 404 ApiError otherwise. """
+    try:
+        return ToDoList.objects.owned_by(user).only('id', 'user_id').get(id=list_id)
+    except ToDoList.DoesNotExist:
+        raise ApiError("List not found.", status=404)
+
+# Lists API View
+@api_view
+@require_http_methods(["GET", "POST"])
+def lists_view(request):
+    """
+    Brief: A JSON API view that lists and creates the To-Do lists of the logged in user.
+
+    Details: GET returns a keyset paginated page of the user's lists, POST creates a new
+             list from a {"name": ...} JSON body.
+
+    Args:
+        request: The received request.
+    """
+    if request.method == "POST":
+        add_list_form = AddListForm({'list_name': parse_json_body(request).get('name')})
+        if not add_list_form.is_valid():
+            return JsonResponse({'errors': add_list_form.errors}, status=400)
+
+        todo_list = ToDoList.objects.create(user=request.user, name=add_list_form.cleaned_data.get('list_name'))
+        return JsonResponse({'id': todo_list.id, 'name': todo_list.name, 'item_count': 0, 'completed_count': 0, 'updated_at': todo_list.updated_at}, status=201)
+
+    after, limit, fields = parse_page_params(request, LIST_FIELDS)
+
+    return keyset_page(request, ToDoList.objects.owned_by(request.user), after, limit, fields)
+
+# List Items API View
+@api_view
+@require_http_methods(["GET", "POST"])
+def list_items_view(request, list_id):
+    """
+    Brief: A JSON API view that lists and creates the items of a To-Do list.
+
+    Details: The list must be owned by the logged in user. GET returns a keyset paginated
+             page of the list's items (?completed=true|false filters on their status),
+             POST creates a new item from a {"text": ...} JSON body.
+
+    Args:
+        request: The received request.
+        list_id: Id of the To-Do list.
+    """
+    todo_list = get_owned_list(request.user, list_id)
+
+    if request.method == "POST":
+        add_list_item_form = AddListItemForm({'list_item_text': parse_json_body(request).get('text')})
+        if not add_list_item_form.is_valid():
+            return JsonResponse({'errors': add_list_item_form.errors}, status=400)
+
+        list_item = ListItem.objects.create(list=todo_list, text=add_list_item_form.cleaned_data.get('list_item_text'))
+        return JsonResponse({'id': list_item.id, 'text': list_item.text, 'isCompleted': list_item.isCompleted, 'updated_at': list_item.updated_at}, status=201)
+
+    after, limit, fields = parse_page_params(request, ITEM_FIELDS)
+
+    items = ListItem.objects.for_list(todo_list)
+    completed = request.GET.get('completed')
+    if completed is not None:
+        items = items.filter(isCompleted=completed.lower() in ('1', 'true'))
+
+    return keyset_page(request, items, after, limit, fields)
+
+# List Items Batch API View
+@api_view
+@require_http_methods(["POST"])
+def list_items_batch_view(request, list_id):
+    """
+    Brief: A JSON API view that applies many item mutations on a To-Do list at once.
+
+    Details: The creates, updates, toggles and deletes of the JSON body are applied in a
+             single transaction (see ListItemQuerySet.apply_batch). Returns the ids of the
+             created items and the number of updated, toggled and deleted items.
+
+    Args:
+        request: The received request.
+        list_id: Id of the To-Do list.
+    """
+    todo_list = get_owned_list(request.user, list_id)
+    operations = parse_batch_operations(parse_json_body(request))
+
+    return JsonResponse(ListItem.objects.apply_batch(todo_list, **operations))
+
+# Search API View
+@api_view
+@require_http_methods(["GET"])
+def search_view(request):
+    """
+    Brief: A JSON API view that searches the text of all the items of the logged in user.
+
+    Details: ?q= holds the searched words, the results are ranked by relevance and paginated
+             by page number (?page=, ?limit=), see search.search_items.
+
+    Args:
+        request: The received request.
+    """
+    query = request.GET.get('q', '')
+    if not query.strip():
+        raise ApiError("The 'q' parameter is required.")
+
+    try:
+        limit = min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError("'limit' must be an integer.")
+
+    search = search_items(request.user, query, page=parse_cursor(request.GET.get('page')) or 1, page_size=max(limit, 1))
+    results = [
+        {'id': list_item.id, 'list_id': list_item.list_id, 'list_name': list_item.list_name, 'text': list_item.text, 'isCompleted': list_item.isCompleted}
+        for list_item in search.results
+    ]
+
+    return JsonResponse({'results': results, 'page': search.page, 'next_page': search.next_page})
+
+def after_sync_cursor(queryset, rank, position):
+    """ Restricts the rows of a sync stream to those after a (revision, stream rank, id) position, in that order. """
+    revision, position_rank, row_id = position
+    after = Q(revision__gt=revision)
+    if rank > position_rank:
+        after |= Q(revision=revision)
+    elif rank == position_rank:
+        after |= Q(revision=revision, id__gt=row_id)
+    return queryset.filter(after).order_by('revision', 'id')
+
+def format_sync_cursor(full, floor, position):
+    """ Returns the next_cursor of a sync page: whether the sync is full, the revision its deletions start after and the position of its last row. """
+    return ".".join(str(value) for value in (int(full), floor, *position))
+
+def parse_sync_cursor(value):
+    """ Returns the full flag, the deletions floor and the (revision, stream rank, id) position of a sync next_cursor. """
+    try:
+        full, floor, revision, rank, row_id = (int(part) for part in value.split('.'))
+    except ValueError:
+        raise ApiError("Malformed 'after' cursor.")
+    return bool(full), floor, (revision, rank, row_id)
+
+# Sync API View
+@api_view
+@require_http_methods(["GET"])
+def sync_view(request):
+    """
+    Brief: A JSON API view returning the changes of the user's lists and items since a revision.
+
+    Details: ?since=<revision> is the "revision" returned by the previous sync. Only the lists
+             and items stamped with a newer revision are returned, with the ids of the lists and
+             items deleted since ("deleted"). The items of a deleted list are not listed, the
+             client drops them with their list. Without ?since=, or if the tombstones the client
+             needs have been pruned, every list and item is returned and "full" is true: the
+             client then replaces its local copy.
+             The changes are paginated in (revision, id) order, at most ?limit= rows (lists, items
+             and deletions together) per page: while "has_more" is true the client fetches the
+             next page with ?after=<next_cursor>, then keeps the "revision" of the last page. A row
+             changed or deleted between two pages gets a newer revision, so it is sent again in a
+             later page. Each page is read outside of any transaction, no write lock is held while
+             the rows are serialized.
+
+    Args:
+        request: The received request.
+    """
+    try:
+        limit = max(min(int(request.GET.get('limit', DEFAULT_SYNC_PAGE_SIZE)), MAX_SYNC_PAGE_SIZE), 1)
+    except ValueError:
+        raise ApiError("'limit' must be an integer.")
+
+    # The revisions are committed in order: every change up to this revision is visible to the queries below
+    revisions = UserRevision.objects.filter(user=request.user).values('revision', 'pruned_revision').first() or {'revision': 0, 'pruned_revision': 0}
+
+    if request.GET.get('after'):
+        full, floor, position = parse_sync_cursor(request.GET['after'])
+    else:
+        since = parse_cursor(request.GET.get('since'))
+        full = since == 0 or since < revisions['pruned_revision'] or since > revisions['revision']
+        # A full sync reports the deletions made while its pages are fetched, a delta sync those since the client's revision
+        floor = revisions['revision'] if full else since
+        position = (-1, 0, 0) if full else (since, len(SYNC_STREAMS), 0)
+
+    if floor < revisions['pruned_revision']:
+        raise ApiError("The deletions of this sync have been pruned, sync again without 'after'.", status=410)
+
+    streams = {
+        'lists': ToDoList.objects.owned_by(request.user).values(*SYNC_LIST_FIELDS),
+        'items': ListItem.objects.owned_by(request.user).values(*SYNC_ITEM_FIELDS),
+        'deleted': Tombstone.objects.filter(user=request.user, revision__gt=floor).values('id', 'kind', 'object_id', 'revision'),
+    }
+
+    # The first limit + 1 rows of every stream after the cursor, merged in (revision, stream, id) order
+    rows = sorted(
+        (row['revision'], rank, row['id'], row)
+        for rank, stream in enumerate(SYNC_STREAMS)
+        for row in after_sync_cursor(streams[stream], rank, position)[:limit + 1]
+    )
+    page = rows[:limit]
+
+    changes = {'revision': revisions['revision'], 'full': full, 'lists': [], 'items': [], 'deleted': {'lists': [], 'items': []}}
+    for _revision, rank, _row_id, row in page:
+        if SYNC_STREAMS[rank] == 'deleted':
+            changes['deleted']['lists' if row['kind'] == Tombstone.LIST else 'items'].append(row['object_id'])
+        else:
+            changes[SYNC_STREAMS[rank]].append(row)
+
+    changes['has_more'] = len(rows) > limit
+    changes['next_cursor'] = format_sync_cursor(full, floor, page[-1][:3]) if changes['has_more'] else None
+    return JsonResponse(changes)
+
+def parse_transfer_format(requested_format, file_name=''):
+    """ Returns the export/import format requested by the client, guessed from the file extension if not given. """
+    transfer_format = (requested_format or file_name.rpartition('.')[2]).lower()
+    if transfer_format not in TRANSFER_FORMATS:
+        raise ApiError(f"The format must be one of: {', '.join(TRANSFER_FORMATS)}.")
+    return transfer_format
+
+# Export API View
+@api_view
+@require_http_methods(["GET"])
+def export_view(request):
+    """
+    Brief: A JSON API view that downloads all the lists and items of the logged in user.
+
+    Details: ?format=csv|ndjson selects the format (see transfer.py). The response is
+             streamed while the rows are read from the database TRANSFER_CHUNK_SIZE at
+             a time, so its memory footprint does not depend on the number of items.
+
+    Args:
+        request: The received request.
+    """
+    export_format = parse_transfer_format(request.GET.get('format', 'csv'))
+
+    response = StreamingHttpResponse(
+        stream_export(request.user, export_format, settings.TRANSFER_CHUNK_SIZE),
+        content_type=f"{TRANSFER_FORMATS[export_format]}; charset=utf-8",
+    )
+    response['Content-Disposition'] = f'attachment; filename="todo_lists.{export_format}"'
+    return response
+
+# Import API View
+@api_view
+@require_http_methods(["POST"])
+def import_view(request):
+    """
+    Brief: A JSON API view that imports lists and items from an uploaded CSV or NDJSON file.
+
+    Details: The file is sent as the "file" field of a multipart body, its format is given by
+             the "format" field or its extension. The rows are parsed as a stream and inserted
+             TRANSFER_CHUNK_SIZE at a time, see transfer.import_lists. Returns the number of
+             imported lists and items, an invalid row is reported with its line and the number
+             of rows imported before it.
+
+    Args:
+        request: The received request.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        raise ApiError("A 'file' is required.")
+
+    import_format = parse_transfer_format(request.POST.get('format'), upload.name)
+    lines = codecs.iterdecode(upload, 'utf-8-sig')
+
+    try:
+        imported = import_lists(request.user, IMPORT_PARSERS[import_format](lines), settings.TRANSFER_CHUNK_SIZE)
+    except ImportFileError as error:
+        return JsonResponse({'error': str(error), 'imported': error.imported}, status=400)
+    except UnicodeDecodeError:
+        raise ApiError("The file must be encoded in UTF-8.")
+
+    return JsonResponse({'imported': imported}, status=201)
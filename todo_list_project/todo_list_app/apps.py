@@ -1,6 +1,33 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    """ Re-creates the full-text index triggers, which SQLite drops when a migration rebuilds the items table. """
+    from .search import install_fts_index
+    install_fts_index(connections[using])
 
 
 class TodoListAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'todo_list_app'
+
+    def ready(self):
+        # Connect the signal receivers, the live events are published after the fragments are invalidated
+        from . import signals  # noqa: F401
+        from . import events  # noqa: F401
+
+        # Pin the users whose data has changed to the primary database
+        from . import routers  # noqa: F401
+
+        # Keep the cached users in step with the database
+        from . import backends  # noqa: F401
+
+        # Count the queries of the measured requests
+        from . import metrics  # noqa: F401
+
+        # Register the handlers of the background jobs
+        from . import jobs  # noqa: F401
+
+        post_migrate.connect(install_search_index, sender=self)
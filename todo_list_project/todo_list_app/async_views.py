@@ -0,0 +1,204 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import alogin
+from django.contrib.auth.hashers import make_password
+from .forms import RegisterForm, LoginForm, HASHING_BUSY_MESSAGE
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.vary import vary_on_headers
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from .models import ToDoList
+from .dashboard_cache import get_fragment_cache_context, dashboard_etag
+from .pagination import parse_cursor
+from .search import search_items
+from .hashing import PasswordHashingBusy, get_hashing_pool
+from .database import retry_on_busy
+from .views import DASHBOARD_FRAGMENTS, event_stream_response, fragment_template, handle_dashboard_post, task_page_arguments
+from .events import adashboard_event_stream
+from .routers import reads_from_replica
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import Http404
+from django.shortcuts import redirect, render
+
+# Async versions of the page views, routed instead of the views of views.py when ASYNC_VIEWS is on.
+# They run on the event loop of the ASGI server: the queries go through the async ORM, the passwords
+# are hashed on the hashing pool (hashing.py) and the remaining blocking work (the forms posted to the
+# dashboard, handled by the handlers of views.py, and the template rendering) is handed to a worker thread.
+
+async def aconditional_response(request, list_id=None, task_id=None):
+    """
+    Brief: The async counterpart of the condition() decorator of the dashboard.
+
+    Details: Returns a 304 Not Modified response if the dashboard has not changed since the
+             client's copy, otherwise None and the ETag header to set on the response.
+             The dashboard version is read in a worker thread, the cache backend may be a database.
+
+    Args:
+        request: The received request, its user must be loaded.
+        list_id: Id of the selected list, None if no list is selected.
+        task_id: Id of the selected task, None if no task is selected.
+    """
+    res_etag = await sync_to_async(dashboard_etag)(request, list_id, task_id)
+    res_etag = quote_etag(res_etag) if res_etag is not None else None
+
+    headers = {}
+    if res_etag:
+        headers['ETag'] = res_etag
+
+    return get_conditional_response(request, etag=res_etag), headers
+
+# Login Page View
+async def login_view(request):
+    """
+    Brief: Async version of the view method that handles the login form.
+
+    Details: If the form from the POST request is valid the user is logged in and
+             re-directed to his dashboard. The password is verified on the hashing pool,
+             the event loop keeps serving the other requests meanwhile.
+
+    Args:
+        request: The received request.
+    """
+    if request.method == "POST":
+         login_form = LoginForm(request.POST)
+         if await login_form.ais_valid():
+
+            login_user = login_form.user
+            await alogin(request, login_user)
+
+            return redirect('dashboard')
+    else:
+        login_form = LoginForm()
+
+    context = {'form': login_form}
+    return await sync_to_async(render)(request, template_name='todo_list_app/login.html', context=context)
+
+# Register Page View
+async def register_view(request):
+    """
+    Brief: Async version of the view method that handles the register form.
+
+    Details: If the form from the POST request is valid it is registered in the
+             DB and the user is re-directed to the login page.
+
+    Args:
+        request: The received request.
+    """
+    if request.method == "POST":
+        register_form = RegisterForm(request.POST)
+        if await sync_to_async(register_form.is_valid)():
+
+            # After the form has been validated we can use the cleaned data
+            registered_user_name = register_form.cleaned_data.get('username')
+            registered_email = register_form.cleaned_data.get('email')
+            registered_password = register_form.cleaned_data.get('password')
+
+            # Create a new user in the DB, its password is hashed on the hashing pool
+            try:
+                encoded_password = await get_hashing_pool().arun(make_password, registered_password)
+            except PasswordHashingBusy:
+                register_form.add_error(None, HASHING_BUSY_MESSAGE)
+            else:
+                await User.objects.acreate(
+                    username=User.normalize_username(registered_user_name),
+                    email=User.objects.normalize_email(registered_email),
+                    password=encoded_password,
+                )
+                return redirect('login')
+    else:
+        register_form = RegisterForm()
+
+    context = {'form': register_form}
+    return await sync_to_async(render)(request, template_name='todo_list_app/register.html', context=context)
+
+# Dashboard Page View
+@login_required
+@cache_control(private=True, no_cache=True)
+@vary_on_headers('X-Requested-With')
+@retry_on_busy
+async def dashboard_view(request, list_id=None, task_id=None):
+    """
+    Brief: Async version of the view method that handles the dashboard view.
+
+    Details: Handles the same forms, with the same handlers (views.DASHBOARD_ACTIONS), and renders
+             the same pages as views.dashboard_view.
+             GET requests carrying a matching ETag are answered with 304 Not Modified without
+             loading the lists or rendering the template. The pages rendered from the read replica
+             are not cached, neither their fragments nor with an ETag.
+
+    Args:
+        request: The received request.
+        list_id: Id of the selected/current list, initially is none.
+        task_id: Id of the selected task, initially is none.
+    """
+    # Load the user once without blocking, the sync code called below reuses it
+    user = await request.auser()
+    request.user = user
+
+    # Context for the view
+    context = {
+        'add_list_form': None,
+        'add_list_item_form': None,
+        'live_updates': settings.DASHBOARD_LIVE_UPDATES,
+    }
+
+    # Handle the addition and the deletion of the lists and of the list items, with the handlers of the sync view
+    if request.method == "POST":
+        response = await sync_to_async(handle_dashboard_post)(request, list_id, task_id)
+        if response is not None:
+            return response
+
+    # Answer the unchanged GET requests with a 304 Not Modified
+    not_modified, validators = await aconditional_response(request, list_id, task_id)
+    if not_modified is not None:
+        for header, value in validators.items():
+            not_modified.headers.setdefault(header, value)
+        return not_modified
+
+    # Load the side-bar lists, the selected list and one page of its items (if a list_id is provided in the URL)
+    context.update(await ToDoList.objects.aload_dashboard(user, list_id=list_id, task_id=task_id, **task_page_arguments(request, list_id)))
+
+    # Search across all the tasks of the user (?q=<words>&page=<number>)
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        context['search_query'] = search_query
+        context['search'] = await sync_to_async(search_items)(user, search_query, page=parse_cursor(request.GET.get('page')), page_size=settings.DASHBOARD_SEARCH_PAGE_SIZE)
+
+    # The next pages of items and the refreshed fragments are fetched by dashboard.js, only render them
+    template_name = fragment_template(request, list_id)
+    if template_name == DASHBOARD_FRAGMENTS['sidebar']:
+        context['lists'] = [todo_list async for todo_list in context['lists']]
+    elif template_name:
+        await context['tasks'].afetch()
+    else:
+        # Keys of the cached side-bar and task list fragments, the querysets are not executed on a cache hit
+        context.update(await sync_to_async(get_fragment_cache_context)(request, store=not reads_from_replica()))
+        template_name = 'todo_list_app/dashboard.html'
+
+    # The side-bar and the items are lazy, they are only loaded by the template when their fragments miss the cache
+    response = await sync_to_async(render)(request, template_name=template_name, context=context)
+    # The pages rendered from the read replica may lag behind the version the ETag names
+    if request.method in ("GET", "HEAD") and not reads_from_replica():
+        for header, value in validators.items():
+            response.headers.setdefault(header, value)
+
+    return response
+
+# Dashboard Live Updates View
+@login_required
+async def dashboard_events_view(request):
+    """
+    Brief: Async version of the view method that streams the changes of the user's dashboard.
+
+    Details: The stream waits for the events on the event loop, so an open dashboard tab
+             does not hold a worker thread. Raises Http404 unless DASHBOARD_LIVE_UPDATES is on.
+
+    Args:
+        request: The received request.
+    """
+    if not settings.DASHBOARD_LIVE_UPDATES:
+        raise Http404("Live dashboard updates are disabled.")
+
+    user = await request.auser()
+    return event_stream_response(adashboard_event_stream(user.pk, request.headers.get('Last-Event-ID')))
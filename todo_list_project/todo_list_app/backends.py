@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .hashing import acheck_user_password, get_hashing_pool
+
+# Cached users: the logged in user of a request is read from the SESSION_CACHE_ALIAS cache for
+# AUTH_USER_CACHE_TIMEOUT seconds instead of the database. It is cached at login and dropped
+# whenever the user row is saved or deleted (e.g. a password change), 0 disables the cache.
+
+# Cache key of a logged in user
+USER_CACHE_KEY = "todo_list_app:user:{user_id}"
+
+def get_user_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id=user_id)
+
+@receiver(user_logged_in)
+def cache_logged_in_user(sender, request, user, **kwargs):
+    """ Caches the user that has just logged in, their first request does not read it again. """
+    if settings.AUTH_USER_CACHE_TIMEOUT:
+        get_user_cache().set(user_cache_key(user.pk), user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, instance, **kwargs):
+    """ Drops the cached copy of a saved or deleted user. """
+    get_user_cache().delete(user_cache_key(instance.pk))
+
+class PooledModelBackend(ModelBackend):
+    """ The default authentication backend, with an async path that does not hash on the event loop and cached users. """
+
+    def get_user(self, user_id):
+        """ Returns the active user with the given id, from the user cache when it holds it. """
+        if not settings.AUTH_USER_CACHE_TIMEOUT:
+            return super().get_user(user_id)
+
+        user = get_user_cache().get(user_cache_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                get_user_cache().set(user_cache_key(user_id), user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+    async def aget_user(self, user_id):
+        """ Async version of get_user. """
+        if not settings.AUTH_USER_CACHE_TIMEOUT:
+            return await super().aget_user(user_id)
+
+        user = await get_user_cache().aget(user_cache_key(user_id))
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await get_user_cache().aset(user_cache_key(user_id), user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        """
+        Brief: Authenticates a user from the async views.
+
+        Details: Same checks as ModelBackend.aauthenticate, but the password is verified
+                 on the hashing pool while the event loop keeps serving other requests.
+
+        Args:
+            request: The received request.
+            username: The entered username.
+            password: The entered password.
+        """
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway, so an unknown username takes as long as a wrong password
+            await get_hashing_pool().arun(UserModel().set_password, password)
+            return None
+
+        if await acheck_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+
+        return None
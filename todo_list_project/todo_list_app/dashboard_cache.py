@@ -0,0 +1,97 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.middleware.csrf import get_token
+
+# Cache keys
+VERSION_KEY = "todo_list_app:dashboard_version:{user_id}"
+
+def get_dashboard_cache():
+    """ Returns the cache backend storing the dashboard fragments and versions. """
+    return caches[settings.DASHBOARD_CACHE_ALIAS]
+
+def get_dashboard_version(user_id):
+    """
+    Brief: Returns the current version stamp of a user's dashboard.
+
+    Details: The version is a nanoseconds timestamp. If it is missing (first visit or evicted)
+             a fresh one is stored, so fragments cached under an older version are never reused.
+
+    Args:
+        user_id: Id of the user owning the dashboard.
+    """
+    dashboard_cache = get_dashboard_cache()
+    key = VERSION_KEY.format(user_id=user_id)
+
+    version = dashboard_cache.get(key)
+    if version is None:
+        dashboard_cache.add(key, time.time_ns(), timeout=None)
+        version = dashboard_cache.get(key)
+
+    return version
+
+def bump_dashboard_version(user_id):
+    """
+    Brief: Moves a user's dashboard to a new version stamp.
+
+    Details: Every fragment cached under the previous version becomes unreachable and is
+             evicted by the cache backend (timeout or culling).
+
+    Args:
+        user_id: Id of the user owning the dashboard.
+    """
+    get_dashboard_cache().set(VERSION_KEY.format(user_id=user_id), time.time_ns(), timeout=None)
+
+def dashboard_etag(request, list_id=None, task_id=None):
+    """
+    Brief: Computes the ETag of a dashboard page, without querying the lists and items.
+
+    Details: The ETag varies on everything the rendered page depends on: the user, the dashboard
+             version, the selected list and task, the query string (page of items, search) and
+             whether only the items are rendered, and the CSRF secret embedded in the page forms.
+             Returns None for unsafe methods and anonymous users, so they are never answered by a 304.
+
+    Args:
+        request: The received request.
+        list_id: Id of the selected list, None if no list is selected.
+        task_id: Id of the selected task, None if no task is selected.
+    """
+    if request.method not in ("GET", "HEAD") or not request.user.is_authenticated:
+        return None
+
+    user = request.user
+
+    get_token(request)
+    csrf_secret = request.META.get('CSRF_COOKIE', '')
+
+    page = f"{list_id}:{task_id}:{request.GET.urlencode()}:{request.headers.get('X-Requested-With', '')}"
+    page_state = f"{user.pk}:{user.date_joined.timestamp()}:{get_dashboard_version(user.pk)}:{page}:{csrf_secret}"
+    return hashlib.sha256(page_state.encode()).hexdigest()
+
+def get_fragment_cache_context(request, store=True):
+    """
+    Brief: Builds the template context used to key the dashboard fragments.
+
+    Details: The key varies on the user (and the date it joined, so a re-used primary key never
+             matches stale fragments), the dashboard version and the CSRF secret, since the
+             cached forms embed a CSRF token that must stay valid for the requesting browser.
+             With store off, the fragments are still read from the cache but the ones rendered
+             are not stored (a timeout of 0).
+
+    Args:
+        request: The received request.
+        store: Whether the fragments rendered for this request are stored in the cache.
+    """
+    user = request.user
+
+    # Make sure the CSRF secret of the request exists before reading it
+    get_token(request)
+    csrf_secret = request.META.get('CSRF_COOKIE', '')
+
+    return {
+        'fragment_cache_alias': settings.DASHBOARD_CACHE_ALIAS,
+        'fragment_cache_timeout': settings.DASHBOARD_CACHE_TIMEOUT if store else 0,
+        'fragment_cache_user': f"{user.pk}:{user.date_joined.timestamp()}:{get_dashboard_version(user.pk)}",
+        'fragment_cache_csrf': csrf_secret,
+    }
@@ -0,0 +1,103 @@
+import asyncio
+import random
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+# Writes to SQLite are serialized: a writer that cannot get the lock within busy_timeout fails with
+# "database is locked". The write transactions of the dashboard forms failing that way are retried
+# after a short backoff (atomic_with_retry), and so are the whole read-only dashboard requests (retry_on_busy).
+
+# Methods of the requests retry_on_busy runs again, they do not write
+SAFE_METHODS = ('GET', 'HEAD')
+
+def is_database_locked(error):
+    """ Whether a database error has been raised because another connection holds the lock. """
+    message = str(error)
+    return 'database is locked' in message or 'database table is locked' in message
+
+def busy_retry_delay(attempt):
+    """ Returns the seconds to wait before retrying a locked request, doubled at each attempt, with jitter. """
+    return settings.DATABASE_BUSY_RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+
+def in_atomic_block():
+    """ Whether a connection to any database is inside an atomic block, whose transaction cannot be retried alone. """
+    return any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+
+def can_retry(error, attempt):
+    """ Whether the work that failed with error on its attempt-th try can be run again. """
+    return is_database_locked(error) and attempt < settings.DATABASE_BUSY_RETRIES and not in_atomic_block()
+
+def atomic_with_retry(write, using=DEFAULT_DB_ALIAS):
+    """
+    Brief: Runs a write in a transaction, run again when the database was locked, and returns its result.
+
+    Details: The transaction is retried up to DATABASE_BUSY_RETRIES times, with an exponential backoff.
+             Only a transaction that did not commit is retried: a lock error raised by the on_commit
+             callbacks, or after this function returned (rendering the response), never repeats the
+             write. Inside an enclosing atomic block (ATOMIC_REQUESTS, tests) write() joins it and is
+             not retried, the enclosing transaction would have to be retried instead.
+
+    Args:
+        write: Function doing the reads and the writes of the transaction, called without arguments.
+        using: Alias of the written database.
+    """
+    if in_atomic_block():
+        return write()
+
+    attempt = 0
+    while True:
+        committed = []
+        try:
+            with transaction.atomic(using=using):
+                # Registered first, so it runs before the other callbacks once the transaction has committed
+                transaction.on_commit(lambda: committed.append(True), using=using)
+                return write()
+        except OperationalError as error:
+            if committed or not can_retry(error, attempt):
+                raise
+        time.sleep(busy_retry_delay(attempt))
+        attempt += 1
+
+def retry_on_busy(view_func):
+    """
+    Brief: A decorator re-running a read-only request that failed because the database was locked.
+
+    Details: The GET and HEAD requests are run again up to DATABASE_BUSY_RETRIES times, with an
+             exponential backoff. The other requests are never run again whole: a lock error can
+             happen after their write has committed, they retry their write transaction with
+             atomic_with_retry instead.
+
+    Args:
+        view_func: The decorated view, sync or async.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            attempt = 0
+            while True:
+                try:
+                    return await view_func(request, *args, **kwargs)
+                except OperationalError as error:
+                    if request.method not in SAFE_METHODS or not can_retry(error, attempt):
+                        raise
+                await asyncio.sleep(busy_retry_delay(attempt))
+                attempt += 1
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return view_func(request, *args, **kwargs)
+            except OperationalError as error:
+                if request.method not in SAFE_METHODS or not can_retry(error, attempt):
+                    raise
+            time.sleep(busy_retry_delay(attempt))
+            attempt += 1
+
+    return wrapper
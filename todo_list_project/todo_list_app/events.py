@@ -0,0 +1,208 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .dashboard_cache import get_dashboard_version
+from .signals import dashboard_changed
+
+# Live dashboard updates: every committed change of a user's lists or items is published to the
+# Server-Sent Events streams the user has open (one per tab or device). The events only tell what
+# has changed, dashboard.js then fetches the changed fragments (side-bar, task list) again.
+
+class Subscription:
+    """ The queue of events of one stream, read by a sync (WSGI) view.
+
+    Attributes:
+        user_id(int): Id of the user the stream belongs to.
+        overflowed(bool): Whether events have been dropped because the stream reads too slowly.
+    """
+
+    def __init__(self, user_id, max_queued):
+        self.user_id = user_id
+        self.overflowed = False
+        self.events = queue.Queue(maxsize=max_queued)
+
+    def put(self, event):
+        """ Queues an event, from any thread. A full queue drops it and asks the client to resync. """
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def resync_event(self):
+        self.overflowed = False
+        return {'list_id': None}
+
+    def get(self, timeout):
+        """ Returns the next event, or None if none has been published within timeout seconds. """
+        if self.overflowed:
+            return self.resync_event()
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class AsyncSubscription(Subscription):
+    """ The queue of events of one stream, read by an async (ASGI) view on its event loop. """
+
+    def __init__(self, user_id, max_queued):
+        super().__init__(user_id, max_queued)
+        self.loop = asyncio.get_running_loop()
+        self.events = asyncio.Queue(maxsize=max_queued)
+
+    def put(self, event):
+        """ Queues an event, from any thread, on the event loop of the stream. """
+        def put_in_loop():
+            try:
+                self.events.put_nowait(event)
+            except asyncio.QueueFull:
+                self.overflowed = True
+
+        try:
+            self.loop.call_soon_threadsafe(put_in_loop)
+        except RuntimeError:
+            # The event loop of the stream is closed, the stream is being torn down
+            pass
+
+    async def aget(self, timeout):
+        """ Returns the next event, or None if none has been published within timeout seconds. """
+        if self.overflowed:
+            return self.resync_event()
+        try:
+            return await asyncio.wait_for(self.events.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class InProcessBroker:
+    """ Publishes the dashboard events to the streams opened in the same process.
+
+    With several worker processes a stream only receives the changes made through its own
+    process; a broker backed by a shared pub/sub (e.g. Redis) can replace it through the
+    DASHBOARD_EVENTS_BROKER setting by implementing the same three methods.
+
+    Attributes:
+        max_queued(int): Maximum number of events queued per stream.
+    """
+
+    def __init__(self, max_queued=100):
+        self.max_queued = max_queued
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def subscribe(self, user_id, asynchronous=False):
+        """ Opens a subscription to the events of a user, AsyncSubscription must be created in the stream's event loop. """
+        subscription_class = AsyncSubscription if asynchronous else Subscription
+        subscription = subscription_class(user_id, self.max_queued)
+        with self.lock:
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            user_subscriptions = self.subscriptions.get(subscription.user_id, set())
+            user_subscriptions.discard(subscription)
+            if not user_subscriptions:
+                self.subscriptions.pop(subscription.user_id, None)
+
+    def publish(self, user_id, event):
+        """ Delivers an event to every open stream of a user. """
+        with self.lock:
+            user_subscriptions = list(self.subscriptions.get(user_id, ()))
+        for subscription in user_subscriptions:
+            subscription.put(event)
+
+event_broker = None
+event_broker_lock = threading.Lock()
+
+def get_event_broker():
+    """ Returns the broker of the process, created on first use from the DASHBOARD_EVENTS_BROKER setting. """
+    global event_broker
+    with event_broker_lock:
+        if event_broker is None:
+            event_broker = import_string(settings.DASHBOARD_EVENTS_BROKER)(max_queued=settings.DASHBOARD_EVENTS_MAX_QUEUED)
+        return event_broker
+
+@receiver(setting_changed)
+def reset_event_broker(*, setting, **kwargs):
+    """ Re-creates the broker when its settings are overridden (tests). """
+    global event_broker
+    if setting in ('DASHBOARD_EVENTS_BROKER', 'DASHBOARD_EVENTS_MAX_QUEUED'):
+        with event_broker_lock:
+            event_broker = None
+
+@receiver(dashboard_changed)
+def publish_dashboard_event(sender, user_id, list_id=None, **kwargs):
+    """
+    Brief: Publishes a committed dashboard change to the user's open streams.
+
+    Details: Connected after invalidate_dashboard_fragments (apps.py imports this module after
+             signals.py), so the version sent as the event id is the bumped one.
+
+    Args:
+        sender: The model class that has changed.
+        user_id: Id of the user owning the changed data.
+        list_id: Id of the changed list, None if unknown.
+    """
+    get_event_broker().publish(user_id, {'list_id': list_id, 'version': get_dashboard_version(user_id)})
+
+def format_event(event):
+    """ Formats an event as a Server-Sent Events message, its id is the dashboard version. """
+    data = json.dumps({'list_id': event.get('list_id')})
+    if event.get('version'):
+        return f"id: {event['version']}\nevent: dashboard\ndata: {data}\n\n"
+    return f"event: dashboard\ndata: {data}\n\n"
+
+def missed_events(last_event_id, version):
+    """ Returns the resync event to send to a reconnecting client that missed changes, if any. """
+    if last_event_id is not None and last_event_id != str(version):
+        return [{'list_id': None, 'version': version}]
+    return []
+
+def dashboard_event_stream(user_id, last_event_id=None):
+    """
+    Brief: Generates the Server-Sent Events stream of a user's dashboard, for the sync views.
+
+    Details: A comment is sent every DASHBOARD_EVENTS_HEARTBEAT seconds to keep proxies from
+             closing the connection. The stream ends after DASHBOARD_EVENTS_MAX_SECONDS so a
+             WSGI worker thread is not held forever, the browser re-connects by itself and
+             sends the id of the last event it received.
+
+    Args:
+        user_id: Id of the user whose dashboard is streamed.
+        last_event_id: The Last-Event-ID header of a re-connecting client.
+    """
+    broker = get_event_broker()
+    subscription = broker.subscribe(user_id)
+    try:
+        yield f"retry: {settings.DASHBOARD_EVENTS_RETRY_MS}\n\n"
+        for event in missed_events(last_event_id, get_dashboard_version(user_id)):
+            yield format_event(event)
+
+        deadline = time.monotonic() + settings.DASHBOARD_EVENTS_MAX_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            event = subscription.get(timeout=min(settings.DASHBOARD_EVENTS_HEARTBEAT, remaining))
+            yield format_event(event) if event else ": keep-alive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+async def adashboard_event_stream(user_id, last_event_id=None):
+    """ Async version of dashboard_event_stream, waits for the events on the event loop. """
+    broker = get_event_broker()
+    subscription = broker.subscribe(user_id, asynchronous=True)
+    try:
+        yield f"retry: {settings.DASHBOARD_EVENTS_RETRY_MS}\n\n"
+        for event in missed_events(last_event_id, await sync_to_async(get_dashboard_version)(user_id)):
+            yield format_event(event)
+
+        deadline = time.monotonic() + settings.DASHBOARD_EVENTS_MAX_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            event = await subscription.aget(timeout=min(settings.DASHBOARD_EVENTS_HEARTBEAT, remaining))
+            yield format_event(event) if event else ": keep-alive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
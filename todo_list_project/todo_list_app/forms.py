@@ -1,6 +1,10 @@
 from django import forms 
-from django.contrib.auth import authenticate
+from django.contrib.auth import aauthenticate, authenticate
 from django.contrib.auth.models import User
+from .hashing import PasswordHashingBusy
+
+# Error shown when the password hashing queue is full
+HASHING_BUSY_MESSAGE = " Too many people are logging in right now, please try again in a moment. "
 
 class RegisterForm(forms.Form): 
     """ Represents a Registeration Form with username, email, password, confirm_password 
@@ -87,6 +91,12 @@ class LoginForm(forms.Form):
     username = forms.CharField(max_length=64)
     password = forms.CharField(widget= forms.PasswordInput)
 
+    # Set by ais_valid, which authenticates after the fields have been validated
+    skip_authentication = False
+
+    # Whether the login was refused because the hashing queue was full
+    hashing_busy = False
+
     def clean(self): 
         """
         Brief: A method that validate and authenticates a user's login.
@@ -103,11 +113,15 @@ class LoginForm(forms.Form):
         password = cleaned_data.get("password")
 
         # Check if username and password were provided
-        if not username or not password: 
+        if not username or not password or self.skip_authentication:
             return cleaned_data
 
-        # Authenticate User 
-        user = authenticate(username= username, password=password )
+        # Authenticate User, the password is hashed on the hashing pool
+        try:
+            user = authenticate(username= username, password=password )
+        except PasswordHashingBusy:
+            self.hashing_busy = True
+            raise forms.ValidationError(HASHING_BUSY_MESSAGE)
 
         # If authenticate returns nothing then it could not authenticate 
         if user is None:
@@ -118,6 +132,38 @@ class LoginForm(forms.Form):
 
         return cleaned_data
 
+    async def ais_valid(self):
+        """
+        Brief: Async version of is_valid, used by the async login view.
+
+        Details: The fields are validated first, then the user is authenticated with
+                 aauthenticate, so the password is hashed without blocking the event loop.
+
+        Args:
+            self
+        """
+        self.skip_authentication = True
+        try:
+            if not self.is_valid():
+                return False
+        finally:
+            self.skip_authentication = False
+
+        try:
+            user = await aauthenticate(username= self.cleaned_data.get("username"), password= self.cleaned_data.get("password"))
+        except PasswordHashingBusy:
+            self.hashing_busy = True
+            self.add_error(None, HASHING_BUSY_MESSAGE)
+            return False
+
+        if user is None:
+            self.add_error(None, " Wrong username or password! ")
+            return False
+
+        self.user = user
+
+        return True
+
 class AddListForm(forms.Form):
     """ Represents an AddList form with a list name.
     
@@ -140,3 +186,28 @@ class AddListItemForm(forms.Form):
  
 
 
+class BatchTasksForm(forms.Form):
+    """ Represents a BatchTasks form applying an action to the tasks selected in the multi-select mode.
+
+    Attributes:
+        batch_action(ChoiceField): The action applied to every selected task (toggle or delete).
+        task_ids(Field): The ids of the selected tasks.
+    """
+    batch_action = forms.ChoiceField(choices=[('toggle', "Toggle"), ('delete', "Delete")])
+    task_ids = forms.Field(widget=forms.MultipleHiddenInput)
+
+    def clean_task_ids(self):
+        """
+        Brief: A method that validates the task_ids field.
+
+        Details: The method validates that every selected task id is an integer.
+
+        Args:
+            self
+        """
+        task_ids = self.cleaned_data.get("task_ids")
+
+        try:
+            return [int(task_id) for task_id in task_ids]
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid task selection!")
@@ -0,0 +1,231 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, PBKDF2SHA1PasswordHasher, ScryptPasswordHasher,
+    make_password, verify_password,
+)
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Password hashing is CPU bound and slow on purpose. It runs on a small bounded pool of threads
+# (hashlib and argon2 release the GIL while hashing), so a burst of logins can only occupy a fixed
+# number of cores and the requests queued past a limit are rejected instead of piling up.
+# Only the async views (ASGI) are freed while a hash is computed. A sync view (WSGI) still waits
+# for the hash in its request thread, the pool then only bounds the parallel hashes and adds a
+# thread hand-off to each of them.
+
+class PasswordHashingBusy(Exception):
+    """ Raised when the hashing queue is full, the request should be retried later. """
+
+class HashingMetrics:
+    """ Counters of the hashing pool of the process.
+
+    Attributes:
+        completed(int): Number of hashes computed.
+        rejected(int): Number of hashes refused because the queue was full.
+        pending(int): Number of hashes queued or running.
+        wait_seconds(float): Total time the hashes waited for a free worker.
+        hash_seconds(float): Total time spent hashing.
+        max_latency_seconds(float): Longest wait + hashing time of a single hash.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.pending = 0
+        self.wait_seconds = 0.0
+        self.hash_seconds = 0.0
+        self.max_latency_seconds = 0.0
+
+    def record(self, wait_seconds, hash_seconds):
+        with self.lock:
+            self.completed += 1
+            self.wait_seconds += wait_seconds
+            self.hash_seconds += hash_seconds
+            self.max_latency_seconds = max(self.max_latency_seconds, wait_seconds + hash_seconds)
+
+    def snapshot(self):
+        """ Returns a consistent copy of the counters, with the average latency. """
+        with self.lock:
+            return {
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'pending': self.pending,
+                'wait_seconds': self.wait_seconds,
+                'hash_seconds': self.hash_seconds,
+                'avg_latency_seconds': (self.wait_seconds + self.hash_seconds) / self.completed if self.completed else 0.0,
+                'max_latency_seconds': self.max_latency_seconds,
+            }
+
+class PasswordHashingPool:
+    """ A bounded pool of threads computing the password hashes.
+
+    Attributes:
+        max_workers(int): Number of hashes computed in parallel.
+        max_pending(int): Maximum number of hashes queued or running, more are rejected.
+        metrics(HashingMetrics): Latency and queue counters of the pool.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.metrics = HashingMetrics()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hashing")
+        self.worker_state = threading.local()
+
+    def in_worker(self):
+        """ Whether the current thread is a worker of the pool. """
+        return getattr(self.worker_state, 'active', False)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Brief: Queues a hashing function on the pool and returns its Future.
+
+        Details: Raises PasswordHashingBusy without queueing it if max_pending hashes
+                 are already queued or running.
+
+        Args:
+            func: The function computing the hash.
+            args, kwargs: Arguments of func.
+        """
+        with self.metrics.lock:
+            if self.metrics.pending >= self.max_pending:
+                self.metrics.rejected += 1
+                raise PasswordHashingBusy("Too many passwords are being hashed, retry later.")
+            self.metrics.pending += 1
+
+        queued_at = time.perf_counter()
+
+        def run():
+            started_at = time.perf_counter()
+            self.worker_state.active = True
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.worker_state.active = False
+                self.metrics.record(started_at - queued_at, time.perf_counter() - started_at)
+                with self.metrics.lock:
+                    self.metrics.pending -= 1
+
+        try:
+            return self.executor.submit(run)
+        except RuntimeError:
+            with self.metrics.lock:
+                self.metrics.pending -= 1
+            raise
+
+    def run(self, func, *args, **kwargs):
+        """ Computes a hash on the pool and blocks the calling thread until it is done, inline when already called from a worker. """
+        if self.in_worker():
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    async def arun(self, func, *args, **kwargs):
+        """ Computes a hash on the pool without blocking the event loop. """
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+hashing_pool = None
+hashing_pool_lock = threading.Lock()
+
+def get_hashing_pool():
+    """ Returns the hashing pool of the process, created on first use from the PASSWORD_HASHING_* settings. """
+    global hashing_pool
+    with hashing_pool_lock:
+        if hashing_pool is None:
+            hashing_pool = PasswordHashingPool(settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_MAX_PENDING)
+        return hashing_pool
+
+@receiver(setting_changed)
+def reset_hashing_pool(*, setting, **kwargs):
+    """ Re-creates the pool with the new sizes when the settings are overridden (tests). """
+    global hashing_pool
+    if setting in ('PASSWORD_HASHING_WORKERS', 'PASSWORD_HASHING_MAX_PENDING'):
+        with hashing_pool_lock:
+            if hashing_pool is not None:
+                hashing_pool.shutdown()
+            hashing_pool = None
+
+def hasher_parameters(profile):
+    """ Returns the configured cost parameters of a hasher profile ('pbkdf2', 'scrypt', 'argon2'). """
+    return settings.PASSWORD_HASHER_PARAMETERS.get(profile, {})
+
+async def acheck_user_password(user, raw_password):
+    """
+    Brief: Async version of User.check_password, hashing on the pool.
+
+    Details: Django's acheck_password verifies the password on the event loop. The hash
+             is computed on the pool instead, and the stored hash is upgraded when the
+             hasher profile or its cost parameters have changed.
+
+    Args:
+        user: The user whose password is checked.
+        raw_password: The password entered by the user.
+    """
+    pool = get_hashing_pool()
+    is_correct, must_update = await pool.arun(verify_password, raw_password, user.password)
+
+    if is_correct and must_update:
+        user.password = await pool.arun(make_password, raw_password)
+        await user.asave(update_fields=['password'])
+
+    return is_correct
+
+class PooledHasherMixin:
+    """ Runs the encode and verify methods of a password hasher on the hashing pool. """
+
+    def encode(self, password, salt, *args, **kwargs):
+        return get_hashing_pool().run(super().encode, password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        return get_hashing_pool().run(super().verify, password, encoded)
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    """ PBKDF2-SHA256 with the iterations of the 'pbkdf2' profile. """
+
+    @property
+    def iterations(self):
+        return hasher_parameters('pbkdf2').get('iterations', PBKDF2PasswordHasher.iterations)
+
+class PooledPBKDF2SHA1PasswordHasher(PooledHasherMixin, PBKDF2SHA1PasswordHasher):
+    """ PBKDF2-SHA1, only kept to verify and upgrade old hashes. """
+
+class PooledScryptPasswordHasher(PooledHasherMixin, ScryptPasswordHasher):
+    """ scrypt with the work factor, block size and parallelism of the 'scrypt' profile. """
+
+    @property
+    def work_factor(self):
+        return hasher_parameters('scrypt').get('work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return hasher_parameters('scrypt').get('block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return hasher_parameters('scrypt').get('parallelism', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        return hasher_parameters('scrypt').get('maxmem', ScryptPasswordHasher.maxmem)
+
+class PooledArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    """ Argon2id with the time cost, memory cost and parallelism of the 'argon2' profile (requires argon2-cffi). """
+
+    @property
+    def time_cost(self):
+        return hasher_parameters('argon2').get('time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return hasher_parameters('argon2').get('memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return hasher_parameters('argon2').get('parallelism', Argon2PasswordHasher.parallelism)
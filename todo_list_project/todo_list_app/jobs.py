@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from .models import Job, ListItem, ToDoList
+
+# Background jobs: slow work is queued as Job rows by the requests and run later by a worker
+# (manage.py runworker, or manage.py purge_deleted_lists for the purges only). A job's kind
+# names the handler registered below with job_handler.
+
+logger = logging.getLogger(__name__)
+
+# Handlers of the job kinds
+JOB_HANDLERS = {}
+
+def job_handler(kind):
+    """ Registers the decorated function as the handler of a job kind, it receives the job's payload as keyword arguments. """
+    def register(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+
+    return register
+
+def enqueue(kind, run_after=None, max_attempts=5, **payload):
+    """
+    Brief: Queues a job of a registered kind.
+
+    Details: The job is committed with the current transaction and run once a worker
+             claims it. The payload must be JSON serializable.
+
+    Args:
+        kind: The kind of the job, see job_handler.
+        run_after: The job is not run before this date, as soon as possible by default.
+        max_attempts: Number of attempts after which a failing job is given up.
+        payload: Keyword arguments passed to the handler.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind!r}.")
+    return Job.objects.enqueue(kind, run_after=run_after, max_attempts=max_attempts, **payload)
+
+def retry_delay(attempts):
+    """ Returns the seconds before the retry of a job that has failed attempts times (exponential backoff). """
+    return min(settings.JOBS_RETRY_DELAY * 2 ** max(attempts - 1, 0), settings.JOBS_MAX_RETRY_DELAY)
+
+def run_job(job):
+    """
+    Brief: Runs a claimed job with its handler and records the outcome.
+
+    Details: A job whose handler raises is queued again after retry_delay(attempts) seconds,
+             until it has been attempted max_attempts times. Returns whether it succeeded.
+
+    Args:
+        job: The job, claimed by the calling worker.
+    """
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler for the job kind {job.kind!r}.")
+        handler(**job.payload)
+    except Exception as error:
+        logger.exception("Job %s (%s) failed on attempt %s.", job.pk, job.kind, job.attempts)
+        job.fail(error, retry_delay=retry_delay(job.attempts))
+        return False
+
+    job.complete()
+    return True
+
+def run_pending_jobs(kinds=None, limit=None):
+    """
+    Brief: Claims and runs the due jobs one at a time in the calling thread, until none is left or limit jobs have run.
+
+    Details: Returns the number of jobs run. Only the jobs of the given kinds are claimed if
+             kinds is given.
+
+    Args:
+        kinds: The kinds of the jobs to run, all of them by default.
+        limit: The maximum number of jobs to run, no limit by default.
+    """
+    queue = Job.objects.filter(kind__in=kinds) if kinds else Job.objects.all()
+    ran = 0
+    while limit is None or ran < limit:
+        jobs = queue.claim(limit=1, lock_seconds=settings.JOBS_LOCK_SECONDS)
+        if not jobs:
+            break
+        run_job(jobs[0])
+        ran += 1
+
+    return ran
+
+class Worker:
+    """ Runs the queued jobs on a pool of threads until it is stopped, see manage.py runworker.
+
+    Attributes:
+        concurrency(int): Number of jobs run in parallel, each in its own thread and database connection.
+        batch_size(int): Maximum number of jobs claimed per query.
+        lock_seconds(int): How long the claimed jobs stay invisible to the other workers, extended while they run.
+        poll_interval(float): Seconds between two polls of an empty queue.
+        kinds(tuple): Kinds of the jobs run by the worker, all of them if empty.
+        stats(Counter): Number of jobs that have succeeded and failed.
+    """
+
+    def __init__(self, concurrency=1, batch_size=10, lock_seconds=300, poll_interval=1.0, kinds=()):
+        self.concurrency = max(concurrency, 1)
+        self.batch_size = max(batch_size, 1)
+        self.lock_seconds = lock_seconds
+        self.poll_interval = poll_interval
+        self.kinds = tuple(kinds)
+        self.stats = Counter()
+        self.stopping = threading.Event()
+
+    def stop(self):
+        """ Asks the worker to stop claiming jobs, the running ones are finished first. Can be called from a signal handler. """
+        self.stopping.set()
+
+    def queue(self):
+        return Job.objects.filter(kind__in=self.kinds) if self.kinds else Job.objects.all()
+
+    def execute(self, job):
+        """ Runs a job in a thread of the pool, with its own database connection. """
+        close_old_connections()
+        try:
+            return run_job(job)
+        finally:
+            connection.close()
+
+    def run(self, burst=False, max_jobs=None):
+        """
+        Brief: Claims and runs jobs until stop() is called.
+
+        Details: Up to batch_size due jobs are claimed with one query whenever the previous
+                 batch has been handed to the pool, the claimed jobs wait in the worker until a
+                 thread is free. Every lock_seconds / 3 the locks of the claimed and running jobs
+                 are extended with one UPDATE, so a long job is not claimed again by another
+                 worker while the job of a dead worker is after lock_seconds. When stopped, the
+                 claimed jobs not started yet are put back in the queue. Returns stats.
+
+        Args:
+            burst: Return as soon as the queue is empty instead of polling it.
+            max_jobs: Return after claiming this many jobs, no limit by default.
+        """
+        claimed_jobs = deque()
+        running = {}
+        claimed = 0
+        heartbeat_interval = self.lock_seconds / 3
+        last_heartbeat = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job-worker") as executor:
+            try:
+                while not self.stopping.is_set():
+                    can_claim = max_jobs is None or claimed < max_jobs
+                    if not claimed_jobs and can_claim:
+                        limit = self.batch_size if max_jobs is None else min(self.batch_size, max_jobs - claimed)
+                        claimed_jobs.extend(self.queue().claim(limit=limit, lock_seconds=self.lock_seconds))
+                        claimed += len(claimed_jobs)
+
+                    while claimed_jobs and len(running) < self.concurrency:
+                        job = claimed_jobs.popleft()
+                        running[executor.submit(self.execute, job)] = job
+
+                    if not running:
+                        if burst or not can_claim:
+                            break
+                        self.stopping.wait(self.poll_interval)
+                        continue
+
+                    done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        running.pop(future)
+                        self.stats['succeeded' if future.result() else 'failed'] += 1
+
+                    if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                        locked_jobs = [*claimed_jobs, *running.values()]
+                        Job.objects.filter(lock_token__in={job.lock_token for job in locked_jobs}).extend_locks(self.lock_seconds)
+                        last_heartbeat = time.monotonic()
+            finally:
+                if claimed_jobs:
+                    Job.objects.filter(pk__in=[job.pk for job in claimed_jobs]).release()
+                for future in wait(running).done:
+                    self.stats['succeeded' if future.result() else 'failed'] += 1
+
+        return self.stats
+
+@job_handler('purge_list')
+def purge_list(list_id):
+    """
+    Brief: Deletes a soft-deleted To-Do list and its items.
+
+    Details: The items are deleted PURGE_BATCH_SIZE at a time, each batch in its own short
+             transaction, so the purge of a big list never blocks the requests' writes for
+             long. The list row is deleted last. A list that has not been soft-deleted is kept.
+
+    Args:
+        list_id: Id of the soft-deleted list.
+    """
+    if not ToDoList.objects.filter(pk=list_id, deleted_at__isnull=False).exists():
+        return
+
+    while True:
+        with transaction.atomic():
+            item_ids = list(ListItem.objects.for_list(list_id).order_by('id').values_list('id', flat=True)[:settings.PURGE_BATCH_SIZE])
+            if not item_ids:
+                break
+            ListItem.objects.filter(id__in=item_ids).delete()
+
+    ToDoList.objects.filter(pk=list_id, deleted_at__isnull=False).delete()
+
+@job_handler('rebuild_counters')
+def rebuild_counters(list_ids=None, chunk_size=1000):
+    """
+    Brief: Recomputes the item counters of the given lists, or of every list.
+
+    Details: The lists are checked chunk_size at a time, the wrong counters of each chunk are
+             fixed in its own transaction (see ToDoListQuerySet.rebuild_counters).
+
+    Args:
+        list_ids: Ids of the lists to rebuild, every list by default.
+        chunk_size: The number of lists rebuilt per statement.
+    """
+    todo_lists = ToDoList.objects.filter(id__in=list_ids) if list_ids is not None else ToDoList.objects.all()
+    after = 0
+    while chunk_ids := list(todo_lists.filter(id__gt=after).order_by('id').values_list('id', flat=True)[:chunk_size]):
+        ToDoList.objects.filter(id__in=chunk_ids).rebuild_counters()
+        after = chunk_ids[-1]
@@ -0,0 +1,256 @@
+import gc
+import json
+import os
+import time
+from io import StringIO
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from todo_list_app import async_views
+from todo_list_app.dashboard_cache import get_dashboard_cache
+from todo_list_app.models import ListItem, ToDoList
+from todo_list_app.urls import build_urlconf
+
+# Data of each scale (see seed_perf), the benchmark user is the first of the seeded users
+SCALES = {
+    'small': {'users': 10, 'lists': 5, 'items': 20},
+    'medium': {'users': 50, 'lists': 20, 'items': 200},
+    'large': {'users': 20, 'lists': 50, 'items': 1000},
+}
+
+# Benchmarked actions, in the order they run: the reads first, then the writes
+ACTIONS = (
+    'home', 'login', 'register', 'dashboard', 'dashboard_cold',
+    'add_list', 'add_list_item', 'toggle_task', 'delete_task', 'delete_list',
+)
+
+BENCH_USERNAME_PREFIX = "bench_user_"
+BENCH_PASSWORD = "Bench_Passw0rd!"
+
+# Untimed requests sent before the measured ones of each action
+WARMUP_REQUESTS = 3
+
+# Directory of the committed baselines, one per handler (baseline_wsgi.json, baseline_asgi.json)
+BASELINES_DIR = settings.BASE_DIR / 'benchmarks'
+
+# Value of --baseline and --save-baseline given without a file: the committed baseline of the handler
+DEFAULT_BASELINE = 'default'
+
+# Extra queries per request tolerated before a change counts as a regression
+QUERY_TOLERANCE = 0.5
+
+def percentile(latencies, fraction):
+    """ Returns the nearest-rank percentile of sorted latencies, in milliseconds. """
+    return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000
+
+def baseline_path(path, handler):
+    """ Returns the file of a --baseline or --save-baseline value, the committed baseline of the handler by default. """
+    return BASELINES_DIR / f"baseline_{handler}.json" if path == DEFAULT_BASELINE else path
+
+def find_regressions(results, baseline, threshold, min_delta_ms):
+    """
+    Brief: Compares benchmark results to a baseline and returns the description of every regression.
+
+    Details: An action regresses when it runs more queries per request than in the baseline, or
+             when both its p50 and p95 latencies grew by more than threshold (a fraction) and by at
+             least min_delta_ms milliseconds: a slower view shifts both, a lone slow request only
+             moves the p95. The actions and scales missing from the baseline are skipped.
+
+    Args:
+        results: The results of bench_actions, as saved by --save-baseline.
+        baseline: The baseline results.
+        threshold: Tolerated relative growth of the p50 and p95 latencies, e.g. 0.25 for 25%.
+        min_delta_ms: Smallest latency growth (in milliseconds) counted as a regression, below it is noise.
+    """
+    regressions = []
+    for scale, actions in results['scales'].items():
+        for action, result in actions.items():
+            base = baseline.get('scales', {}).get(scale, {}).get(action)
+            if base is None:
+                continue
+            if result['queries'] > base['queries'] + QUERY_TOLERANCE:
+                regressions.append(f"{scale}/{action}: {result['queries']:.1f} queries per request (baseline {base['queries']:.1f})")
+            if all(
+                result[key] > base[key] * (1 + threshold) and result[key] - base[key] >= min_delta_ms
+                for key in ('p50_ms', 'p95_ms')
+            ):
+                regressions.append(f"{scale}/{action}: p50 {result['p50_ms']:.1f}ms, p95 {result['p95_ms']:.1f}ms (baseline {base['p50_ms']:.1f}ms, {base['p95_ms']:.1f}ms)")
+    return regressions
+
+class Command(BaseCommand):
+    """ Measures the latency and the queries of every page and dashboard action at several data scales. """
+
+    help = (
+        "Seeds a temporary test database at each data scale, sends the requests of every action (home, login, "
+        "register, dashboard GET with a warm and a cold fragment cache, add_list, add_list_item, toggle_task, "
+        "delete_task, delete_list) through the test client, and reports their p50/p95/p99 latency, throughput and "
+        "queries per request. The results can be saved as a JSON baseline, and compared to one: the command fails "
+        "when an action runs more queries, or its p50 and p95 latencies grew beyond --threshold. Without a file, "
+        "--baseline and --save-baseline use the committed benchmarks/baseline_<handler>.json."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', dest='scales', choices=SCALES, help="Data scale (repeatable), small and medium by default.")
+        parser.add_argument('--action', action='append', dest='actions', choices=ACTIONS, help="Benchmarked action (repeatable), all of them by default.")
+        parser.add_argument('--requests', type=int, default=30, help="Number of measured requests per action.")
+        parser.add_argument('--handler', choices=('wsgi', 'asgi'), default='wsgi', help="Serve the pages with the sync views (wsgi) or the async views (asgi).")
+        parser.add_argument('--seed', type=int, default=42, help="Seed of the generated data.")
+        parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help="Write the results to this JSON file, the committed baseline of the handler by default.")
+        parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE, help="Compare the results to this JSON file and fail on a regression, the committed baseline of the handler by default.")
+        parser.add_argument('--threshold', type=float, default=0.25, help="Tolerated growth of the p50 and p95 latencies over the baseline (0.25 = 25%%).")
+        parser.add_argument('--min-delta-ms', type=float, default=2.0, help="Smaller latency growths are noise, never regressions.")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError("--requests must be positive.")
+
+        for option in ('baseline', 'save_baseline'):
+            if options[option]:
+                options[option] = baseline_path(options[option], options['handler'])
+
+        baseline = None
+        if options['baseline']:
+            if not os.path.exists(options['baseline']):
+                raise CommandError(f"No baseline at {options['baseline']}, measure one with --save-baseline.")
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            if baseline.get('handler') != options['handler']:
+                raise CommandError(f"The baseline was measured with the {baseline.get('handler')} handler, not {options['handler']}.")
+
+        results = {'handler': options['handler'], 'requests': options['requests'], 'scales': {}}
+        setup_test_environment()
+        try:
+            for scale in options['scales'] or ['small', 'medium']:
+                # A fresh database per scale, so the rows of a scale do not slow down the next one
+                old_database_name = connection.settings_dict['NAME']
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f"Scale {scale}: {SCALES[scale]}"))
+                    results['scales'][scale] = self.run_scale(SCALES[scale], options)
+                finally:
+                    connection.creation.destroy_test_db(old_database_name, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}.")
+
+        if baseline is not None:
+            regressions = find_regressions(results, baseline, options['threshold'], options['min_delta_ms'])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regression against {options['baseline']}."))
+
+    def run_scale(self, scale, options):
+        """ Seeds the current database at a scale and benchmarks the actions, returns the result of each action. """
+        call_command(
+            'seed_perf', users=scale['users'], lists=scale['lists'], items=scale['items'], seed=options['seed'],
+            username_prefix=BENCH_USERNAME_PREFIX, password=BENCH_PASSWORD, stdout=StringIO(),
+        )
+        user = User.objects.get(username=f"{BENCH_USERNAME_PREFIX}0")
+        get_dashboard_cache().clear()
+
+        self.stdout.write(f"{'action':<16}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}")
+        urlconf = build_urlconf(async_views) if options['handler'] == 'asgi' else None
+        results = {}
+        with override_settings(**({'ROOT_URLCONF': urlconf} if urlconf else {})):
+            for action in options['actions'] or ACTIONS:
+                result = results[action] = self.run_action(action, user, options)
+                self.stdout.write(
+                    f"{action:<16}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                    f"{result['rps']:>9.1f}{result['queries']:>9.2f}"
+                )
+        return results
+
+    def run_action(self, action, user, options):
+        """ Sends the warm-up then the measured requests of an action, returns its latency percentiles, throughput and queries per request. """
+        asgi = options['handler'] == 'asgi'
+        anonymous_client = AsyncClient() if asgi else Client()
+        logged_in_client = AsyncClient() if asgi else Client()
+        logged_in_client.force_login(user)
+
+        requests = self.prepare_requests(action, user, WARMUP_REQUESTS + options['requests'])
+        # The garbage of the previous actions is not collected during this one's requests
+        gc.collect()
+
+        latencies = []
+        queries = 0
+        for index, (logged_in, method, path, data) in enumerate(requests):
+            client = logged_in_client if logged_in else anonymous_client
+            send = getattr(client, method)
+            if asgi:
+                send = async_to_sync(send)
+            if action == 'dashboard_cold':
+                get_dashboard_cache().clear()
+
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = send(path, data)
+                elapsed = time.perf_counter() - started
+            if response.status_code not in (200, 302):
+                raise CommandError(f"{action}: {method.upper()} {path} answered {response.status_code}.")
+
+            if index >= WARMUP_REQUESTS:
+                latencies.append(elapsed)
+                queries += len(captured)
+
+        latencies.sort()
+        return {
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'rps': len(latencies) / sum(latencies),
+            'queries': queries / len(latencies),
+        }
+
+    def prepare_requests(self, action, user, count):
+        """ Creates the rows the requests of an action need, returns the (logged in, method, path, data) of each request. """
+        todo_list = ToDoList.objects.owned_by(user).order_by('id').first()
+        list_url = reverse('view_list_items', kwargs={'list_id': todo_list.id})
+
+        if action == 'home':
+            return [(False, 'get', reverse('home'), None)] * count
+        if action == 'login':
+            return [(False, 'post', reverse('login'), {'username': user.username, 'password': BENCH_PASSWORD})] * count
+        if action == 'register':
+            return [
+                (False, 'post', reverse('register'), {
+                    'username': f"bench_new_user_{index}", 'email': f"bench_new_user_{index}@example.com",
+                    'password': BENCH_PASSWORD, 'confirm_password': BENCH_PASSWORD,
+                })
+                for index in range(count)
+            ]
+        if action in ('dashboard', 'dashboard_cold'):
+            return [(True, 'get', list_url, None)] * count
+        if action == 'add_list':
+            return [(True, 'post', reverse('dashboard'), {'form_type': 'add_list', 'list_name': f"Bench list {index}"}) for index in range(count)]
+        if action == 'add_list_item':
+            return [(True, 'post', list_url, {'form_type': 'add_list_item', 'list_item_text': "Benchmark task"})] * count
+        if action == 'toggle_task':
+            task = ListItem.objects.for_list(todo_list).order_by('id').first()
+            toggle_url = reverse('toggle_task', kwargs={'list_id': todo_list.id, 'task_id': task.id})
+            return [(True, 'post', toggle_url, {'form_type': 'toggle_task'})] * count
+        if action == 'delete_task':
+            tasks = ListItem.objects.bulk_create(ListItem(list=todo_list, text=f"Task to delete {index}") for index in range(count))
+            ToDoList.objects.filter(pk=todo_list.pk).rebuild_counters()
+            return [
+                (True, 'post', reverse('delete_task', kwargs={'list_id': todo_list.id, 'task_id': task.id}), {'form_type': 'delete_task'})
+                for task in tasks
+            ]
+        if action == 'delete_list':
+            todo_lists = ToDoList.objects.bulk_create(ToDoList(user=user, name=f"List to delete {index}") for index in range(count))
+            return [
+                (True, 'post', reverse('delete_list', kwargs={'list_id': deleted_list.id}), {'form_type': 'delete_list'})
+                for deleted_list in todo_lists
+            ]
+        raise CommandError(f"Unknown action {action!r}.")
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from todo_list_app import async_views, views
+from todo_list_app.models import ListItem, ToDoList
+from todo_list_app.urls import build_urlconf
+
+class Command(BaseCommand):
+    """ Compares the dashboard throughput of the WSGI handler (sync views) and the ASGI handler (async views). """
+
+    help = (
+        "Serves the same dashboard page through the WSGI handler with the sync views and through the ASGI "
+        "handler with the async views, with the same number of concurrent clients, and reports the requests "
+        "per second of both. The requests are handled in process against a temporary test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Number of requests sent to each handler.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Number of concurrent clients.")
+        parser.add_argument('--lists', type=int, default=20, help="Number of lists of the benchmark user.")
+        parser.add_argument('--items', type=int, default=200, help="Number of items of each list.")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+
+        setup_test_environment()
+        old_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user, page = self.seed(options['lists'], options['items'])
+            self.stdout.write(f"Requesting {page} {options['requests']} times with {options['concurrency']} concurrent clients.")
+
+            with override_settings(ROOT_URLCONF=build_urlconf(views)):
+                wsgi_rate = self.report("WSGI (sync views)", self.run_wsgi, user, page, options)
+
+            with override_settings(ROOT_URLCONF=build_urlconf(async_views)):
+                asgi_rate = self.report("ASGI (async views)", lambda *a: asyncio.run(self.run_asgi(*a)), user, page, options)
+
+            self.stdout.write(self.style.SUCCESS(f"ASGI/WSGI throughput ratio: {asgi_rate / wsgi_rate:.2f}"))
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            teardown_test_environment()
+
+    def seed(self, list_count, item_count):
+        """ Creates the benchmark user and its lists, returns the user and the path of its first list. """
+        user = User.objects.create_user(username="bench_user", password="bench_password")
+        todo_lists = ToDoList.objects.bulk_create(ToDoList(user=user, name=f"List {i}") for i in range(list_count))
+        ListItem.objects.bulk_create(
+            (ListItem(list=todo_list, text=f"Task {i}", isCompleted=i % 3 == 0) for todo_list in todo_lists for i in range(item_count)),
+            batch_size=1000,
+        )
+        ToDoList.objects.filter(user=user).rebuild_counters()
+
+        return user, reverse('view_list_items', kwargs={'list_id': todo_lists[0].id})
+
+    def report(self, label, run, user, page, options):
+        """ Runs one benchmark, writes its throughput and returns it in requests per second. """
+        elapsed = run(user, page, options)
+        rate = options['requests'] / elapsed
+        self.stdout.write(f"{label}: {options['requests']} requests in {elapsed:.2f}s, {rate:.1f} req/s")
+        return rate
+
+    def run_wsgi(self, user, page, options):
+        """ Sends the requests through the WSGI handler from a pool of threads, one client per thread. """
+        clients = []
+        for _ in range(options['concurrency']):
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        def send(client, count):
+            for _ in range(count):
+                response = client.get(page)
+                if response.status_code != 200:
+                    raise CommandError(f"WSGI request failed with status {response.status_code}.")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+            for future in [executor.submit(send, client, count) for client, count in zip(clients, self.split(options))]:
+                future.result()
+        return time.perf_counter() - started
+
+    async def run_asgi(self, user, page, options):
+        """ Sends the requests through the ASGI handler from concurrent tasks of one event loop. """
+        clients = []
+        for _ in range(options['concurrency']):
+            client = AsyncClient()
+            await client.aforce_login(user)
+            clients.append(client)
+
+        async def send(client, count):
+            for _ in range(count):
+                response = await client.get(page)
+                if response.status_code != 200:
+                    raise CommandError(f"ASGI request failed with status {response.status_code}.")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(client, count) for client, count in zip(clients, self.split(options))))
+        return time.perf_counter() - started
+
+    def split(self, options):
+        """ Splits the requests between the concurrent clients. """
+        share, remainder = divmod(options['requests'], options['concurrency'])
+        return [share + (1 if i < remainder else 0) for i in range(options['concurrency'])]
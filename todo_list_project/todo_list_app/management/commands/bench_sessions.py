@@ -0,0 +1,85 @@
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from todo_list_app.dashboard_cache import get_dashboard_cache
+from todo_list_app.models import ListItem, ToDoList
+
+# Settings of the compared session modes
+SESSION_MODES = {
+    'db': {'SESSION_ENGINE': 'django.contrib.sessions.backends.db', 'AUTH_USER_CACHE_TIMEOUT': 0},
+    'cache': {'SESSION_ENGINE': 'todo_list_app.session_store', 'AUTH_USER_CACHE_TIMEOUT': 300},
+}
+
+class Command(BaseCommand):
+    """ Compares the queries and the latency per request of the database sessions and of the cached sessions and users. """
+
+    help = (
+        "Requests the home, login and dashboard pages anonymously and logged in, first with the database "
+        "sessions, then with the cached sessions and users, and reports the queries and milliseconds per request "
+        "of both and the queries removed. The requests are handled in process against a temporary test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Number of requests per page and mode.")
+        parser.add_argument('--items', type=int, default=50, help="Number of items of the benchmark list.")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError("--requests must be positive.")
+
+        setup_test_environment()
+        old_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = User.objects.create_user(username="bench_user", password="bench_password")
+            todo_list = ToDoList.objects.create(user=user, name="Bench list")
+            ListItem.objects.bulk_create(ListItem(list=todo_list, text=f"Task {i}", isCompleted=i % 3 == 0) for i in range(options['items']))
+            ToDoList.objects.filter(pk=todo_list.pk).rebuild_counters()
+
+            pages = [
+                ("home (anonymous)", reverse('home'), False),
+                ("login (anonymous)", reverse('login'), False),
+                ("home (logged in)", reverse('home'), True),
+                ("dashboard (logged in)", reverse('view_list_items', kwargs={'list_id': todo_list.id}), True),
+            ]
+
+            results = {mode: self.run_mode(mode, user, pages, options['requests']) for mode in SESSION_MODES}
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'page':<24}{'db queries':>12}{'cache queries':>15}{'removed':>10}{'db ms':>9}{'cache ms':>10}")
+        for label, _, _ in pages:
+            (db_queries, db_ms), (cache_queries, cache_ms) = results['db'][label], results['cache'][label]
+            self.stdout.write(f"{label:<24}{db_queries:>12.2f}{cache_queries:>15.2f}{db_queries - cache_queries:>10.2f}{db_ms:>9.2f}{cache_ms:>10.2f}")
+
+    def run_mode(self, mode, user, pages, requests):
+        """ Requests every page with the settings of a session mode, returns the queries and milliseconds per request of each page. """
+        results = {}
+        with override_settings(**SESSION_MODES[mode]):
+            caches[settings.SESSION_CACHE_ALIAS].clear()
+            anonymous_client = Client()
+            logged_in_client = Client()
+            logged_in_client.force_login(user)
+
+            for label, url, logged_in in pages:
+                client = logged_in_client if logged_in else anonymous_client
+                # Both modes start with the same warm dashboard cache
+                get_dashboard_cache().clear()
+                client.get(url)
+
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(requests):
+                        if client.get(url).status_code != 200:
+                            raise CommandError(f"GET {url} failed in the {mode} mode.")
+                    elapsed = time.perf_counter() - started
+
+                results[label] = (len(queries) / requests, elapsed * 1000 / requests)
+
+        return results
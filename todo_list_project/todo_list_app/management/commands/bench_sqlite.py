@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from todo_list_app.models import ListItem, ToDoList
+
+DATABASE_PROFILES = ('development', 'production')
+
+class Command(BaseCommand):
+    """ Compares the dashboard throughput of the development and production database profiles under concurrent writers. """
+
+    help = (
+        "Creates a temporary SQLite database for each database profile, then runs the same mix of dashboard "
+        "requests (add a task, toggle it, view the list) from several worker processes at once, and reports "
+        "the requests per second, the latencies and the requests that failed because the database was locked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help="Number of concurrent worker processes.")
+        parser.add_argument('--seconds', type=float, default=10, help="Duration of the benchmark of each profile.")
+        parser.add_argument('--items', type=int, default=500, help="Number of items of the benchmark list.")
+        parser.add_argument('--profile', action='append', dest='profiles', choices=DATABASE_PROFILES, help="Benchmarked profile (repeatable), both by default.")
+        # Internal: the steps run in the child processes, with the profile's environment
+        parser.add_argument('--setup', action='store_true', help=argparse.SUPPRESS)
+        parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['setup']:
+            return self.setup_database(options)
+        if options['worker']:
+            return self.run_worker(options)
+
+        if options['processes'] < 1 or options['seconds'] <= 0:
+            raise CommandError("--processes and --seconds must be positive.")
+
+        rates = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in options['profiles'] or DATABASE_PROFILES:
+                env = {
+                    **os.environ,
+                    'TODO_DATABASE_PROFILE': profile,
+                    'TODO_DATABASE_PATH': os.path.join(directory, f"{profile}.sqlite3"),
+                }
+                self.run_child(['--setup', '--items', str(options['items'])], env).check_returncode()
+
+                workers = [self.run_child(['--worker', '--seconds', str(options['seconds'])], env, wait=False) for _ in range(options['processes'])]
+                reports = []
+                for worker in workers:
+                    output, _ = worker.communicate()
+                    if worker.returncode:
+                        raise CommandError(f"A {profile} worker failed with exit code {worker.returncode}.")
+                    reports.append(json.loads(output.splitlines()[-1]))
+
+                rates[profile] = self.report(profile, reports, options['seconds'])
+
+        if len(rates) == 2:
+            self.stdout.write(self.style.SUCCESS(f"production/development throughput ratio: {rates['production'] / rates['development']:.2f}"))
+
+    def run_child(self, arguments, env, wait=True):
+        """ Runs this command in a child process with the environment of a profile. """
+        command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_sqlite', *arguments]
+        if wait:
+            return subprocess.run(command, env=env)
+        return subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+
+    def setup_database(self, options):
+        """ Creates the tables of the profile's database and the benchmark user and list. """
+        call_command('migrate', verbosity=0)
+        user = User.objects.create_user(username="bench_user", password="bench_password")
+        todo_list = ToDoList.objects.create(user=user, name="Bench list")
+        ListItem.objects.bulk_create((ListItem(list=todo_list, text=f"Task {i}", isCompleted=i % 3 == 0) for i in range(options['items'])), batch_size=1000)
+        ToDoList.objects.filter(pk=todo_list.pk).rebuild_counters()
+
+    def run_worker(self, options):
+        """ Sends the requests of one worker process until the deadline, and prints its report as JSON. """
+        setup_test_environment()
+        user = User.objects.get(username="bench_user")
+        todo_list = ToDoList.objects.get(user=user)
+        client = Client()
+        client.force_login(user)
+
+        list_url = reverse('view_list_items', kwargs={'list_id': todo_list.id})
+        report = {'requests': 0, 'locked': 0, 'latencies': []}
+
+        def send(method, url, data=None):
+            started = time.perf_counter()
+            try:
+                response = getattr(client, method)(url, data)
+                if response.status_code not in (200, 302):
+                    raise CommandError(f"{method.upper()} {url} answered {response.status_code}.")
+            except OperationalError:
+                report['locked'] += 1
+                return
+            report['requests'] += 1
+            report['latencies'].append(time.perf_counter() - started)
+
+        deadline = time.monotonic() + options['seconds']
+        while time.monotonic() < deadline:
+            send('post', list_url, {'form_type': 'add_list_item', 'list_item_text': "Benchmark task"})
+            task_id = ListItem.objects.for_list(todo_list).order_by('-id').values_list('id', flat=True).first()
+            send('post', reverse('toggle_task', kwargs={'list_id': todo_list.id, 'task_id': task_id}), {'form_type': 'toggle_task'})
+            send('get', list_url)
+
+        connection.close()
+        self.stdout.write(json.dumps(report))
+
+    def report(self, profile, reports, seconds):
+        """ Writes the aggregated report of the workers of a profile and returns its requests per second. """
+        requests = sum(report['requests'] for report in reports)
+        locked = sum(report['locked'] for report in reports)
+        latencies = sorted(latency for report in reports for latency in report['latencies'])
+
+        def percentile(fraction):
+            return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+        rate = requests / seconds
+        self.stdout.write(
+            f"{profile}: {requests} requests, {rate:.1f} req/s, p50 {percentile(0.5):.1f}ms, "
+            f"p95 {percentile(0.95):.1f}ms, {locked} failed with 'database is locked'"
+        )
+        return rate
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from todo_list_app.transfer import IMPORT_PARSERS, ImportFileError, import_lists
+
+class Command(BaseCommand):
+    """ Imports the lists and items of a CSV or NDJSON file for a user. """
+
+    help = (
+        "Imports a CSV or NDJSON file (see the export API for its columns) as new lists of a user. "
+        "The file is read as a stream and inserted in chunks, one transaction per chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path of the imported file.")
+        parser.add_argument('--user', required=True, help="Username of the user the lists are imported for.")
+        parser.add_argument('--format', choices=sorted(IMPORT_PARSERS), help="Format of the file, guessed from its extension by default.")
+        parser.add_argument('--chunk-size', type=int, default=settings.TRANSFER_CHUNK_SIZE, help="Number of rows inserted per transaction.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        import_format = options['format'] or options['path'].rpartition('.')[2].lower()
+        if import_format not in IMPORT_PARSERS:
+            raise CommandError("Unknown file format, use --format.")
+
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist.")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+                imported = import_lists(user, IMPORT_PARSERS[import_format](lines), options['chunk_size'])
+        except OSError as error:
+            raise CommandError(f"Cannot read {options['path']}: {error}")
+        except ImportFileError as error:
+            raise CommandError(f"{error} ({error.imported['lists']} list(s) and {error.imported['items']} item(s) imported before it).")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported['lists']} list(s) and {imported['items']} item(s)."))
@@ -0,0 +1,102 @@
+import os
+import pstats
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from todo_list_app.profiling import PROFILE_EXTENSIONS, profile_token
+
+SORT_KEYS = {
+    'tottime': pstats.SortKey.TIME,
+    'cumulative': pstats.SortKey.CUMULATIVE,
+    'calls': pstats.SortKey.CALLS,
+}
+
+class Command(BaseCommand):
+    """ Aggregates the request profiles of ProfilingMiddleware into a hot-function report. """
+
+    help = (
+        "Reads the request profiles of PROFILING_DIR (optionally only those of a view and a form_type), "
+        "merges the cProfile dumps into one table of the hottest functions and the sampled stacks into the "
+        "functions with the most samples, and can write the merged stacks as one flamegraph input."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Directory of the profiles, PROFILING_DIR by default.")
+        parser.add_argument('--view', help="Only the profiles of the views whose dotted path contains this text.")
+        parser.add_argument('--form-type', help="Only the profiles of this dashboard form_type ('-' for none).")
+        parser.add_argument('--sort', choices=SORT_KEYS, default='tottime', help="Order of the cProfile functions.")
+        parser.add_argument('--limit', type=int, default=25, help="Number of functions reported.")
+        parser.add_argument('--collapsed-output', help="Write the merged sampled stacks to this file (flamegraph.pl input).")
+        parser.add_argument('--print-token', action='store_true', help="Print a value of the X-Todo-Profile header and exit.")
+
+    def handle(self, *args, **options):
+        if options['print_token']:
+            self.stdout.write(profile_token())
+            return
+
+        directory = options['dir'] or settings.PROFILING_DIR
+        if not os.path.isdir(directory):
+            raise CommandError(f"No profiles directory at {directory}.")
+
+        profiles = {extension: [] for extension in PROFILE_EXTENSIONS.values()}
+        tags = Counter()
+        for file_name in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(file_name)
+            parts = name.split('__')
+            if extension not in profiles or len(parts) != 3:
+                continue
+            _, view, form_type = parts
+            if options['view'] and options['view'] not in view:
+                continue
+            if options['form_type'] and options['form_type'] != form_type:
+                continue
+            profiles[extension].append(os.path.join(directory, file_name))
+            tags[(view, form_type)] += 1
+
+        if not tags:
+            raise CommandError("No profile matches.")
+
+        self.stdout.write("Profiled requests:")
+        for (view, form_type), count in tags.most_common():
+            self.stdout.write(f"  {count:>5}  {view} [{form_type}]")
+
+        if profiles['.prof']:
+            self.report_cprofile(profiles['.prof'], options)
+        if profiles['.collapsed']:
+            self.report_samples(profiles['.collapsed'], options)
+
+    def report_cprofile(self, paths, options):
+        """ Writes the hottest functions of the merged cProfile dumps. """
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\ncProfile, {len(paths)} requests, by {options['sort']}:"))
+        stats = pstats.Stats(*paths, stream=self.stdout)
+        stats.strip_dirs().sort_stats(SORT_KEYS[options['sort']]).print_stats(options['limit'])
+
+    def report_samples(self, paths, options):
+        """ Writes the functions with the most samples (own and total) and the merged stacks if asked. """
+        stacks = Counter()
+        for path in paths:
+            with open(path) as dump_file:
+                for line in dump_file:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if stack:
+                        stacks[stack] += int(count)
+
+        own_samples = Counter()
+        total_samples = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            own_samples[frames[-1]] += count
+            for frame in set(frames):
+                total_samples[frame] += count
+
+        samples = sum(stacks.values())
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nSampled stacks, {len(paths)} requests, {samples} samples:"))
+        self.stdout.write(f"  {'own %':>7}  {'total %':>7}  function")
+        for frame, count in own_samples.most_common(options['limit']):
+            self.stdout.write(f"  {100 * count / samples:>7.1f}  {100 * total_samples[frame] / samples:>7.1f}  {frame}")
+
+        if options['collapsed_output']:
+            with open(options['collapsed_output'], 'w') as output:
+                for stack, count in stacks.most_common():
+                    output.write(f"{stack} {count}\n")
+            self.stdout.write(f"Merged stacks written to {options['collapsed_output']}.")
@@ -0,0 +1,36 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from todo_list_app.models import Tombstone, UserRevision
+
+class Command(BaseCommand):
+    """ Deletes the old tombstones of the deleted lists and items. """
+
+    help = (
+        "Deletes the tombstones older than --days. The clients that have not synced since "
+        "then receive a full snapshot on their next sync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="Age (in days) of the oldest tombstone kept.")
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError("--days must be positive.")
+
+        old_tombstones = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=options['days']))
+
+        with transaction.atomic():
+            # Remember the newest pruned revision of each user, older clients can no longer sync their deletions
+            pruned = old_tombstones.order_by().values('user_id').annotate(max_revision=Max('revision'))
+            for user_pruned in pruned.iterator(chunk_size=1000):
+                UserRevision.objects.filter(user_id=user_pruned['user_id']).update(
+                    pruned_revision=Greatest('pruned_revision', user_pruned['max_revision'])
+                )
+
+            deleted, _ = old_tombstones.delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} tombstone(s)."))
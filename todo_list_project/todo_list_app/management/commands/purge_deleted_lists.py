@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+from todo_list_app.jobs import enqueue, run_pending_jobs
+from todo_list_app.models import Job, ToDoList
+
+class Command(BaseCommand):
+    """ Runs the queued purges of the deleted To-Do lists. """
+
+    help = (
+        "Deletes the items of the deleted To-Do lists in bounded batches, then the lists, by running "
+        "their queued purge_list jobs. Meant to be run periodically (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help="Maximum number of lists purged.")
+        parser.add_argument(
+            '--requeue',
+            action='store_true',
+            help="First queue a purge for the deleted lists whose purge job has failed or is missing.",
+        )
+
+    def handle(self, *args, **options):
+        if options['limit'] is not None and options['limit'] < 1:
+            raise CommandError("--limit must be positive.")
+
+        if options['requeue']:
+            pending_purges = Job.objects.filter(kind='purge_list', status__in=(Job.QUEUED, Job.RUNNING), payload__list_id=OuterRef('pk'))
+            orphans = ToDoList.objects.filter(deleted_at__isnull=False).exclude(Exists(pending_purges))
+            for list_id in orphans.values_list('id', flat=True).iterator(chunk_size=1000):
+                enqueue('purge_list', list_id=list_id)
+
+        purged = run_pending_jobs(kinds=('purge_list',), limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Ran {purged} purge job(s)."))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Q
+from todo_list_app.jobs import enqueue
+from todo_list_app.models import ToDoList
+
+class Command(BaseCommand):
+    """ Recomputes (or verifies) the denormalized item counters of the To-Do lists. """
+
+    help = "Recomputes the item_count and completed_count of every To-Do list from the items table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only report the lists whose counters are wrong, and fail if there is any.",
+        )
+        parser.add_argument(
+            '--background',
+            action='store_true',
+            help="Queue the rebuild as a background job (see runworker) instead of running it now.",
+        )
+
+    def handle(self, *args, **options):
+        if options['background']:
+            enqueue('rebuild_counters')
+            self.stdout.write(self.style.SUCCESS("Queued the rebuild of the item counters."))
+            return
+
+        mismatches = ToDoList.objects.with_actual_counters().filter(
+            ~Q(item_count=F('actual_item_count')) | ~Q(completed_count=F('actual_completed_count'))
+        ).order_by('id')
+
+        if options['verify']:
+            mismatch_count = 0
+            for todo_list in mismatches.iterator(chunk_size=1000):
+                mismatch_count += 1
+                self.stdout.write(
+                    f"List {todo_list.id}: item_count {todo_list.item_count} (actual {todo_list.actual_item_count}), "
+                    f"completed_count {todo_list.completed_count} (actual {todo_list.actual_completed_count})"
+                )
+
+            if mismatch_count:
+                raise CommandError(f"{mismatch_count} list(s) have wrong item counters.")
+
+            self.stdout.write(self.style.SUCCESS("All the item counters are correct."))
+            return
+
+        rebuilt = ToDoList.objects.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Fixed the item counters of {rebuilt} list(s)."))
@@ -0,0 +1,53 @@
+import signal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from todo_list_app.jobs import JOB_HANDLERS, Worker
+
+class Command(BaseCommand):
+    """ Runs the background jobs queued in the database. """
+
+    help = (
+        "Claims the queued background jobs from the database and runs them on a pool of threads, "
+        "retrying the failed ones with an exponential backoff. Stops gracefully on SIGINT/SIGTERM: "
+        "the running jobs are finished and the claimed ones put back in the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_WORKER_CONCURRENCY, help="Number of jobs run in parallel.")
+        parser.add_argument('--batch-size', type=int, default=settings.JOBS_WORKER_BATCH_SIZE, help="Maximum number of jobs claimed per query.")
+        parser.add_argument(
+            '--visibility-timeout',
+            type=int,
+            default=settings.JOBS_LOCK_SECONDS,
+            help="Seconds before the jobs of a worker that stopped answering are claimed by another one.",
+        )
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_WORKER_POLL_INTERVAL, help="Seconds between two polls of an empty queue.")
+        parser.add_argument('--kind', action='append', dest='kinds', choices=sorted(JOB_HANDLERS), help="Only run the jobs of this kind (repeatable).")
+        parser.add_argument('--burst', action='store_true', help="Stop once the queue is empty.")
+        parser.add_argument('--max-jobs', type=int, help="Stop after this many jobs.")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['batch_size'] < 1 or options['visibility_timeout'] < 1:
+            raise CommandError("--concurrency, --batch-size and --visibility-timeout must be positive.")
+
+        worker = Worker(
+            concurrency=options['concurrency'],
+            batch_size=options['batch_size'],
+            lock_seconds=options['visibility_timeout'],
+            poll_interval=options['poll_interval'],
+            kinds=options['kinds'] or (),
+        )
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after the running jobs...")
+            worker.stop()
+
+        previous_handlers = {signum: signal.signal(signum, stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            self.stdout.write(f"Worker started with {worker.concurrency} thread(s).")
+            stats = worker.run(burst=options['burst'], max_jobs=options['max_jobs'])
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+        self.stdout.write(self.style.SUCCESS(f"{stats['succeeded']} job(s) succeeded, {stats['failed']} failed."))
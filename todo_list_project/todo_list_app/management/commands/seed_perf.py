@@ -0,0 +1,129 @@
+import random
+import time
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from todo_list_app.models import ListItem, ToDoList, UserRevision
+
+# Words of the generated list names and task texts
+LIST_NAMES = (
+    "Groceries", "Work", "Home", "Errands", "Reading", "Travel", "Fitness", "Garden", "Bills", "Projects",
+    "Birthday party", "Car", "Learning", "Weekend", "Moving", "Kids", "Health", "Side project", "Wishlist", "Chores",
+)
+TASK_WORDS = (
+    "buy", "call", "email", "fix", "clean", "book", "pay", "send", "review", "plan", "order", "pick", "up", "write",
+    "prepare", "schedule", "update", "check", "return", "renew", "milk", "bread", "eggs", "report", "invoice", "dentist",
+    "meeting", "tickets", "laundry", "kitchen", "garage", "insurance", "slides", "budget", "the", "for", "with", "before",
+    "after", "monday", "friday", "tomorrow", "mom", "team", "client", "doctor", "library", "books", "package", "car",
+)
+
+# Share of the task texts of each length range (in characters): most tasks are short
+TEXT_LENGTHS = (((8, 30), 60), ((30, 60), 30), ((60, 100), 10))
+
+class Command(BaseCommand):
+    """ Fills the database with synthetic users, lists and items for the benchmarks. """
+
+    help = (
+        "Creates N users, M lists per user and K items per list with realistic task texts and completion ratios, "
+        "in chunks of bulk inserts. Every user gets the same password, hashed once. The same --seed always "
+        "generates the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Number of users (N).")
+        parser.add_argument('--lists', type=int, default=20, help="Number of lists per user (M).")
+        parser.add_argument('--items', type=int, default=100, help="Number of items per list (K).")
+        parser.add_argument('--completed-ratio', type=float, default=0.4, help="Average share of completed items, each list has its own ratio around it.")
+        parser.add_argument('--seed', type=int, default=42, help="Seed of the random generator.")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Number of rows per bulk insert, and about the number of items per transaction.")
+        parser.add_argument('--username-prefix', default="perf_user_", help="Prefix of the generated usernames, followed by the user number.")
+        parser.add_argument('--password', default="perf_password", help="Password of every generated user.")
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['chunk_size']) < 1 or min(options['lists'], options['items']) < 0:
+            raise CommandError("--users and --chunk-size must be positive, --lists and --items not negative.")
+        if not 0 <= options['completed_ratio'] <= 1:
+            raise CommandError("--completed-ratio must be between 0 and 1.")
+        if User.objects.filter(username__startswith=options['username_prefix']).exists():
+            raise CommandError(f"Users named {options['username_prefix']}* already exist, choose another --username-prefix.")
+
+        rng = random.Random(options['seed'])
+        chunk_size = options['chunk_size']
+        started = time.perf_counter()
+
+        # Hashed once: the slow password hasher would otherwise dominate the seeding
+        encoded_password = make_password(options['password'])
+        users = (User(username=f"{options['username_prefix']}{index}", password=encoded_password) for index in range(options['users']))
+
+        created = {'users': 0, 'lists': 0, 'items': 0}
+        while user_chunk := list(islice(users, chunk_size)):
+            with transaction.atomic():
+                user_ids = [user.pk for user in User.objects.bulk_create(user_chunk)]
+                # The seeded rows are stamped with revision 1, the first revision of their users
+                UserRevision.objects.bulk_create(UserRevision(user_id=user_id, revision=1) for user_id in user_ids)
+            created['users'] += len(user_ids)
+
+            # Each transaction writes the lists of about chunk_size items, their texts are held in memory until then
+            lists = ((user_id, list_index) for user_id in user_ids for list_index in range(options['lists']))
+            while list_chunk := list(islice(lists, max(chunk_size // max(options['items'], 1), 1))):
+                with transaction.atomic():
+                    lists_count, items_count = self.create_lists(rng, list_chunk, options)
+                created['lists'] += lists_count
+                created['items'] += items_count
+                self.stdout.write(f"{created['users']} users, {created['lists']} lists, {created['items']} items")
+
+        elapsed = time.perf_counter() - started
+        rows = sum(created.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created['users']} users, {created['lists']} lists and {created['items']} items "
+            f"in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)."
+        ))
+
+    def create_lists(self, rng, list_chunk, options):
+        """ Inserts a chunk of lists, with their counters already set, then their items. Returns the numbers of lists and items. """
+        todo_lists = []
+        list_items = []
+        for user_id, list_index in list_chunk:
+            name = LIST_NAMES[list_index % len(LIST_NAMES)]
+            if list_index >= len(LIST_NAMES):
+                name = f"{name} {list_index // len(LIST_NAMES) + 1}"
+
+            completed_ratio = self.list_completed_ratio(rng, options['completed_ratio'])
+            items = [(self.task_text(rng), rng.random() < completed_ratio) for _ in range(options['items'])]
+            list_items.append(items)
+            todo_lists.append(ToDoList(
+                user_id=user_id, name=name, revision=1,
+                item_count=len(items), completed_count=sum(is_completed for _, is_completed in items),
+            ))
+
+        ToDoList.objects.bulk_create(todo_lists, batch_size=options['chunk_size'])
+        items = (
+            ListItem(list_id=todo_list.pk, text=text, isCompleted=is_completed, revision=1)
+            for todo_list, items in zip(todo_lists, list_items) for text, is_completed in items
+        )
+        items_count = 0
+        while item_chunk := list(islice(items, options['chunk_size'])):
+            ListItem.objects.bulk_create(item_chunk)
+            items_count += len(item_chunk)
+
+        return len(todo_lists), items_count
+
+    def list_completed_ratio(self, rng, average):
+        """ Returns the completion ratio of a list: spread around the average, some lists are almost done, others barely started. """
+        if average in (0, 1):
+            return average
+        return rng.betavariate(4 * average, 4 * (1 - average))
+
+    def task_text(self, rng):
+        """ Returns a task text of a realistic length, capped to the 100 characters of ListItem.text. """
+        (shortest, longest), = rng.choices([length_range for length_range, _ in TEXT_LENGTHS], weights=[weight for _, weight in TEXT_LENGTHS])
+        target_length = rng.randint(shortest, longest)
+
+        words = [rng.choice(TASK_WORDS).capitalize()]
+        length = len(words[0])
+        while length < target_length:
+            words.append(rng.choice(TASK_WORDS))
+            length += len(words[-1]) + 1
+        return " ".join(words)[:100]
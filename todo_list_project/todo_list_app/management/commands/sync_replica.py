@@ -0,0 +1,37 @@
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+class Command(BaseCommand):
+    """ Copies the primary SQLite database to the local stand-in read replica. """
+
+    help = (
+        "Copies the 'default' SQLite database to the 'replica' one with the SQLite online backup API, "
+        "once or every --interval seconds. A stand-in for a real replication (e.g. litestream) on a single machine."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help="Seconds between two copies, copy once by default.")
+
+    def handle(self, *args, **options):
+        if not settings.READ_REPLICA_ALIAS:
+            raise CommandError("No read replica is configured, set TODO_DATABASE_REPLICA_PATH.")
+
+        primary = connections['default'].settings_dict
+        replica = connections[settings.READ_REPLICA_ALIAS].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or replica['ENGINE'] != primary['ENGINE']:
+            raise CommandError("sync_replica only copies SQLite databases.")
+
+        while True:
+            started = time.perf_counter()
+            with sqlite3.connect(primary['NAME']) as source, sqlite3.connect(replica['NAME']) as target:
+                source.backup(target)
+            source.close()
+            target.close()
+            self.stdout.write(f"Copied the primary database to the replica in {time.perf_counter() - started:.2f}s.")
+
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,253 @@
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.crypto import constant_time_compare
+from . import hashing
+
+# Request metrics: RequestMetricsMiddleware measures every request's wall time, number of queries,
+# time spent in the database and time spent rendering templates, labelled with the view, the
+# method and the dashboard form_type (so each branch of dashboard_view gets its own series).
+# The histograms are kept in the process and served in the Prometheus text format by metrics_view,
+# with several processes each one is scraped on its own.
+
+# Upper bounds of the histogram buckets, in seconds and in number of queries
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Values of the form_type label, any other posted form_type is counted as 'other'
+FORM_TYPES = frozenset([
+    'add_list', 'delete_list', 'add_list_item', 'batch_tasks', 'complete_all', 'reopen_all',
+    'clear_completed', 'delete_task', 'toggle_task',
+])
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class Histogram:
+    """ A Prometheus histogram with one series per combination of label values, safe to update from several threads.
+
+    Attributes:
+        name(str): Name of the metric.
+        documentation(str): Help text of the metric.
+        buckets(tuple): Sorted upper bounds of the buckets, +Inf is implied.
+        series(dict): Per tuple of label values, the count of each bucket, the sum and the count of the observations.
+    """
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, labels, value):
+        """ Records an observation for the given label values (a tuple of (label, value) pairs). """
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+    def render(self):
+        """ Returns the lines of the histogram in the Prometheus text format. """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labels, series in sorted(self.series.items()):
+                label_text = ",".join(f'{label}="{escape_label_value(value)}"' for label, value in labels)
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{label_text}}} {series['sum']}")
+                lines.append(f"{self.name}_count{{{label_text}}} {series['count']}")
+        return lines
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+REQUEST_DURATION = Histogram('todo_request_duration_seconds', "Wall time of the requests, until the response is returned.", DURATION_BUCKETS)
+REQUEST_QUERIES = Histogram('todo_request_db_queries', "Number of database queries run by the requests.", QUERY_BUCKETS)
+REQUEST_DB_DURATION = Histogram('todo_request_db_duration_seconds', "Time the requests spent running database queries.", DURATION_BUCKETS)
+REQUEST_TEMPLATE_DURATION = Histogram(
+    'todo_request_template_duration_seconds',
+    "Time the requests spent rendering templates, including the queries of the lazy querysets they evaluate.",
+    DURATION_BUCKETS,
+)
+REQUEST_HISTOGRAMS = (REQUEST_DURATION, REQUEST_QUERIES, REQUEST_DB_DURATION, REQUEST_TEMPLATE_DURATION)
+
+class RequestStats:
+    """ The database and template counters of the current request. """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+# Counters of the request being handled, set by RequestMetricsMiddleware. The context is copied
+# into the threads of sync_to_async, so the queries of the async views are counted too.
+request_stats = ContextVar('request_stats', default=None)
+
+def record_query(execute, sql, params, many, context):
+    """ Database execute wrapper adding the queries of a measured request to its counters. """
+    stats = request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """ Wraps the queries of every new database connection with record_query. """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+class TimedTemplate(Template):
+    """ A Django template whose rendering time is added to the counters of the measured request. """
+
+    def render(self, context=None, request=None):
+        stats = request_stats.get()
+        if stats is None:
+            return super().render(context, request)
+
+        # Only the outermost render is timed, it includes the templates it renders
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_seconds += time.perf_counter() - started
+
+class MeasuredDjangoTemplates(DjangoTemplates):
+    """ The Django template backend, with the rendering of its templates timed for the request metrics. """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+def view_label(request):
+    """ Returns the dotted path of the view that handled the request, 'unmatched' if no URL matched. """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    view = getattr(match.func, 'view_class', match.func)
+    return f"{view.__module__}.{view.__qualname__}"
+
+def form_type_label(request):
+    """ Returns the dashboard form_type posted with the request, '' if none. """
+    if request.method != 'POST' or request.content_type not in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        return ''
+    form_type = request.POST.get('form_type', '')
+    return form_type if form_type in FORM_TYPES or not form_type else 'other'
+
+def observe_request(request, stats, seconds):
+    """ Adds a finished request to the histograms. """
+    labels = (('view', view_label(request)), ('method', request.method), ('form_type', form_type_label(request)))
+    REQUEST_DURATION.observe(labels, seconds)
+    REQUEST_QUERIES.observe(labels, stats.queries)
+    REQUEST_DB_DURATION.observe(labels, stats.db_seconds)
+    REQUEST_TEMPLATE_DURATION.observe(labels, stats.template_seconds)
+
+class RequestMetricsMiddleware:
+    """
+    Brief: Records the wall time, the queries, the database time and the template time of every request.
+
+    Details: Should be the first middleware, so the time of the others (e.g. the session and
+             user loading) is counted. Removed from the chain when METRICS_ENABLED is off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            request_stats.reset(token)
+            observe_request(request, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            request_stats.reset(token)
+            observe_request(request, stats, time.perf_counter() - started)
+
+def hashing_metrics_lines():
+    """ Returns the counters of the password hashing pool in the Prometheus text format, none before the pool is used. """
+    pool = hashing.hashing_pool
+    if pool is None:
+        return []
+
+    snapshot = pool.metrics.snapshot()
+    metrics = (
+        ('todo_password_hashes_total', 'counter', "Password hashes computed.", snapshot['completed']),
+        ('todo_password_hashes_rejected_total', 'counter', "Password hashes refused because the queue was full.", snapshot['rejected']),
+        ('todo_password_hashes_pending', 'gauge', "Password hashes queued or running.", snapshot['pending']),
+        ('todo_password_hash_wait_seconds_total', 'counter', "Time the hashes waited for a free worker.", snapshot['wait_seconds']),
+        ('todo_password_hash_seconds_total', 'counter', "Time spent hashing.", snapshot['hash_seconds']),
+        ('todo_password_hash_max_latency_seconds', 'gauge', "Longest wait and hashing time of a single hash.", snapshot['max_latency_seconds']),
+    )
+    lines = []
+    for name, metric_type, documentation, value in metrics:
+        lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}", f"{name} {value}"])
+    return lines
+
+def metrics_view(request):
+    """
+    Brief: Serves the request histograms and the hashing pool counters in the Prometheus text format.
+
+    Details: The scraper must send METRICS_TOKEN as a bearer token (Authorization: Bearer <token>),
+             otherwise the response is a 403. Without a token, or with METRICS_ENABLED off, the
+             endpoint does not exist (404), so the metrics are never public.
+
+    Args:
+        request: The received request.
+    """
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise Http404("Metrics are disabled")
+
+    authorization = request.headers.get('Authorization', '')
+    if not constant_time_compare(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+        return HttpResponse("Forbidden", status=403, content_type='text/plain')
+
+    lines = [line for histogram in REQUEST_HISTOGRAMS for line in histogram.render()]
+    lines.extend(hashing_metrics_lines())
+    return HttpResponse("\n".join(lines) + "\n", content_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2025-10-06 09:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_item_counters(apps, schema_editor):
+    ToDoList = apps.get_model('todo_list_app', 'ToDoList')
+    ListItem = apps.get_model('todo_list_app', 'ListItem')
+
+    def count_items(**filters):
+        list_items = ListItem.objects.filter(list=OuterRef('pk'), **filters).order_by().values('list')
+        return Coalesce(Subquery(list_items.annotate(count=Count('id')).values('count')), 0)
+
+    ToDoList.objects.update(item_count=count_items(), completed_count=count_items(isCompleted=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_list_app', '0002_todolist_updated_at_listitem_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todolist',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='todolist',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_item_counters, migrations.RunPython.noop),
+    ]
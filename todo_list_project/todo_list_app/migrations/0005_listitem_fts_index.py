@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:02
+
+from django.db import migrations
+
+
+def install_fts_index(apps, schema_editor):
+    from todo_list_app.search import install_fts_index
+    install_fts_index(schema_editor.connection)
+
+
+def uninstall_fts_index(apps, schema_editor):
+    from todo_list_app.search import uninstall_fts_index
+    uninstall_fts_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_list_app', '0004_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_fts_index, uninstall_fts_index),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def stamp_existing_rows(apps, schema_editor):
+    ToDoList = apps.get_model('todo_list_app', 'ToDoList')
+    ListItem = apps.get_model('todo_list_app', 'ListItem')
+    UserRevision = apps.get_model('todo_list_app', 'UserRevision')
+
+    # The existing data is the first revision of its owner
+    ToDoList.objects.update(revision=1)
+    ListItem.objects.update(revision=1)
+    UserRevision.objects.bulk_create(
+        (UserRevision(user_id=user_id, revision=1) for user_id in ToDoList.objects.values_list('user_id', flat=True).distinct()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('todo_list_app', '0005_listitem_fts_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('list', 'List'), ('item', 'Item')], max_length=4)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('revision', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserRevision',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('revision', models.PositiveBigIntegerField(default=0)),
+                ('pruned_revision', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='listitem',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='todolist',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='listitem',
+            index=models.Index(fields=['list', 'revision'], name='listitem_list_revision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todolist',
+            index=models.Index(fields=['user', 'revision'], name='todolist_user_revision_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'revision'], name='tombstone_user_revision_idx'),
+        ),
+        migrations.RunPython(stamp_existing_rows, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,254 @@
-from django.db import models
+import uuid
+from datetime import timedelta
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from .pagination import KeysetPage
+from .signals import notify_dashboard_changed
 
 # Create your models here.
 
+# Sync Revision Manager
+class UserRevisionManager(models.Manager):
+    """ Allocates the sync revisions of the users. """
+
+    def allocate(self, user_id):
+        """
+        Brief: Increments the sync revision of a user and returns it.
+
+        Details: Must be called in the transaction of the change it stamps: the counter row
+                 stays locked until the commit, so the revisions of a user are committed in order
+                 and a client that has synced up to a revision never misses an older change.
+
+        Args:
+            user_id: Id of the user owning the changed data.
+        """
+        if not self.filter(user_id=user_id).update(revision=F('revision') + 1):
+            try:
+                with transaction.atomic():
+                    self.create(user_id=user_id, revision=1)
+                return 1
+            except IntegrityError:
+                # Created by a concurrent change
+                self.filter(user_id=user_id).update(revision=F('revision') + 1)
+
+        return self.filter(user_id=user_id).values_list('revision', flat=True).get()
+
+# Sync Revision Model
+class UserRevision(models.Model):
+    """ Represents the sync revision counter of a user.
+
+    Attributes:
+        user(OneToOneField): The user whose changes are counted.
+        revision(PositiveBigIntegerField): The revision of the user's last change, stamped on the changed lists and items.
+        pruned_revision(PositiveBigIntegerField): The revision of the newest pruned tombstone, older clients must sync from scratch.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    revision = models.PositiveBigIntegerField(default=0)
+    pruned_revision = models.PositiveBigIntegerField(default=0)
+
+    objects = UserRevisionManager()
+
+    def __str__(self):
+        return f"Revision {self.revision} of the user: {self.user_id}"
+
+# Tombstone Manager
+class TombstoneManager(models.Manager):
+    """ Records the deleted lists and items. """
+
+    def bury(self, user_id, kind, object_ids, revision):
+        """ Records the deletion of many lists or items with bulk inserts, object_ids is iterated once. """
+        return self.bulk_create(
+            (Tombstone(user_id=user_id, kind=kind, object_id=object_id, revision=revision) for object_id in object_ids),
+            batch_size=1000,
+        )
+
+# Tombstone Model
+class Tombstone(models.Model):
+    """ Represents a deleted list or item, reported to the syncing clients.
+
+    Attributes:
+        user(ForeignKey): The user that owned the deleted list or item.
+        kind(CharField): Whether a list or an item has been deleted (the items of a deleted list have no tombstone).
+        object_id(PositiveBigIntegerField): Id of the deleted list or item.
+        revision(PositiveBigIntegerField): The sync revision of the deletion.
+        deleted_at(DateTimeField): When the list or item has been deleted.
+    """
+    LIST = 'list'
+    ITEM = 'item'
+    KIND_CHOICES = [(LIST, 'List'), (ITEM, 'Item')]
+
+    # The (user, revision) index below replaces the single column foreign key index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    kind = models.CharField(max_length=4, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    revision = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TombstoneManager()
+
+    class Meta:
+        indexes = [
+            # Sync: WHERE user_id = ? AND revision > ?
+            models.Index(fields=['user', 'revision'], name='tombstone_user_revision_idx'),
+        ]
+
+    def __str__(self):
+        return f"A deleted {self.kind} {self.object_id} of the user: {self.user_id}"
+
+# To-Do List QuerySet
+class ToDoListQuerySet(models.QuerySet):
+    """ Query helpers for the To-Do lists used by the dashboard. """
+
+    def owned_by(self, user):
+        """ Restricts the queryset to the lists owned by the given user, the deleted lists waiting for their purge are hidden. """
+        return self.filter(user=user, deleted_at__isnull=True)
+
+    def for_sidebar(self):
+        """ Trims the queryset to the columns rendered in the side-bar, the item counters are read from the list rows. """
+        return self.only('id', 'name', 'item_count', 'completed_count').order_by('id')
+
+    def adjust_counters(self, items=0, completed=0, revision=None):
+        """
+        Brief: Shifts the item counters of the lists in the queryset.
+
+        Details: The counters are updated with F() expressions in a single UPDATE statement,
+                 so concurrent writers never overwrite each other's changes. If they change,
+                 the lists are stamped with the given sync revision in the same statement.
+
+        Args:
+            items: The change of the number of items.
+            completed: The change of the number of completed items.
+            revision: The sync revision of the change, None to leave the revision as is.
+        """
+        changes = {}
+        if items:
+            changes['item_count'] = F('item_count') + items
+        if completed:
+            changes['completed_count'] = F('completed_count') + completed
+        if changes and revision is not None:
+            changes['revision'] = revision
+
+        return self.update(**changes) if changes else 0
+
+    def with_actual_counters(self):
+        """ Annotates the lists with their item counters aggregated from the items table. """
+        return self.annotate(
+            actual_item_count=Count('listitem'),
+            actual_completed_count=Count('listitem', filter=Q(listitem__isCompleted=True)),
+        )
+
+    def rebuild_counters(self):
+        """
+        Brief: Recomputes the wrong item counters of the lists in the queryset from the items table.
+
+        Details: Only the lists whose counters differ from their items are rewritten, with one
+                 UPDATE statement per owner, stamped with a new sync revision of the owner. The
+                 owners' dashboards are then invalidated, so the cached side-bars, the ETags and
+                 the syncing clients pick up the fixed counters. Returns the number of fixed lists.
+        """
+        def count_items(**filters):
+            list_items = ListItem.objects.filter(list=OuterRef('pk'), **filters).order_by().values('list')
+            return Coalesce(Subquery(list_items.annotate(count=Count('id')).values('count')), 0)
+
+        wrong_lists = self.with_actual_counters().filter(
+            ~Q(item_count=F('actual_item_count')) | ~Q(completed_count=F('actual_completed_count'))
+        )
+        list_ids_by_user = {}
+        for list_id, user_id in wrong_lists.values_list('id', 'user_id'):
+            list_ids_by_user.setdefault(user_id, []).append(list_id)
+
+        rebuilt = 0
+        with transaction.atomic():
+            for user_id, list_ids in list_ids_by_user.items():
+                revision = UserRevision.objects.allocate(user_id)
+                rebuilt += ToDoList.objects.filter(id__in=list_ids).update(
+                    item_count=count_items(), completed_count=count_items(isCompleted=True), revision=revision,
+                )
+                notify_dashboard_changed(sender=ToDoList, user_id=user_id)
+        return rebuilt
+
+# To-Do List Manager
+class ToDoListManager(models.Manager.from_queryset(ToDoListQuerySet)):
+    """ Default manager of the To-Do lists, exposes the dashboard data loader. """
+
+    def load_dashboard(self, user, list_id=None, task_id=None, after=0, page_size=50, until=None):
+        """
+        Brief: Builds the data needed to render the dashboard of a user.
+
+        Details: The number of executed queries is fixed no matter how many lists or
+                 items the user owns: one for the selected list (ownership check),
+                 one for the side-bar and one for the items of the selected list.
+                 The items are returned one keyset page at a time, so a very large list
+                 never loads all its rows. The side-bar and the items are lazy, so their
+                 queries only run when the template renders them.
+                 Raises Http404 if the list or the task are not owned by the user.
+
+        Args:
+            user: The logged in user.
+            list_id: Id of the selected list, None if no list is selected.
+            task_id: Id of the selected task, None if no task is selected.
+            after: Id of the last item of the previous page, 0 for the first page.
+            page_size: The maximum number of items of a page.
+            until: Id of the last item of the page (the last item loaded by dashboard.js), None for a single page.
+        """
+        dashboard = {
+            'lists': self.owned_by(user).for_sidebar(),
+            'current_list': None,
+            'tasks': ListItem.objects.none(),
+            'task': None,
+        }
+
+        if list_id:
+            current_list = get_object_or_404(self.owned_by(user).only('id', 'name', 'user_id'), id=list_id)
+            dashboard['current_list'] = current_list
+            dashboard['tasks'] = KeysetPage(ListItem.objects.for_list(current_list).for_display(), after=after, limit=page_size, until=until)
+
+            if task_id:
+                dashboard['task'] = get_object_or_404(ListItem.objects.for_list(current_list).for_display(), id=task_id)
+
+        return dashboard
+
+    async def aload_dashboard(self, user, list_id=None, task_id=None, after=0, page_size=50, until=None):
+        """
+        Brief: Async version of load_dashboard, used by the ASGI views.
+
+        Details: The ownership checks run through the async ORM, the side-bar and the
+                 items stay lazy like in load_dashboard.
+                 Raises Http404 if the list or the task are not owned by the user.
+
+        Args:
+            user: The logged in user.
+            list_id: Id of the selected list, None if no list is selected.
+            task_id: Id of the selected task, None if no task is selected.
+            after: Id of the last item of the previous page, 0 for the first page.
+            page_size: The maximum number of items of a page.
+            until: Id of the last item of the page (the last item loaded by dashboard.js), None for a single page.
+        """
+        dashboard = {
+            'lists': self.owned_by(user).for_sidebar(),
+            'current_list': None,
+            'tasks': ListItem.objects.none(),
+            'task': None,
+        }
+
+        if list_id:
+            try:
+                current_list = await self.owned_by(user).only('id', 'name', 'user_id').aget(id=list_id)
+                dashboard['current_list'] = current_list
+                dashboard['tasks'] = KeysetPage(ListItem.objects.for_list(current_list).for_display(), after=after, limit=page_size, until=until)
+
+                if task_id:
+                    dashboard['task'] = await ListItem.objects.for_list(current_list).for_display().aget(id=task_id)
+            except (ToDoList.DoesNotExist, ListItem.DoesNotExist):
+                raise Http404("No list or task matches the given query.")
+
+        return dashboard
+
 # To-Do List Model
 class ToDoList(models.Model): 
     """ Represents a To-Do list with name, and user
@@ -10,13 +256,203 @@ class ToDoList(models.Model):
     Attributes: 
         user(ForeignKey): The user that owns the To-Do List.  [1:* Relationship, a user can have multiple To-Do Lists]
         name(CharField): The name of the To-Do List that the user has specified, with a maximum length of 64 characters.
+        updated_at(DateTimeField): The last time the To-Do List has been saved.
+        item_count(PositiveIntegerField): The number of items in the To-Do List (denormalized).
+        completed_count(PositiveIntegerField): The number of completed items in the To-Do List (denormalized).
+        revision(PositiveBigIntegerField): The sync revision of the last change of the To-Do List.
+        deleted_at(DateTimeField): When the To-Do List has been deleted, its items are purged in the background.
     """
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # The (user, id) index below replaces the single column foreign key index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     name = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+    item_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    revision = models.PositiveBigIntegerField(default=0)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ToDoListManager()
+
+    class Meta:
+        indexes = [
+            # Side-bar and API: WHERE user_id = ? ORDER BY id
+            models.Index(fields=['user', 'id'], name='todolist_user_id_idx'),
+            # Sync: WHERE user_id = ? AND revision > ?
+            models.Index(fields=['user', 'revision'], name='todolist_user_revision_idx'),
+        ]
 
     def __str__(self): 
         return f"A To-Do List for the user: {self.user.username}, and title: {self.name}"
 
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'revision'}
+
+        with transaction.atomic():
+            self.revision = UserRevision.objects.allocate(self.user_id)
+            super().save(*args, **kwargs)
+
+        notify_dashboard_changed(sender=ToDoList, user_id=self.user_id, list_id=self.pk)
+
+    def delete(self, *args, **kwargs):
+        list_id = self.pk
+
+        with transaction.atomic():
+            revision = UserRevision.objects.allocate(self.user_id)
+            deleted = super().delete(*args, **kwargs)
+            Tombstone.objects.create(user_id=self.user_id, kind=Tombstone.LIST, object_id=list_id, revision=revision)
+
+        notify_dashboard_changed(sender=ToDoList, user_id=self.user_id, list_id=list_id)
+        return deleted
+
+    def soft_delete(self):
+        """
+        Brief: Deletes the list without deleting its items in the request.
+
+        Details: The list is hidden at once (see ToDoListQuerySet.owned_by) and reported as deleted
+                 to the syncing clients, then a purge_list job deletes its items in bounded batches
+                 and the list itself (see jobs.py). Deleting the items of a big list inline would
+                 hold the database write lock for as long as the cascade takes.
+        """
+        with transaction.atomic():
+            revision = UserRevision.objects.allocate(self.user_id)
+            self.deleted_at = timezone.now()
+            ToDoList.objects.filter(pk=self.pk).update(deleted_at=self.deleted_at, revision=revision)
+            Tombstone.objects.create(user_id=self.user_id, kind=Tombstone.LIST, object_id=self.pk, revision=revision)
+            Job.objects.enqueue('purge_list', list_id=self.pk)
+
+        notify_dashboard_changed(sender=ToDoList, user_id=self.user_id, list_id=self.pk)
+
+    def complete_all(self):
+        """ Marks every item of the list as completed in a single UPDATE statement, returns the number of changed items. """
+        with transaction.atomic():
+            revision = UserRevision.objects.allocate(self.user_id)
+            completed = self.listitem_set.filter(isCompleted=False).update(isCompleted=True, updated_at=timezone.now(), revision=revision)
+            ToDoList.objects.filter(pk=self.pk).adjust_counters(completed=completed, revision=revision)
+            notify_dashboard_changed(sender=ListItem, user_id=self.user_id, list_id=self.pk)
+        return completed
+
+    def reopen_all(self):
+        """ Marks every item of the list as not completed in a single UPDATE statement, returns the number of changed items. """
+        with transaction.atomic():
+            revision = UserRevision.objects.allocate(self.user_id)
+            reopened = self.listitem_set.filter(isCompleted=True).update(isCompleted=False, updated_at=timezone.now(), revision=revision)
+            ToDoList.objects.filter(pk=self.pk).adjust_counters(completed=-reopened, revision=revision)
+            notify_dashboard_changed(sender=ListItem, user_id=self.user_id, list_id=self.pk)
+        return reopened
+
+    def clear_completed(self):
+        """ Deletes the completed items of the list in a single DELETE statement, returns the number of deleted items. """
+        with transaction.atomic():
+            revision = UserRevision.objects.allocate(self.user_id)
+            completed_items = self.listitem_set.filter(isCompleted=True)
+            Tombstone.objects.bury(self.user_id, Tombstone.ITEM, completed_items.values_list('id', flat=True), revision)
+            deleted, _ = completed_items.delete()
+            ToDoList.objects.filter(pk=self.pk).adjust_counters(items=-deleted, completed=-deleted, revision=revision)
+            notify_dashboard_changed(sender=ListItem, user_id=self.user_id, list_id=self.pk)
+        return deleted
+
+# List Items QuerySet
+class ListItemQuerySet(models.QuerySet):
+    """ Query helpers for the list items used by the dashboard. """
+
+    def owned_by(self, user):
+        """ Restricts the queryset to the items whose list is owned by the given user and not deleted. """
+        return self.filter(list__user=user, list__deleted_at__isnull=True)
+
+    def for_list(self, todo_list):
+        """ Restricts the queryset to the items of the given list (instance or id). """
+        return self.filter(list_id=getattr(todo_list, 'pk', todo_list))
+
+    def for_mutation(self, *fields):
+        """ Trims the queryset to the given columns, joining the owner of the list so that saving or deleting an item does not re-fetch it. """
+        return self.select_related('list').only('id', 'list__user', *fields)
+
+    def for_display(self):
+        """ Trims the queryset to the columns rendered in the dashboard, in creation order. """
+        return self.only('id', 'list_id', 'text', 'isCompleted').order_by('id')
+
+    def toggle(self, revision):
+        """
+        Brief: Flips the status of every item of the queryset in a single UPDATE statement.
+
+        Details: Returns the number of toggled items and the change of the number of
+                 completed items (counted before the UPDATE, in the same transaction).
+
+        Args:
+            revision: The sync revision stamped on the toggled items.
+        """
+        with transaction.atomic():
+            counts = self.aggregate(total=Count('id'), completed=Count('id', filter=Q(isCompleted=True)))
+            toggled = self.update(
+                isCompleted=Case(When(isCompleted=True, then=Value(False)), default=Value(True)),
+                updated_at=timezone.now(),
+                revision=revision,
+            )
+        return toggled, counts['total'] - 2 * counts['completed']
+
+    def apply_batch(self, todo_list, create=(), update=(), toggle=(), delete=()):
+        """
+        Brief: Applies many item mutations on a To-Do list in a single transaction.
+
+        Details: New items are inserted with one bulk_create, the updated items are written
+                 with one bulk_update, and the toggled and deleted items with one set-based
+                 UPDATE and DELETE statement each. Ids that do not belong to the list are ignored.
+                 The whole batch is rolled back if any statement fails.
+
+        Args:
+            todo_list: The To-Do list the items belong to.
+            create: The texts of the items to create.
+            update: Dicts with the id of an item and its new "text" and/or "isCompleted".
+            toggle: Ids of the items whose status is flipped.
+            delete: Ids of the items to delete.
+        """
+        list_items = self.for_list(todo_list)
+        now = timezone.now()
+        result = {'created': [], 'updated': 0, 'toggled': 0, 'deleted': 0}
+
+        # Change of the list's item counters, written once at the end of the batch
+        items_delta = 0
+        completed_delta = 0
+
+        with transaction.atomic():
+            revision = UserRevision.objects.allocate(todo_list.user_id)
+
+            if create:
+                created_items = self.bulk_create(ListItem(list=todo_list, text=text, updated_at=now, revision=revision) for text in create)
+                result['created'] = [list_item.id for list_item in created_items]
+                items_delta += len(created_items)
+
+            if update:
+                changes = {change['id']: change for change in update}
+                updated_items = list(list_items.filter(id__in=changes).only('id', 'text', 'isCompleted'))
+                for list_item in updated_items:
+                    was_completed = list_item.isCompleted
+                    list_item.text = changes[list_item.id].get('text', list_item.text)
+                    list_item.isCompleted = changes[list_item.id].get('isCompleted', list_item.isCompleted)
+                    list_item.updated_at = now
+                    list_item.revision = revision
+                    completed_delta += list_item.isCompleted - was_completed
+                self.bulk_update(updated_items, ['text', 'isCompleted', 'updated_at', 'revision'], batch_size=500)
+                result['updated'] = len(updated_items)
+
+            if toggle:
+                result['toggled'], toggled_completed_delta = list_items.filter(id__in=toggle).toggle(revision)
+                completed_delta += toggled_completed_delta
+
+            if delete:
+                deleted_items = list_items.filter(id__in=delete)
+                deleted_statuses = dict(deleted_items.values_list('id', 'isCompleted'))
+                Tombstone.objects.bury(todo_list.user_id, Tombstone.ITEM, deleted_statuses, revision)
+                result['deleted'], _ = deleted_items.delete()
+                items_delta -= result['deleted']
+                completed_delta -= sum(deleted_statuses.values())
+
+            ToDoList.objects.filter(pk=todo_list.pk).adjust_counters(items=items_delta, completed=completed_delta, revision=revision)
+            notify_dashboard_changed(sender=ListItem, user_id=todo_list.user_id, list_id=todo_list.pk)
+
+        return result
+
 # List Items Class
 class ListItem(models.Model):
     """ Represents a List Item with a containing list, text and status
@@ -25,11 +461,192 @@ class ListItem(models.Model):
         list(ForeignKey): The ToDo list that this item lies in.  [1:* Relationship, a ToDo List can have multiple ListItems]
         text(CharField): Description of a task or a To-Do list item, with a maximum length of 100 characters.
         isCompleted(BooleanField): Whether the task is completed or not.
+        updated_at(DateTimeField): The last time the task has been saved.
+        revision(PositiveBigIntegerField): The sync revision of the last change of the task.
     """
-    list = models.ForeignKey(ToDoList, on_delete=models.CASCADE)
+    # The (list, id) index below replaces the single column foreign key index
+    list = models.ForeignKey(ToDoList, on_delete=models.CASCADE, db_index=False)
     text = models.CharField(max_length=100)
     isCompleted = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    revision = models.PositiveBigIntegerField(default=0)
+
+    objects = ListItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Items of a list and keyset pages: WHERE list_id = ? [AND id > ?] ORDER BY id
+            models.Index(fields=['list', 'id'], name='listitem_list_id_idx'),
+            # List operations, counters and status filters: WHERE list_id = ? AND isCompleted = ? [ORDER BY id]
+            models.Index(fields=['list', 'isCompleted', 'id'], name='listitem_list_completed_idx'),
+            # Sync: WHERE list_id = ? AND revision > ?
+            models.Index(fields=['list', 'revision'], name='listitem_list_revision_idx'),
+        ]
 
     def __str__(self):
         return f"A list item in the {self.list.name} list, of title {self.text} and status {self.isCompleted}" 
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        list_item = super().from_db(db, field_names, values)
+
+        # Keep the stored status to maintain the completed counter of the list on save (None when deferred)
+        list_item._stored_isCompleted = list_item.__dict__.get('isCompleted')
+        return list_item
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'revision'}
+
+        with transaction.atomic():
+            self.revision = UserRevision.objects.allocate(self.list.user_id)
+
+            if adding:
+                items_delta, completed_delta = 1, int(self.isCompleted)
+            elif update_fields is not None and 'isCompleted' not in update_fields:
+                items_delta, completed_delta = 0, 0
+            else:
+                stored_isCompleted = getattr(self, '_stored_isCompleted', None)
+                if stored_isCompleted is None:
+                    stored_isCompleted = ListItem.objects.filter(pk=self.pk).values_list('isCompleted', flat=True).first()
+                items_delta, completed_delta = 0, int(self.isCompleted) - int(bool(stored_isCompleted))
+
+            super().save(*args, **kwargs)
+            ToDoList.objects.filter(pk=self.list_id).adjust_counters(items=items_delta, completed=completed_delta, revision=self.revision)
+
+        self._stored_isCompleted = self.isCompleted
+        notify_dashboard_changed(sender=ListItem, user_id=self.list.user_id, list_id=self.list_id)
+
+    def delete(self, *args, **kwargs):
+        was_completed = self.isCompleted
+
+        with transaction.atomic():
+            revision = UserRevision.objects.allocate(self.list.user_id)
+            Tombstone.objects.create(user_id=self.list.user_id, kind=Tombstone.ITEM, object_id=self.pk, revision=revision)
+            deleted = super().delete(*args, **kwargs)
+            ToDoList.objects.filter(pk=self.list_id).adjust_counters(items=-1, completed=-int(was_completed), revision=revision)
+
+        notify_dashboard_changed(sender=ListItem, user_id=self.list.user_id, list_id=self.list_id)
+        return deleted
+
+# Background Job QuerySet
+class JobQuerySet(models.QuerySet):
+    """ The queue of the background jobs, stored in the database so it needs no broker. """
+
+    def claim(self, limit=1, lock_seconds=300):
+        """
+        Brief: Locks up to limit due jobs for the calling worker and returns them.
+
+        Details: A job is due when it is queued and its run_after date has passed, or when it is
+                 running but its lock has expired (its worker died). The jobs are locked with a
+                 conditional UPDATE tagging them with a new lock token, so two workers never claim
+                 the same job, on SQLite as well as on PostgreSQL. The lock expires after
+                 lock_seconds, the job is then claimed again by another worker.
+
+        Args:
+            limit: The maximum number of claimed jobs.
+            lock_seconds: How long the claimed jobs stay invisible to the other workers.
+        """
+        now = timezone.now()
+        due = Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now)
+        job_ids = list(self.filter(due).order_by('run_after', 'id').values_list('id', flat=True)[:limit])
+        if not job_ids:
+            return []
+
+        lock_token = uuid.uuid4().hex
+        self.filter(due, id__in=job_ids).update(
+            status=Job.RUNNING,
+            lock_token=lock_token,
+            locked_until=now + timedelta(seconds=lock_seconds),
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+        return list(self.filter(lock_token=lock_token).order_by('run_after', 'id'))
+
+    def release(self):
+        """ Puts the claimed jobs of the queryset back in the queue without counting an attempt, when a worker stops before running them. """
+        return self.filter(status=Job.RUNNING).update(
+            status=Job.QUEUED, lock_token='', locked_until=None, attempts=F('attempts') - 1, updated_at=timezone.now(),
+        )
+
+    def extend_locks(self, lock_seconds=300):
+        """ Pushes back the end of the locks of the running jobs in the queryset (worker heartbeat), in a single UPDATE statement. """
+        now = timezone.now()
+        return self.filter(status=Job.RUNNING).update(locked_until=now + timedelta(seconds=lock_seconds), updated_at=now)
+
+# Background Job Manager
+class JobManager(models.Manager.from_queryset(JobQuerySet)):
+    """ Default manager of the background jobs, exposes the enqueue method. """
+
+    def enqueue(self, kind, run_after=None, max_attempts=5, **payload):
+        """ Queues a job of the given kind (see jobs.py), its payload is passed to the job's handler as keyword arguments. """
+        return self.create(kind=kind, payload=payload, run_after=run_after or timezone.now(), max_attempts=max_attempts)
+
+# Background Job Model
+class Job(models.Model):
+    """ Represents a unit of work run outside of the requests by a worker.
+
+    Attributes:
+        kind(CharField): Name of the handler running the job (see jobs.py).
+        payload(JSONField): Keyword arguments of the handler.
+        status(CharField): Whether the job is queued, running, done or has failed for good.
+        attempts(PositiveIntegerField): Number of times the job has been claimed.
+        max_attempts(PositiveIntegerField): Number of attempts after which a failing job is given up.
+        run_after(DateTimeField): The job is not run before this date (retries are delayed).
+        locked_until(DateTimeField): End of the lock of a running job, other workers claim it again after.
+        lock_token(CharField): Token of the claim of the worker running the job.
+        last_error(TextField): The error of the last failed attempt.
+        created_at(DateTimeField): When the job has been queued.
+        updated_at(DateTimeField): The last time the job has changed.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    lock_token = models.CharField(max_length=32, blank=True, db_index=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = JobManager()
+
+    class Meta:
+        indexes = [
+            # Claim: WHERE status = ? AND run_after <= ? ORDER BY run_after, id
+            models.Index(fields=['status', 'run_after', 'id'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"A {self.status} {self.kind} job, attempt {self.attempts} of {self.max_attempts}"
+
+    def complete(self):
+        """ Marks the job as done, unless its lock has expired and another worker has claimed it. """
+        return Job.objects.filter(pk=self.pk, lock_token=self.lock_token).update(status=Job.DONE, locked_until=None, updated_at=timezone.now())
+
+    def fail(self, error, retry_delay=60):
+        """
+        Brief: Records a failed attempt of the job.
+
+        Details: The job is queued again after retry_delay seconds, or marked as failed
+                 once it has been attempted max_attempts times.
+
+        Args:
+            error: The error of the attempt.
+            retry_delay: Seconds before the job is retried.
+        """
+        now = timezone.now()
+        status = Job.FAILED if self.attempts >= self.max_attempts else Job.QUEUED
+        return Job.objects.filter(pk=self.pk, lock_token=self.lock_token).update(
+            status=status, locked_until=None, run_after=now + timedelta(seconds=retry_delay), last_error=str(error), updated_at=now,
+        )
@@ -0,0 +1,83 @@
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+class KeysetPage:
+    """ A page of a queryset selected with a keyset cursor on the primary key.
+
+    The page is WHERE id > after ORDER BY id LIMIT limit + 1: its cost does not depend on its
+    position, and the extra row tells if a next page exists. The query only runs when the page
+    is first iterated, so a page rendered inside a cached template fragment costs nothing on a hit.
+    With an until cursor the page ends at that row instead (still at most limit rows), so a client
+    can re-fetch every row it has already loaded, page after page, with one query.
+
+    Attributes:
+        after(int): Id of the last row of the previous page, 0 for the first page.
+        limit(int): The maximum number of rows of the page.
+        until(int): Id of the last row of the page, None to end it after limit rows.
+    """
+
+    def __init__(self, queryset, after=0, limit=50, until=None):
+        self.queryset = queryset
+        self.after = after
+        self.limit = limit
+        self.until = until
+
+    def page_queryset(self):
+        rows = self.queryset.filter(id__gt=self.after).order_by('id')
+        if self.until is not None:
+            # The rows up to the until cursor, and the first row after it telling if a next page exists
+            next_row = self.queryset.filter(id__gt=self.until).order_by('id').values('id')[:1]
+            rows = rows.filter(Q(id__lte=self.until) | Q(id__in=next_row))
+        return rows[:self.limit + 1]
+
+    @cached_property
+    def fetched_rows(self):
+        return list(self.page_queryset())
+
+    async def afetch(self):
+        """ Runs the query of the page with async iteration, so it can be rendered without blocking. """
+        if 'fetched_rows' not in self.__dict__:
+            self.__dict__['fetched_rows'] = [row async for row in self.page_queryset()]
+
+        return self
+
+    @cached_property
+    def rows(self):
+        """ The rows of the page (model instances or dicts, depending on the queryset). """
+        rows = self.fetched_rows[:self.limit]
+        if self.until is not None:
+            rows = [row for row in rows if row_id(row) <= self.until]
+        return rows
+
+    @property
+    def has_next(self):
+        """ Whether rows exist after this page. """
+        return len(self.fetched_rows) > len(self.rows)
+
+    @property
+    def next_cursor(self):
+        """ The cursor of the next page (id of the last row of this page), None on the last page. """
+        if not self.has_next:
+            return None
+
+        return row_id(self.rows[-1])
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+def row_id(row):
+    """ Returns the primary key of a row (model instance or dict). """
+    return row['id'] if isinstance(row, dict) else row.id
+
+def parse_cursor(value):
+    """ Returns the keyset cursor sent in a query parameter, 0 (first page) if it is missing or malformed. """
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,181 @@
+import cProfile
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from .metrics import form_type_label, view_label
+
+# Opt-in request profiling: with PROFILING_ENABLED on, ProfilingMiddleware profiles a random
+# PROFILING_SAMPLE_RATE share of the requests, and every request carrying a valid signed
+# X-Todo-Profile header (see profile_token). Each profiled request leaves one file in PROFILING_DIR,
+# named <time>__<view>__<form_type>.<ext>:
+#   'cprofile': a pstats dump (.prof) of every function called by the request's thread,
+#   'sampler': the request's thread stack sampled every PROFILING_SAMPLE_INTERVAL seconds, as
+#              collapsed stacks (.collapsed) ready for flamegraph.pl or speedscope.
+# `manage.py profile_report` aggregates the files into a hot-function report. Only the thread of
+# the request is profiled, the work handed to other threads (e.g. the password hashing pool) shows
+# as the wait for its result. One request is profiled at a time per process, the others that
+# should have been are served unprofiled.
+
+# Header asking for the profile of a request, its value is a token returned by profile_token
+PROFILE_HEADER = 'X-Todo-Profile'
+
+PROFILE_TOKEN_SALT = 'todo_list_app.profiling'
+
+# File extension of each profiler's dumps
+PROFILE_EXTENSIONS = {
+    'cprofile': '.prof',
+    'sampler': '.collapsed',
+}
+
+# Only one request of the process is profiled at a time
+profiling_lock = threading.Lock()
+profile_counter = itertools.count()
+
+def profile_token():
+    """ Returns a value of the X-Todo-Profile header, valid for PROFILING_TOKEN_MAX_AGE seconds. """
+    return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).sign('profile')
+
+def is_valid_profile_token(token):
+    try:
+        return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE) == 'profile'
+    except signing.BadSignature:
+        return False
+
+def frame_name(frame):
+    """ Returns the module.qualified_name of the function of a frame. """
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}"
+
+class CProfileRecorder:
+    """ Profiles the calling thread with cProfile, dumped as pstats. """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def dump(self, path):
+        self.profiler.dump_stats(path)
+
+class SamplingRecorder:
+    """ Samples the stack of the calling thread from a background thread, dumped as collapsed stacks.
+
+    Attributes:
+        interval(float): Seconds between two samples.
+        stacks(Counter): Number of samples of each collapsed stack (root first, separated by ';').
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread_id = threading.get_ident()
+        self.stopping = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, name="profile-sampler", daemon=True)
+
+    def sample(self):
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self.sampler.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.sampler.join()
+
+    def dump(self, path):
+        with open(path, 'w') as dump_file:
+            for stack, count in self.stacks.most_common():
+                dump_file.write(f"{stack} {count}\n")
+
+def create_recorder():
+    if settings.PROFILER == 'sampler':
+        return SamplingRecorder(settings.PROFILING_SAMPLE_INTERVAL)
+    return CProfileRecorder()
+
+def profile_path(request):
+    """ Returns the path of the dump of a profiled request, tagged with its view and form_type. """
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(profile_counter)}"
+    file_name = f"{stamp}__{view_label(request)}__{form_type_label(request) or '-'}{PROFILE_EXTENSIONS[settings.PROFILER]}"
+    return os.path.join(settings.PROFILING_DIR, file_name)
+
+class ProfilingMiddleware:
+    """
+    Brief: Profiles the sampled requests and the requests asking for it with a signed header.
+
+    Details: Removed from the chain unless PROFILING_ENABLED is on. The response of a profiled
+             request carries the name of its dump in its X-Todo-Profile header. Under ASGI the
+             event loop thread is profiled, it may also run the other requests' coroutines.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def should_profile(self, request):
+        token = request.headers.get(PROFILE_HEADER)
+        if token:
+            return is_valid_profile_token(token)
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def save_profile(self, request, response, recorder):
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        path = profile_path(request)
+        recorder.dump(path)
+        response[PROFILE_HEADER] = os.path.basename(path)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not self.should_profile(request) or not profiling_lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            recorder = create_recorder()
+            recorder.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                recorder.stop()
+            return self.save_profile(request, response, recorder)
+        finally:
+            profiling_lock.release()
+
+    async def __acall__(self, request):
+        if not self.should_profile(request) or not profiling_lock.acquire(blocking=False):
+            return await self.get_response(request)
+
+        try:
+            recorder = create_recorder()
+            recorder.start()
+            try:
+                response = await self.get_response(request)
+            finally:
+                recorder.stop()
+            return self.save_profile(request, response, recorder)
+        finally:
+            profiling_lock.release()
@@ -0,0 +1,110 @@
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.dispatch import receiver
+from .dashboard_cache import get_dashboard_cache
+from .signals import dashboard_changed
+
+# Read replica: the read-only requests (GET, HEAD) read the lists, items and users from the
+# READ_REPLICA_ALIAS database. Everything else stays on 'default': the writes, the reads of the
+# other requests and of the background jobs, the sessions and the cache table. A user whose data
+# has just changed reads from 'default' for REPLICA_PIN_SECONDS, so the replication lag never hides
+# their own writes (read-your-writes): the browser that wrote is pinned with a cookie, the user's
+# other devices through a key of the dashboard cache (shared by the worker processes). The pages
+# rendered from the replica may still lag behind once the pin has expired: they are neither stored
+# in the fragment cache nor sent with an ETag, so a stale render is never served again.
+
+# Apps whose models are read from the replica
+REPLICA_APPS = frozenset(['todo_list_app', 'auth'])
+
+# Cookie pinning the browser that has just sent a write to the primary
+PRIMARY_PIN_COOKIE = 'todo_primary_pin'
+
+# Cache key pinning a user whose data has just changed to the primary
+PRIMARY_PIN_KEY = "todo_list_app:primary_pin:{user_id}"
+
+# Whether the current request may read from the replica, set by ReplicaRoutingMiddleware
+use_replica = ContextVar('use_replica', default=False)
+
+class ReplicaRouter:
+    """ Routes the reads of the read-only requests to the read replica, and every write to the primary. """
+
+    def db_for_read(self, model, **hints):
+        if settings.READ_REPLICA_ALIAS and use_replica.get() and model._meta.app_label in REPLICA_APPS:
+            return settings.READ_REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+def reads_from_replica():
+    """ Whether the current request reads from the read replica, so its response may be older than the primary. """
+    return bool(settings.READ_REPLICA_ALIAS) and use_replica.get()
+
+def primary_pin_key(user_id):
+    return PRIMARY_PIN_KEY.format(user_id=user_id)
+
+@receiver(dashboard_changed)
+def pin_user_to_primary(sender, user_id, **kwargs):
+    """ Sends the reads of a user whose data has changed to the primary until the replica has caught up. """
+    if settings.READ_REPLICA_ALIAS:
+        get_dashboard_cache().set(primary_pin_key(user_id), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+class ReplicaRoutingMiddleware:
+    """
+    Brief: Decides whether a request reads from the read replica.
+
+    Details: Only the GET and HEAD requests of a browser and a user that have not written in the
+             last REPLICA_PIN_SECONDS use the replica. The responses to the other requests pin
+             the browser to the primary with a cookie. Must be placed after SessionMiddleware,
+             the id of the logged in user is read from the session.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def is_read_only(self, request):
+        return request.method in ('GET', 'HEAD') and PRIMARY_PIN_COOKIE not in request.COOKIES
+
+    def pin_browser(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(PRIMARY_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not settings.READ_REPLICA_ALIAS:
+            return self.get_response(request)
+
+        token = use_replica.set(self.is_read_only(request))
+        try:
+            user_id = request.session.get(SESSION_KEY) if use_replica.get() else None
+            if user_id and get_dashboard_cache().get(primary_pin_key(user_id)):
+                use_replica.set(False)
+            return self.pin_browser(request, self.get_response(request))
+        finally:
+            use_replica.reset(token)
+
+    async def __acall__(self, request):
+        if not settings.READ_REPLICA_ALIAS:
+            return await self.get_response(request)
+
+        token = use_replica.set(self.is_read_only(request))
+        try:
+            user_id = await request.session.aget(SESSION_KEY) if use_replica.get() else None
+            if user_id and await get_dashboard_cache().aget(primary_pin_key(user_id)):
+                use_replica.set(False)
+            return self.pin_browser(request, await self.get_response(request))
+        finally:
+            use_replica.reset(token)
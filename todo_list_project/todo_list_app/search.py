@@ -0,0 +1,167 @@
+from django.db import connection, connections, router
+
+# Full-text index of the list items (SQLite FTS5 external content table over todo_list_app_listitem)
+FTS_TABLE = "todo_list_app_listitem_fts"
+
+# The triggers keep the index in sync with every write, including the bulk and set-based ones
+FTS_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON todo_list_app_listitem BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON todo_list_app_listitem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF text ON todo_list_app_listitem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+)
+
+# FTS5 support of each database alias, checked once per process
+fts_support = {}
+
+def fts_available(db_connection=connection):
+    """ Whether the database is SQLite compiled with the FTS5 extension. """
+    if db_connection.vendor != 'sqlite':
+        return False
+
+    if db_connection.alias not in fts_support:
+        with db_connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            fts_support[db_connection.alias] = bool(cursor.fetchone()[0])
+
+    return fts_support[db_connection.alias]
+
+def install_fts_index(db_connection=connection):
+    """
+    Brief: Creates the full-text index of the list items and its synchronization triggers.
+
+    Details: The statements are idempotent. SQLite drops the triggers when a migration rebuilds
+             the items table, so this also runs after every migrate (see apps.py); a newly
+             created index is filled from the existing items. Does nothing without FTS5.
+
+    Args:
+        db_connection: The database connection.
+    """
+    if not fts_available(db_connection):
+        return
+
+    with db_connection.cursor() as cursor:
+        table_names = db_connection.introspection.table_names(cursor)
+        if 'todo_list_app_listitem' not in table_names:
+            return
+
+        table_exists = FTS_TABLE in table_names
+        if not table_exists:
+            cursor.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(text, content='todo_list_app_listitem', content_rowid='id')")
+
+        for trigger in FTS_TRIGGERS:
+            cursor.execute(trigger)
+
+        if not table_exists:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+def uninstall_fts_index(db_connection=connection):
+    """ Drops the full-text index of the list items and its triggers. """
+    if db_connection.vendor != 'sqlite':
+        return
+
+    with db_connection.cursor() as cursor:
+        for trigger_suffix in ('insert', 'delete', 'update'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger_suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+def fts_match_expression(query):
+    """ Turns a user query into an FTS5 expression: every word is a quoted prefix term, all of them must match. """
+    terms = query.split()
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+class SearchPage:
+    """ A page of ranked search results.
+
+    Attributes:
+        results(list): The matching ListItems, with a list_name attribute.
+        page(int): The page number, starting at 1.
+        has_next(bool): Whether a next page of results exists.
+    """
+
+    def __init__(self, results, page, has_next):
+        self.results = results
+        self.page = page
+        self.has_next = has_next
+
+    @property
+    def next_page(self):
+        return self.page + 1 if self.has_next else None
+
+    @property
+    def previous_page(self):
+        return self.page - 1 if self.page > 1 else None
+
+def search_items(user, query, page=1, page_size=20):
+    """
+    Brief: Searches the text of all the items owned by a user.
+
+    Details: On SQLite with FTS5 the items are matched through the full-text index and
+             ranked by bm25 relevance; other backends fall back to an icontains filter per
+             word, ordered by id. FTS5 is checked on the database the items are read from,
+             which is the read replica for the read-only requests. The index is shared by
+             all the users: the MATCH still walks the rows of every user containing the
+             words, only the user's live items are ranked, sorted and joined (letting FTS5
+             probe each of the user's ids instead is far slower). Results are paginated by
+             page number, since a relevance order has no stable keyset.
+
+    Args:
+        user: The logged in user.
+        query: The words to search for.
+        page: The page number, starting at 1.
+        page_size: The maximum number of results per page.
+    """
+    from .models import ListItem
+
+    page = max(page, 1)
+    offset = (page - 1) * page_size
+
+    if not query.split():
+        return SearchPage([], page, False)
+
+    using = router.db_for_read(ListItem)
+    if fts_available(connections[using]):
+        # +rowid keeps the MATCH as the index scan and filters it with the user's ids
+        results = list(ListItem.objects.raw(
+            f"""
+            SELECT item.id, item.list_id, item.text, item."isCompleted", todo_list.name AS list_name
+            FROM (
+                SELECT rowid AS item_id, bm25({FTS_TABLE}) AS rank FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s AND +rowid IN (
+                    SELECT user_item.id FROM todo_list_app_listitem AS user_item
+                    JOIN todo_list_app_todolist AS user_list ON user_list.id = user_item.list_id
+                    WHERE user_list.user_id = %s AND user_list.deleted_at IS NULL
+                )
+            ) AS matches
+            JOIN todo_list_app_listitem AS item ON item.id = matches.item_id
+            JOIN todo_list_app_todolist AS todo_list ON todo_list.id = item.list_id
+            ORDER BY matches.rank, item.id
+            LIMIT %s OFFSET %s
+            """,
+            [fts_match_expression(query), user.pk, page_size + 1, offset],
+            using=using,
+        ))
+    else:
+        list_items = ListItem.objects.owned_by(user)
+        for term in query.split():
+            list_items = list_items.filter(text__icontains=term)
+        results = list(
+            list_items.select_related('list').only('id', 'list_id', 'text', 'isCompleted', 'list__name')
+            .order_by('id')[offset:offset + page_size + 1]
+        )
+        for list_item in results:
+            list_item.list_name = list_item.list.name
+
+    return SearchPage(results[:page_size], page, len(results) > page_size)
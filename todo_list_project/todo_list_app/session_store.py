@@ -0,0 +1,166 @@
+import atexit
+import logging
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.db import connections, router
+
+# Cached sessions (SESSION_ENGINE = 'todo_list_app.session_store', opt-in with a shared cache): the
+# requests read their session from the SESSION_CACHE_ALIAS cache, the database is only read when the
+# session has been evicted from the cache. A new session (login, cycle_key) is written to the database
+# at once. The later changes of a session are written to the cache at once and to the database behind:
+# the pending rows of the process are updated together, with one query, by a timer
+# SESSION_WRITE_BEHIND_SECONDS after the oldest was queued (or as soon as SESSION_WRITE_BEHIND_MAX_PENDING
+# rows are waiting), and at exit. A killed process loses the database writes of its last
+# SESSION_WRITE_BEHIND_SECONDS, the shared cache still serves them until the sessions are evicted.
+# The pending writes only ever UPDATE rows, so a session deleted meanwhile (logout) stays deleted.
+# The rows queued for a database that has since been replaced (a destroyed test database) are dropped.
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "todo_list_app.session_store"
+
+class PendingSessionWrites:
+    """ The session rows of the process waiting to be written to the database, shared by its threads.
+
+    Attributes:
+        sessions(dict): Session model instances to update, by session key.
+        database(tuple): Alias and name of the database the sessions were queued for.
+        timer(Timer): Thread flushing the pending rows once the oldest is due, None when none is waiting.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.database = None
+        self.timer = None
+
+    def current_database(self, model):
+        using = router.db_for_write(model)
+        return using, connections[using].settings_dict['NAME']
+
+    def start_timer(self):
+        """ Schedules the flush of the pending rows, unless it is already scheduled. Called with the lock held. """
+        if self.timer is None:
+            self.timer = threading.Timer(settings.SESSION_WRITE_BEHIND_SECONDS, self.flush_from_timer)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def add(self, session):
+        """ Queues the row of a session, replacing its previous pending row. Returns whether the pending rows are due for a flush. """
+        database = self.current_database(type(session))
+        with self.lock:
+            if database != self.database:
+                self.sessions.clear()
+                self.database = database
+            self.sessions[session.session_key] = session
+            self.start_timer()
+            return len(self.sessions) >= settings.SESSION_WRITE_BEHIND_MAX_PENDING
+
+    def discard(self, session_key):
+        """ Drops the pending row of a deleted session. """
+        with self.lock:
+            self.sessions.pop(session_key, None)
+
+    def flush(self):
+        """
+        Brief: Writes the pending rows to the database with one bulk UPDATE.
+
+        Details: The rows of the sessions deleted meanwhile match nothing and are dropped. If the
+                 update fails, the rows are queued again (unless a newer row has been queued since)
+                 for the next timer and the error is logged, the request that triggered the flush
+                 is not failed.
+                 Returns the number of updated rows.
+        """
+        with self.lock:
+            sessions, database, self.sessions = self.sessions, self.database, {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not sessions:
+            return 0
+
+        model = type(next(iter(sessions.values())))
+        if database != self.current_database(model):
+            return 0
+
+        using, _ = database
+
+        try:
+            return model.objects.using(using).bulk_update(sessions.values(), ['session_data', 'expire_date'])
+        except Exception:
+            logger.exception("Writing %s pending sessions to the database failed.", len(sessions))
+            with self.lock:
+                for session_key, session in sessions.items():
+                    self.sessions.setdefault(session_key, session)
+                self.start_timer()
+            return 0
+
+    def flush_from_timer(self):
+        """ Flushes the pending rows from the timer thread, then closes the database connections it opened. """
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+pending_session_writes = PendingSessionWrites()
+atexit.register(pending_session_writes.flush)
+
+class SessionStore(CachedDBStore):
+    """ A cached_db session store whose changes to existing sessions are written behind to the database. """
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        # Set once this store has created the session row, its later saves are then written through
+        self._created = False
+
+    def create(self):
+        super().create()
+        self._created = True
+
+    async def acreate(self):
+        await super().acreate()
+        self._created = True
+
+    def writes_behind(self, must_create):
+        """ Whether a save only goes to the cache, a new session (or one created by this request, e.g. at login) is written through. """
+        return settings.SESSION_WRITE_BEHIND_SECONDS > 0 and not must_create and not self._created and self.session_key is not None
+
+    def save(self, must_create=False):
+        if not self.writes_behind(must_create):
+            return super().save(must_create)
+
+        data = self._get_session()
+        try:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+        except Exception:
+            logger.exception("Error saving to cache (%s), writing the session through.", self._cache)
+            return super().save(must_create)
+
+        if pending_session_writes.add(self.create_model_instance(data)):
+            pending_session_writes.flush()
+
+    async def asave(self, must_create=False):
+        if not self.writes_behind(must_create):
+            return await super().asave(must_create)
+
+        data = await self._aget_session()
+        try:
+            await self._cache.aset(await self.acache_key(), data, await self.aget_expiry_age())
+        except Exception:
+            logger.exception("Error saving to cache (%s), writing the session through.", self._cache)
+            return await super().asave(must_create)
+
+        if pending_session_writes.add(await self.acreate_model_instance(data)):
+            await sync_to_async(pending_session_writes.flush)()
+
+    def delete(self, session_key=None):
+        pending_session_writes.discard(session_key or self.session_key)
+        super().delete(session_key)
+
+    async def adelete(self, session_key=None):
+        pending_session_writes.discard(session_key or self.session_key)
+        await super().adelete(session_key)
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.dispatch import Signal, receiver
+from .dashboard_cache import bump_dashboard_version
+
+# Sent once the data rendered in a user's dashboard has changed (and the change is committed).
+# Arguments: user_id, list_id (the changed or deleted list)
+dashboard_changed = Signal()
+
+def notify_dashboard_changed(sender, user_id, list_id=None):
+    """
+    Brief: Sends the dashboard_changed signal for a user once the current transaction commits.
+
+    Details: Deferring the signal to the commit prevents a concurrent request from caching
+             the not yet committed state under the new version. Outside of a transaction
+             the signal is sent immediately.
+
+    Args:
+        sender: The model class that has changed.
+        user_id: Id of the user owning the changed data.
+        list_id: Id of the changed list, None if unknown.
+    """
+    transaction.on_commit(lambda: dashboard_changed.send(sender=sender, user_id=user_id, list_id=list_id))
+
+@receiver(dashboard_changed)
+def invalidate_dashboard_fragments(sender, user_id, **kwargs):
+    """ Invalidates the cached dashboard fragments of the user by bumping its version. """
+    bump_dashboard_version(user_id)
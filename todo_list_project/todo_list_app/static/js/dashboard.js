@@ -30,6 +30,202 @@ if (document.getElementById('new-list-btn-main')) {
     });
 }
 
+// Toggle the multi-select mode of the tasks list
+if (document.getElementById('multi-select-btn')) {
+    document.getElementById('multi-select-btn').addEventListener('click', function() {
+        document.getElementById('batch-form').classList.toggle('hidden');
+        document.querySelectorAll('.batch-select').forEach(function(checkbox) {
+            checkbox.classList.toggle('hidden');
+        });
+    });
+
+    // Select or unselect all the tasks
+    document.getElementById('batch-select-all').addEventListener('change', function() {
+        const selectAll = this.checked;
+        document.querySelectorAll('.batch-select').forEach(function(checkbox) {
+            checkbox.checked = selectAll;
+        });
+    });
+}
+
+// Show the checkboxes of the rows added to the page while the multi-select mode is on
+function syncBatchSelection() {
+    const batchForm = document.getElementById('batch-form');
+    if (batchForm && !batchForm.classList.contains('hidden')) {
+        document.querySelectorAll('.batch-select').forEach(function(checkbox) {
+            checkbox.classList.remove('hidden');
+        });
+    }
+}
+
+// Swap the elements of a partial response in the page by id: replace the existing ones,
+// remove the data-removed ones and append the new task rows (once every page of tasks is loaded)
+function swapFragments(html) {
+    const template = document.createElement('template');
+    template.innerHTML = html.trim();
+    const taskList = document.getElementById('task-list');
+
+    Array.from(template.content.children).forEach(function(fragment) {
+        const current = document.getElementById(fragment.id);
+        if (fragment.hasAttribute('data-removed')) {
+            if (current) {
+                current.remove();
+            }
+        } else if (current) {
+            current.replaceWith(fragment);
+        } else if (taskList && !document.getElementById('load-more-tasks')) {
+            taskList.appendChild(fragment);
+        }
+    });
+    syncBatchSelection();
+    feather.replace();
+}
+
+// Versions of the dashboard produced by this page, their live update events are ignored
+const ownDashboardVersions = new Set();
+
+// Add, toggle and delete the tasks in place, the forms still post and redirect without JavaScript
+document.addEventListener('submit', function(event) {
+    const form = event.target;
+    if (!form.matches('form[data-fragment]')) {
+        return;
+    }
+
+    event.preventDefault();
+    fetch(form.action, {
+        method: 'POST',
+        body: new FormData(form),
+        headers: { 'X-Requested-With': 'XMLHttpRequest' }
+    })
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error('Could not update the task');
+            }
+            ownDashboardVersions.add(response.headers.get('X-Dashboard-Version'));
+            return response.text();
+        })
+        .then(function(html) {
+            swapFragments(html);
+            if (form.querySelector('input[name="list_item_text"]')) {
+                form.reset();
+            }
+        })
+        .catch(function() {
+            form.submit();
+        });
+});
+
+// Load the next page of tasks in place, the "Load more" link stays a plain link without JavaScript
+document.addEventListener('click', function(event) {
+    const loadMoreLink = event.target.closest('#load-more-tasks');
+    if (!loadMoreLink) {
+        return;
+    }
+
+    event.preventDefault();
+    fetch(loadMoreLink.href, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error('Could not load the next tasks');
+            }
+            return response.text();
+        })
+        .then(function(html) {
+            loadMoreLink.insertAdjacentHTML('afterend', html);
+            loadMoreLink.remove();
+
+            // Keep the new rows consistent with the multi-select mode
+            syncBatchSelection();
+            feather.replace();
+        })
+        .catch(function() {
+            window.location.href = loadMoreLink.href;
+        });
+});
+
+// Live updates: refresh the side-bar and the open list in place when they change in an other tab or device
+function fetchFragment(url, fragment) {
+    return fetch(url + '?fragment=' + fragment, { headers: { 'X-Requested-With': 'XMLHttpRequest' } });
+}
+
+function refreshSidebar() {
+    const sidebarLists = document.getElementById('sidebar-lists');
+    const url = document.body.dataset.currentListUrl || document.body.dataset.dashboardUrl;
+    fetchFragment(url, 'sidebar')
+        .then(function(response) {
+            if (response.ok) {
+                return response.text().then(function(html) {
+                    sidebarLists.innerHTML = html;
+                });
+            }
+        });
+}
+
+// Re-fetch every task loaded so far (up to the cursor of the "Load more" link, or the last task row),
+// so the pages loaded with "Load more" and the scroll position are kept
+function loadedTasksCursor(taskList) {
+    const loadMoreLink = document.getElementById('load-more-tasks');
+    if (loadMoreLink) {
+        return new URL(loadMoreLink.href).searchParams.get('after');
+    }
+    const taskCheckboxes = taskList.querySelectorAll('.batch-select');
+    return taskCheckboxes.length ? taskCheckboxes[taskCheckboxes.length - 1].value : null;
+}
+
+function refreshTasks() {
+    const taskList = document.getElementById('task-list');
+    const cursor = loadedTasksCursor(taskList);
+    let url = document.body.dataset.currentListUrl + '?fragment=tasks';
+    if (cursor) {
+        url += '&until=' + cursor;
+    }
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(function(response) {
+            // The open list has been deleted
+            if (response.status === 404) {
+                window.location.href = document.body.dataset.dashboardUrl;
+                return;
+            }
+            if (response.ok) {
+                return response.text().then(function(html) {
+                    taskList.innerHTML = html;
+                    syncBatchSelection();
+                    feather.replace();
+                });
+            }
+        });
+}
+
+if (window.EventSource && document.body.dataset.eventsUrl) {
+    const currentListUrl = document.body.dataset.currentListUrl;
+    const currentListId = currentListUrl ? currentListUrl.split('/').filter(Boolean).pop() : null;
+    let pendingLists = null;
+    let refreshTimer = null;
+
+    // Changes often come in bursts, refresh at most once per burst
+    new EventSource(document.body.dataset.eventsUrl).addEventListener('dashboard', function(event) {
+        // The page has already been updated with the response of its own change
+        if (ownDashboardVersions.delete(event.lastEventId)) {
+            return;
+        }
+
+        const listId = JSON.parse(event.data).list_id;
+        pendingLists = pendingLists || new Set();
+        pendingLists.add(listId === null ? null : String(listId));
+
+        clearTimeout(refreshTimer);
+        refreshTimer = setTimeout(function() {
+            const changedLists = pendingLists;
+            pendingLists = null;
+
+            refreshSidebar();
+            if (currentListId && (changedLists.has(null) || changedLists.has(currentListId))) {
+                refreshTasks();
+            }
+        }, 250);
+    });
+}
+
 AOS.init({
     duration: 800,
     easing: 'ease-in-out',
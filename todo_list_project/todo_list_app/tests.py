@@ -1,8 +1,41 @@
-from django.test import TestCase, Client
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, Client, AsyncClient, RequestFactory, override_settings
+from django.conf import settings
+from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
 from django.urls import reverse
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.core.exceptions import ImproperlyConfigured
+from io import StringIO
+import importlib
+import json
+import os
+import tempfile
+import threading
+from unittest import mock, skipUnless
+from django.db import connection, connections
 from selenium.webdriver.ie.webdriver import WebDriver
-from .models import ToDoList, ListItem
+from .models import ToDoList, ListItem, Job, Tombstone, UserRevision
+from .dashboard_cache import get_dashboard_cache, get_dashboard_version
+from .routers import PRIMARY_PIN_COOKIE, ReplicaRouter, use_replica
+from .session_store import SessionStore, pending_session_writes
+from .backends import get_user_cache, user_cache_key
+from .metrics import REQUEST_DURATION, REQUEST_HISTOGRAMS, REQUEST_QUERIES, REQUEST_TEMPLATE_DURATION
+from django.test.utils import CaptureQueriesContext
+from .profiling import PROFILE_HEADER, profile_token
+from .management.commands.bench_actions import ACTIONS, DEFAULT_BASELINE, Command as BenchActionsCommand, baseline_path, find_regressions
+from .search import FTS_TABLE, fts_support, search_items
+from .database import atomic_with_retry, retry_on_busy
+from django.db import OperationalError, transaction
+from django.db.models import F
+from .jobs import Worker, enqueue, retry_delay, run_pending_jobs
+from .urls import build_urlconf
+from . import async_views
+from .hashing import get_hashing_pool
+from .events import adashboard_event_stream, dashboard_event_stream, get_event_broker
+from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.staticfiles.testing import LiveServerTestCase
 from selenium.webdriver.common.by import By
 from selenium import webdriver 
@@ -11,6 +44,23 @@ from selenium.webdriver.support import expected_conditions as EC
 
 # Create your tests here.
 
+# The tests hash the passwords with the fast MD5 hasher, as Django recommends, whatever runs them
+# (the hashing tests override PASSWORD_HASHERS again to exercise the pool)
+FAST_PASSWORD_HASHERS = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+
+def setUpModule():
+    FAST_PASSWORD_HASHERS.enable()
+
+def tearDownModule():
+    FAST_PASSWORD_HASHERS.disable()
+
+# The routing tests read from a second SQLite database standing in for the read replica. Without
+# TODO_DATABASE_REPLICA_PATH there is no 'replica' alias, a test-only one is added before the test
+# databases are created (in memory, like the test database of 'default')
+if 'replica' not in settings.DATABASES:
+    default_database = connections.settings['default']
+    settings.DATABASES['replica'] = {**default_database, 'NAME': ":memory:", 'TEST': {**default_database['TEST'], 'NAME': None}}
+
 # Testing the ToDoList Model 
 class TestToDoList(TestCase): 
 
@@ -179,7 +229,8 @@ class TestDashboardView(TestCase):
 
         response = self.client.post(path=reverse('delete_list', kwargs=reverse_kwargs), data=form_data)
 
-        lists_count_after_deletion = ToDoList.objects.filter(user=self.test_user).count()
+        # The deleted list is hidden at once, and removed with its items by its background purge
+        lists_count_after_deletion = ToDoList.objects.owned_by(self.test_user).count()
 
         # Assert HTTP status code
         self.assertEqual(response.status_code, 302)
@@ -187,6 +238,9 @@ class TestDashboardView(TestCase):
         # Assert lists count after deletion 
         self.assertEqual(lists_count_after_deletion, 0)
 
+        run_pending_jobs()
+        self.assertFalse(ToDoList.objects.filter(user=self.test_user).exists())
+
 # Testig the registeration view 
 class TestRegisterView(TestCase):
 
@@ -452,4 +506,1988 @@ class TestSecurity(TestCase):
         self.assertEqual(response.status_code, 302)
         
         # (Bonus check: The browser is sent to the login page)
-        self.assertIn(reverse('login'), response.url) 
\ No newline at end of file
+        self.assertIn(reverse('login'), response.url)
+
+# Testing the number of queries executed by the dashboard
+class TestDashboardQueries(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_task = ListItem.objects.create(list=self.test_list, text= "Dummy test text")
+
+    # Helper that fills the user's account with extra lists and items
+    def add_lists_and_items(self, lists_count, items_count):
+        for list_index in range(lists_count):
+            todo_list = ToDoList.objects.create(user= self.test_user, name= f"Extra_List_{list_index}")
+            ListItem.objects.bulk_create(ListItem(list=todo_list, text=f"Task {item_index}") for item_index in range(items_count))
+
+        ListItem.objects.bulk_create(ListItem(list=self.test_list, text=f"Task {item_index}") for item_index in range(items_count))
+
+    # Test the dashboard query count: session, user, side-bar
+    def test_dashboard_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+
+    # Test the selected list query count: session, user, selected list, side-bar and items
+    def test_list_view_query_count(self):
+        list_id_kwargs = {'list_id': self.test_list.id}
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('view_list_items', kwargs=list_id_kwargs))
+
+        self.assertContains(response, "Dummy test text")
+
+    # Test the query count does not grow with the number of lists and items
+    def test_query_count_is_constant(self):
+        list_id_kwargs = {'list_id': self.test_list.id}
+        self.add_lists_and_items(lists_count=20, items_count=30)
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('view_list_items', kwargs=list_id_kwargs))
+
+        self.assertEqual(len(response.context['lists']), 21)
+        self.assertEqual(len(response.context['tasks']), 31)
+
+    # Test the toggle branch checks the list and task ownership in a single query
+    def test_toggle_query_count(self):
+        reverse_kwargs = {
+            'list_id': self.test_list.id,
+            'task_id': self.test_task.id,
+        }
+
+        # session, user, owned task lookup, savepoint, revision update + select, item update, counters update, release savepoint
+        with self.assertNumQueries(9):
+            response = self.client.post(path=reverse('toggle_task', kwargs=reverse_kwargs), data={'form_type': "toggle_task"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(ListItem.objects.get(pk=self.test_task.pk).isCompleted)
+
+
+# Testing the cached dashboard fragments
+class TestDashboardFragmentCache(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_task = ListItem.objects.create(list=self.test_list, text= "Dummy test text")
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Test a repeated page view serves the side-bar and the items from the cache
+    def test_repeated_view_skips_fragment_queries(self):
+        self.client.get(self.list_url)
+
+        # session, user, selected list
+        with self.assertNumQueries(3):
+            response = self.client.get(self.list_url)
+
+        self.assertContains(response, "Dummy test text")
+        self.assertContains(response, "Test_List")
+
+    # Test adding an item bumps the version and invalidates the cached fragments
+    def test_item_change_invalidates_fragments(self):
+        self.client.get(self.list_url)
+        version_before = get_dashboard_version(self.test_user.pk)
+
+        form_data = {
+            'form_type': 'add_list_item',
+            'list_item_text': "Fresh task"
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(path=self.list_url, data=form_data)
+
+        self.assertNotEqual(get_dashboard_version(self.test_user.pk), version_before)
+
+        response = self.client.get(self.list_url)
+        self.assertContains(response, "Fresh task")
+        self.assertContains(response, "2 items")
+
+    # Test the fragments of a user are not served to an other user
+    def test_fragments_are_per_user(self):
+        self.client.get(reverse('dashboard'))
+
+        User = get_user_model()
+        other_user = User.objects.create_user(username= "other_username", password=self.user_pswd)
+        ToDoList.objects.create(user= other_user, name= "Other_List")
+
+        other_client = Client()
+        other_client.login(username=other_user.username, password=self.user_pswd)
+        response = other_client.get(reverse('dashboard'))
+
+        self.assertContains(response, "Other_List")
+        self.assertNotContains(response, "Test_List")
+
+    # Test the dashboard cache is shared by the worker processes by default, a per-process cache is refused without DEBUG
+    def test_requires_shared_cache(self):
+        from todo_list_project import settings as settings_module
+        try:
+            with mock.patch.dict(os.environ, {'TODO_DEBUG': "0"}):
+                os.environ.pop('TODO_DASHBOARD_CACHE_BACKEND', None)
+                self.assertEqual(importlib.reload(settings_module).CACHES['dashboard']['BACKEND'], 'django.core.cache.backends.filebased.FileBasedCache')
+            with mock.patch.dict(os.environ, {'TODO_DEBUG': "0", 'TODO_DASHBOARD_CACHE_BACKEND': "locmem"}):
+                with self.assertRaises(ImproperlyConfigured):
+                    importlib.reload(settings_module)
+            with mock.patch.dict(os.environ, {'TODO_DEBUG': "1", 'TODO_DASHBOARD_CACHE_BACKEND': "locmem"}):
+                self.assertEqual(importlib.reload(settings_module).CACHES['dashboard']['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+        finally:
+            importlib.reload(settings_module)
+
+
+# Testing the conditional GET of the dashboard
+class TestDashboardConditionalGet(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_task = ListItem.objects.create(list=self.test_list, text= "Dummy test text")
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Test a matching ETag is answered with a 304 without querying the lists and items
+    def test_matching_etag_returns_not_modified(self):
+        response = self.client.get(self.list_url)
+        etag = response['ETag']
+
+        # session, user
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    # Test the ETag changes once the user's data has changed
+    def test_change_invalidates_etag(self):
+        etag = self.client.get(self.list_url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(path=self.list_url, data={'form_type': 'add_list_item', 'list_item_text': "Fresh task"})
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Fresh task")
+
+    # Test a change made within the same second as the client's copy is never answered with a 304
+    def test_if_modified_since_never_hides_a_change(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(path=reverse('dashboard'), data={'form_type': 'add_list', 'list_name': "Same second list"})
+
+        response = self.client.get(reverse('dashboard'), HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Same second list")
+
+    # Test the ETag differs between the selected lists
+    def test_etag_varies_on_selected_list(self):
+        other_list = ToDoList.objects.create(user= self.test_user, name= "Other_List")
+        etag = self.client.get(self.list_url)['ETag']
+
+        response = self.client.get(reverse('view_list_items', kwargs={'list_id': other_list.id}), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    # Test the updated_at field is refreshed on save
+    def test_updated_at_refreshed_on_save(self):
+        updated_at_before = self.test_task.updated_at
+        self.test_task.isCompleted = True
+        self.test_task.save()
+
+        self.assertGreater(ListItem.objects.get(pk=self.test_task.pk).updated_at, updated_at_before)
+
+
+# Testing the JSON API
+class TestListsApi(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.other_user = User.objects.create_user(username= "other_username", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        ListItem.objects.bulk_create(ListItem(list=self.test_list, text=f"Task {item_index}", isCompleted=item_index % 2 == 0) for item_index in range(5))
+        ToDoList.objects.filter(pk=self.test_list.pk).rebuild_counters()
+        self.other_list = ToDoList.objects.create(user= self.other_user, name= "Other_List")
+
+    # Test anonymous requests are rejected with a 401
+    def test_unauthenticated_access(self):
+        self.client.logout()
+        response = self.client.get(reverse('api_lists'))
+
+        self.assertEqual(response.status_code, 401)
+
+    # Test the lists endpoint only returns the user's lists
+    def test_lists_are_per_user(self):
+        response = self.client.get(reverse('api_lists'))
+        results = response.json()['results']
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([todo_list['name'] for todo_list in results], ["Test_List"])
+        self.assertEqual(results[0]['item_count'], 5)
+
+    # Test walking through the items with the keyset cursor
+    def test_items_keyset_pagination(self):
+        url = reverse('api_list_items', kwargs={'list_id': self.test_list.id}) + "?limit=2"
+        texts = []
+
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            texts += [item['text'] for item in page['results']]
+            url = page['next']
+
+        self.assertEqual(texts, [f"Task {item_index}" for item_index in range(5)])
+
+    # Test the field selection and the completed filter
+    def test_items_field_selection(self):
+        url = reverse('api_list_items', kwargs={'list_id': self.test_list.id})
+        results = self.client.get(url, {'fields': 'text', 'completed': 'true'}).json()['results']
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(set(results[0]), {'id', 'text'})
+
+        response = self.client.get(url, {'fields': 'text,password'})
+        self.assertEqual(response.status_code, 400)
+
+    # Test another user's list cannot be read or written
+    def test_cross_user_items_access(self):
+        url = reverse('api_list_items', kwargs={'list_id': self.other_list.id})
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.post(url, data={'text': "Intruder"}, content_type="application/json").status_code, 404)
+
+    # Test creating a list and an item through the API
+    def test_create_list_and_item(self):
+        response = self.client.post(reverse('api_lists'), data={'name': "Api_List"}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+        list_id = response.json()['id']
+        response = self.client.post(reverse('api_list_items', kwargs={'list_id': list_id}), data={'text': "Api task"}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ListItem.objects.filter(list_id=list_id, text="Api task").exists())
+
+        response = self.client.post(reverse('api_lists'), data={'name': ""}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+# Testing the batch mutations of list items
+class TestBatchItems(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_tasks = ListItem.objects.bulk_create(ListItem(list=self.test_list, text=f"Task {item_index}") for item_index in range(6))
+        ToDoList.objects.filter(pk=self.test_list.pk).rebuild_counters()
+
+        other_user = User.objects.create_user(username= "other_username", password=self.user_pswd)
+        other_list = ToDoList.objects.create(user= other_user, name= "Other_List")
+        self.other_task = ListItem.objects.create(list=other_list, text= "Other task")
+
+        self.batch_url = reverse('api_list_items_batch', kwargs={'list_id': self.test_list.id})
+
+    # Test the batch is applied with a fixed number of statements
+    def test_batch_api_applies_all_operations(self):
+        batch = {
+            'create': ["New task 1", "New task 2"],
+            'update': [{'id': self.test_tasks[0].id, 'text': "Renamed task"}],
+            'toggle': [self.test_tasks[1].id, self.test_tasks[2].id],
+            'delete': [self.test_tasks[3].id, self.test_tasks[4].id, self.test_tasks[5].id],
+        }
+
+        # session, user, owned list, savepoint, revision update + select, insert, select + update,
+        # savepoint + count + toggle + release, select + tombstones insert + delete, counters update, release savepoint
+        with self.assertNumQueries(18):
+            response = self.client.post(self.batch_url, data=batch, content_type="application/json")
+
+        result = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(result['created']), 2)
+        self.assertEqual((result['updated'], result['toggled'], result['deleted']), (1, 2, 3))
+
+        list_items = ListItem.objects.filter(list=self.test_list)
+        self.assertEqual(list_items.count(), 5)
+        self.assertEqual(list_items.filter(isCompleted=True).count(), 2)
+        self.assertTrue(list_items.filter(text="Renamed task").exists())
+
+    # Test the ids of other lists are ignored
+    def test_batch_ignores_foreign_items(self):
+        response = self.client.post(self.batch_url, data={'delete': [self.other_task.id]}, content_type="application/json")
+
+        self.assertEqual(response.json()['deleted'], 0)
+        self.assertTrue(ListItem.objects.filter(pk=self.other_task.pk).exists())
+
+    # Test an invalid batch is rejected without applying any operation
+    def test_invalid_batch_is_rejected(self):
+        batch = {
+            'create': ["Valid task", "x" * 101],
+            'delete': [self.test_tasks[0].id],
+        }
+
+        response = self.client.post(self.batch_url, data=batch, content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ListItem.objects.filter(list=self.test_list).count(), 6)
+
+    # Test the dashboard multi-select form
+    def test_dashboard_batch_form(self):
+        form_data = {
+            'form_type': 'batch_tasks',
+            'batch_action': 'toggle',
+            'task_ids': [self.test_tasks[0].id, self.test_tasks[1].id],
+        }
+
+        response = self.client.post(reverse('batch_tasks', kwargs={'list_id': self.test_list.id}), data=form_data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ListItem.objects.filter(list=self.test_list, isCompleted=True).count(), 2)
+
+        form_data['batch_action'] = 'delete'
+        self.client.post(reverse('batch_tasks', kwargs={'list_id': self.test_list.id}), data=form_data)
+
+        self.assertEqual(ListItem.objects.filter(list=self.test_list).count(), 4)
+
+
+# Testing the set-based list operations
+class TestListOperations(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        ListItem.objects.bulk_create(ListItem(list=self.test_list, text=f"Task {item_index}", isCompleted=item_index < 3) for item_index in range(10))
+        ToDoList.objects.filter(pk=self.test_list.pk).rebuild_counters()
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Test complete_all runs a single UPDATE statement over the items
+    def test_complete_all(self):
+        # savepoint, revision update + select, items update, counters update, release savepoint
+        with self.assertNumQueries(6):
+            completed = self.test_list.complete_all()
+
+        self.assertEqual(completed, 7)
+        self.assertFalse(ListItem.objects.filter(list=self.test_list, isCompleted=False).exists())
+
+    # Test reopen_all runs a single UPDATE statement over the items
+    def test_reopen_all(self):
+        # savepoint, revision update + select, items update, counters update, release savepoint
+        with self.assertNumQueries(6):
+            reopened = self.test_list.reopen_all()
+
+        self.assertEqual(reopened, 3)
+        self.assertFalse(ListItem.objects.filter(list=self.test_list, isCompleted=True).exists())
+
+    # Test clear_completed runs a single DELETE statement over the items
+    def test_clear_completed(self):
+        # savepoint, revision update + select, completed ids select, tombstones insert, items delete, counters update, release savepoint
+        with self.assertNumQueries(8):
+            deleted = self.test_list.clear_completed()
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(ListItem.objects.filter(list=self.test_list).count(), 7)
+
+    # Test the list operations through the dashboard
+    def test_dashboard_list_operations(self):
+        response = self.client.post(reverse('complete_all', kwargs={'list_id': self.test_list.id}), data={'form_type': 'complete_all'})
+        self.assertEqual(response.status_code, 302)
+
+        response = self.client.post(reverse('clear_completed', kwargs={'list_id': self.test_list.id}), data={'form_type': 'clear_completed'})
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(ListItem.objects.filter(list=self.test_list).count(), 0)
+
+    # Test the list operations are restricted to the list owner
+    def test_list_operations_cross_user(self):
+        User = get_user_model()
+        other_user = User.objects.create_user(username= "other_username", password=self.user_pswd)
+        other_client = Client()
+        other_client.login(username=other_user.username, password=self.user_pswd)
+
+        response = other_client.post(reverse('reopen_all', kwargs={'list_id': self.test_list.id}), data={'form_type': 'reopen_all'})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(ListItem.objects.filter(list=self.test_list, isCompleted=True).count(), 3)
+
+
+# Testing the denormalized item counters
+class TestItemCounters(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+
+    # Helper asserting the counters stored on the list
+    def assertCounters(self, item_count, completed_count):
+        self.test_list.refresh_from_db()
+        self.assertEqual((self.test_list.item_count, self.test_list.completed_count), (item_count, completed_count))
+
+    # Test the counters follow the single item create, toggle and delete paths
+    def test_single_item_paths(self):
+        list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+        self.client.post(list_url, data={'form_type': 'add_list_item', 'list_item_text': "Task 1"})
+        self.client.post(list_url, data={'form_type': 'add_list_item', 'list_item_text': "Task 2"})
+        self.assertCounters(2, 0)
+
+        task = ListItem.objects.filter(list=self.test_list).first()
+        task_kwargs = {'list_id': self.test_list.id, 'task_id': task.id}
+        self.client.post(reverse('toggle_task', kwargs=task_kwargs), data={'form_type': 'toggle_task'})
+        self.assertCounters(2, 1)
+
+        self.client.post(reverse('delete_task', kwargs=task_kwargs), data={'form_type': 'delete_task'})
+        self.assertCounters(1, 0)
+
+    # Test the counters follow the batch and list operations
+    def test_bulk_paths(self):
+        result = ListItem.objects.apply_batch(self.test_list, create=["Task 1", "Task 2", "Task 3", "Task 4"])
+        self.assertCounters(4, 0)
+
+        ListItem.objects.apply_batch(self.test_list, toggle=result['created'][:3], update=[{'id': result['created'][3], 'isCompleted': True}])
+        self.assertCounters(4, 4)
+
+        ListItem.objects.apply_batch(self.test_list, toggle=result['created'][:1], delete=result['created'][1:2])
+        self.assertCounters(3, 2)
+
+        self.test_list.reopen_all()
+        self.assertCounters(3, 0)
+
+        self.test_list.complete_all()
+        self.test_list.clear_completed()
+        self.assertCounters(0, 0)
+
+    # Test the management command verifies and rebuilds the counters
+    def test_rebuild_counters_command(self):
+        ListItem.objects.bulk_create(ListItem(list=self.test_list, text=f"Task {item_index}", isCompleted=item_index < 2) for item_index in range(5))
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', verify=True, stdout=StringIO())
+
+        version = get_dashboard_version(self.test_user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_counters', stdout=StringIO())
+        self.assertCounters(5, 2)
+        call_command('rebuild_counters', verify=True, stdout=StringIO())
+
+        # The fixed counters reach the cached dashboard and the syncing clients
+        self.assertNotEqual(get_dashboard_version(self.test_user.pk), version)
+        self.test_list.refresh_from_db()
+        self.assertEqual(self.test_list.revision, UserRevision.objects.get(user=self.test_user).revision)
+
+        # The lists with correct counters are left untouched
+        self.assertEqual(ToDoList.objects.rebuild_counters(), 0)
+
+    # Test the admin bulk deletion keeps the counters and the tombstones
+    def test_admin_bulk_delete(self):
+        list_items = ListItem.objects.bulk_create(ListItem(list=self.test_list, text=f"Task {item_index}", isCompleted=item_index < 2) for item_index in range(5))
+        ToDoList.objects.filter(pk=self.test_list.pk).rebuild_counters()
+
+        list_item_admin = admin.site._registry[ListItem]
+        list_item_admin.delete_queryset(None, ListItem.objects.filter(id__in=[list_items[0].id, list_items[4].id]))
+
+        self.assertCounters(3, 1)
+        self.assertEqual(Tombstone.objects.filter(kind=Tombstone.ITEM).count(), 2)
+
+        admin.site._registry[ToDoList].delete_queryset(None, ToDoList.objects.filter(pk=self.test_list.pk))
+        self.assertTrue(Tombstone.objects.filter(kind=Tombstone.LIST, object_id=self.test_list.pk).exists())
+
+
+# Testing the query plans of the hot queries
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class TestQueryPlans(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.test_user = User.objects.create_user(username= "test_username", password="123456789")
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_task = ListItem.objects.create(list=self.test_list, text= "Dummy test text")
+
+    # The queries issued by views.py and api.py on every request
+    def hot_queries(self):
+        return {
+            'sidebar': ToDoList.objects.owned_by(self.test_user).for_sidebar(),
+            'owned_list': ToDoList.objects.owned_by(self.test_user).filter(id=self.test_list.id),
+            'api_lists_page': ToDoList.objects.owned_by(self.test_user).filter(id__gt=0).order_by('id').values('id', 'name')[:51],
+            'list_items': ListItem.objects.for_list(self.test_list).for_display(),
+            'api_items_page': ListItem.objects.for_list(self.test_list).filter(id__gt=0).order_by('id').values('id', 'text')[:51],
+            'completed_items': ListItem.objects.for_list(self.test_list).filter(isCompleted=True).order_by('id'),
+            'owned_task': ListItem.objects.owned_by(self.test_user).for_mutation('isCompleted').filter(id=self.test_task.id, list_id=self.test_list.id),
+        }
+
+    # Test no hot query scans a whole table or sorts its rows in a temporary B-tree
+    def test_hot_queries_use_indexes(self):
+        for query_name, queryset in self.hot_queries().items():
+            with self.subTest(query=query_name):
+                query_plan = queryset.explain()
+
+                self.assertNotRegex(query_plan, r"SCAN todo_list_app_(todolist|listitem)", query_plan)
+                self.assertNotIn("TEMP B-TREE", query_plan, query_plan)
+
+    # Test the composite indexes have been created by the migrations
+    def test_composite_indexes_exist(self):
+        with connection.cursor() as cursor:
+            list_indexes = connection.introspection.get_constraints(cursor, ToDoList._meta.db_table)
+            item_indexes = connection.introspection.get_constraints(cursor, ListItem._meta.db_table)
+
+        self.assertEqual(list_indexes['todolist_user_id_idx']['columns'], ['user_id', 'id'])
+        self.assertEqual(item_indexes['listitem_list_id_idx']['columns'], ['list_id', 'id'])
+        self.assertEqual(item_indexes['listitem_list_completed_idx']['columns'], ['list_id', 'isCompleted', 'id'])
+
+
+# Testing the keyset paginated task list of the dashboard
+@override_settings(DASHBOARD_ITEMS_PAGE_SIZE=3)
+class TestDashboardItemPages(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_tasks = ListItem.objects.bulk_create(ListItem(list=self.test_list, text=f"Task #{item_index}") for item_index in range(7))
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Test the page only renders the first items, with a link to the next ones
+    def test_first_page(self):
+        response = self.client.get(self.list_url)
+
+        self.assertContains(response, "Task #2")
+        self.assertNotContains(response, "Task #3")
+        self.assertContains(response, f"?after={self.test_tasks[2].id}")
+
+    # Test the next pages are rendered as fragments for dashboard.js
+    def test_next_page_fragment(self):
+        response = self.client.get(self.list_url, {'after': self.test_tasks[2].id}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertTemplateUsed(response, 'todo_list_app/partials/task_page.html')
+        self.assertTemplateNotUsed(response, 'todo_list_app/dashboard.html')
+        self.assertContains(response, "Task #3")
+        self.assertContains(response, "Task #5")
+        self.assertNotContains(response, "Task #2")
+        self.assertContains(response, f"?after={self.test_tasks[5].id}")
+
+    # Test the last page has no link to a next page
+    def test_last_page(self):
+        response = self.client.get(self.list_url, {'after': self.test_tasks[5].id}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertContains(response, "Task #6")
+        self.assertNotContains(response, "load-more-tasks")
+
+    # Test a live update re-fetches every task loaded so far, in one query for the items
+    def test_refresh_keeps_loaded_pages(self):
+        fragment = {'fragment': "tasks", 'until': self.test_tasks[5].id}
+        # session, user, selected list, items
+        with self.assertNumQueries(4):
+            response = self.client.get(self.list_url, fragment, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertContains(response, "Task #0")
+        self.assertContains(response, "Task #5")
+        self.assertNotContains(response, "Task #6")
+        self.assertContains(response, f"?after={self.test_tasks[5].id}")
+
+        # Up to DASHBOARD_ITEMS_REFRESH_LIMIT tasks, and with nothing left after the cursor, no link
+        with self.settings(DASHBOARD_ITEMS_REFRESH_LIMIT=4):
+            response = self.client.get(self.list_url, fragment, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertNotContains(response, "Task #4")
+        self.assertContains(response, f"?after={self.test_tasks[3].id}")
+
+        response = self.client.get(self.list_url, {'fragment': "tasks", 'until': self.test_tasks[6].id}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertContains(response, "Task #6")
+        self.assertNotContains(response, "load-more-tasks")
+
+        # The full page ignores the cursor
+        self.assertNotContains(self.client.get(self.list_url, {'until': self.test_tasks[5].id}), "Task #3")
+
+    # Test the page and the fragment have different ETags
+    def test_fragment_etag_differs(self):
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url, HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+
+# Testing the full-text search of the tasks
+class TestTaskSearch(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Groceries")
+        self.milk_task = ListItem.objects.create(list=self.test_list, text= "Buy milk")
+        self.bread_task = ListItem.objects.create(list=self.test_list, text= "Buy bread and milk and more milk")
+        ListItem.objects.create(list=self.test_list, text= "Call the bank")
+
+        User = get_user_model()
+        other_user = User.objects.create_user(username= "other_username", password=self.user_pswd)
+        other_list = ToDoList.objects.create(user= other_user, name= "Other_List")
+        ListItem.objects.create(list=other_list, text= "Buy milk for the neighbour")
+
+    # Helper returning the texts of the matching tasks
+    def search_texts(self, query):
+        return [list_item.text for list_item in search_items(self.test_user, query).results]
+
+    # Test the search only returns the user's matching tasks, by relevance
+    def test_search_ranks_user_tasks(self):
+        texts = self.search_texts("milk")
+
+        self.assertEqual(set(texts), {"Buy milk", "Buy bread and milk and more milk"})
+        self.assertEqual(self.search_texts("bank"), ["Call the bank"])
+        self.assertEqual(self.search_texts("mil"), texts)
+
+    # Test the index follows updates, deletes and bulk inserts
+    def test_index_is_kept_in_sync(self):
+        self.milk_task.text = "Buy cheese"
+        self.milk_task.save()
+        self.bread_task.delete()
+        ListItem.objects.apply_batch(self.test_list, create=["Bulk cheese task"])
+
+        self.assertEqual(self.search_texts("milk"), [])
+        self.assertEqual(set(self.search_texts("cheese")), {"Buy cheese", "Bulk cheese task"})
+
+    # Test the search falls back to icontains without FTS5
+    def test_icontains_fallback(self):
+        with mock.patch('todo_list_app.search.fts_available', return_value=False):
+            texts = self.search_texts("MILK buy")
+
+        self.assertEqual(texts, ["Buy milk", "Buy bread and milk and more milk"])
+
+    # Test the search user input cannot break the FTS5 expression
+    def test_search_syntax_is_escaped(self):
+        self.assertEqual(self.search_texts('milk" OR "bank'), [])
+        self.assertEqual(self.search_texts("NEAR( AND *"), [])
+
+    # Test the search from the dashboard and the API
+    def test_dashboard_and_api_search(self):
+        response = self.client.get(reverse('dashboard'), {'q': "bank"})
+        self.assertContains(response, "Call the bank")
+        self.assertNotContains(response, "Buy milk")
+
+        response = self.client.get(reverse('api_search'), {'q': "milk", 'limit': 1})
+        page = response.json()
+
+        self.assertEqual(len(page['results']), 1)
+        self.assertEqual(page['next_page'], 2)
+        self.assertEqual(page['results'][0]['list_name'], "Groceries")
+
+@override_settings(ROOT_URLCONF=build_urlconf(async_views))
+class TestAsyncViews(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = AsyncClient()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_task = ListItem.objects.create(list=self.test_list, text= "Dummy test text")
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Test the async register and login views create and log in the user
+    async def test_register_and_login(self):
+        response = await self.client.post(reverse('register'), {'username': "async_username", 'email': "async_email@gmail.com", 'password': "Str0ng_Passw0rd!", 'confirm_password': "Str0ng_Passw0rd!"})
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertTrue(await get_user_model().objects.filter(username="async_username").aexists())
+
+        response = await self.client.post(reverse('login'), {'username': "async_username", 'password': "Str0ng_Passw0rd!"})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+        response = await self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    # Test the async dashboard adds, toggles and deletes tasks
+    async def test_dashboard_task_forms(self):
+        await self.client.aforce_login(self.test_user)
+
+        response = await self.client.post(self.list_url, {'form_type': 'add_list_item', 'list_item_text': "Async task"})
+        self.assertRedirects(response, self.list_url, fetch_redirect_response=False)
+
+        task_url = reverse('toggle_task', kwargs={'list_id': self.test_list.id, 'task_id': self.test_task.id})
+        await self.client.post(task_url, {'form_type': 'toggle_task'})
+        await self.client.post(task_url, {'form_type': 'delete_task'})
+
+        texts = [list_item.text async for list_item in ListItem.objects.for_list(self.test_list)]
+        todo_list = await ToDoList.objects.aget(id=self.test_list.id)
+
+        self.assertEqual(texts, ["Async task"])
+        self.assertEqual((todo_list.item_count, todo_list.completed_count), (1, 0))
+
+    # Test the async dashboard handles the list forms and the fragment requests with the handlers of the sync view
+    async def test_dashboard_list_forms(self):
+        await self.client.aforce_login(self.test_user)
+
+        response = await self.client.post(reverse('dashboard'), {'form_type': 'add_list', 'list_name': "Async list"})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertTrue(await ToDoList.objects.filter(user=self.test_user, name="Async list").aexists())
+
+        response = await self.client.post(self.list_url, {'form_type': 'complete_all'})
+        self.assertRedirects(response, self.list_url, fetch_redirect_response=False)
+        self.assertTrue((await ListItem.objects.aget(id=self.test_task.id)).isCompleted)
+
+        task_url = reverse('toggle_task', kwargs={'list_id': self.test_list.id, 'task_id': self.test_task.id})
+        response = await self.client.post(task_url, {'form_type': 'toggle_task'}, headers={'X-Requested-With': "XMLHttpRequest"})
+        self.assertContains(response, "Dummy test text")
+        self.assertIn('X-Dashboard-Version', response)
+
+        response = await self.client.post(self.list_url, {'form_type': 'unknown'})
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.client.post(self.list_url, {'form_type': 'delete_list'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertFalse(await ToDoList.objects.owned_by(self.test_user).filter(id=self.test_list.id).aexists())
+
+    # Test the async dashboard renders, answers a matching ETag with a 304 and serves the item pages
+    async def test_dashboard_conditional_get(self):
+        await self.client.aforce_login(self.test_user)
+
+        response = await self.client.get(self.list_url)
+        self.assertContains(response, "Dummy test text")
+
+        response = await self.client.get(self.list_url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.client.get(self.list_url, headers={'X-Requested-With': "XMLHttpRequest"})
+        self.assertContains(response, "Dummy test text")
+        self.assertNotContains(response, "Test_List")
+
+    # Test the async dashboard does not serve the lists of other users
+    async def test_other_user_list_not_found(self):
+        other_user = await get_user_model().objects.acreate_user(username= "other_username", password=self.user_pswd)
+        await self.client.aforce_login(other_user)
+
+        response = await self.client.get(self.list_url)
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.client.post(self.list_url, {'form_type': 'delete_list'})
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(await ToDoList.objects.filter(id=self.test_list.id).aexists())
+
+@override_settings(
+    PASSWORD_HASHER_PARAMETERS={'pbkdf2': {'iterations': 1000}, 'scrypt': {'work_factor': 2 ** 10}},
+    PASSWORD_HASHERS=['todo_list_app.hashing.PooledPBKDF2PasswordHasher', 'todo_list_app.hashing.PooledScryptPasswordHasher'],
+)
+class TestPasswordHashing(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+
+    # Test the passwords are hashed on the pool threads and the hashes are measured
+    def test_hashes_run_on_pool(self):
+        pool = get_hashing_pool()
+        completed = pool.metrics.snapshot()['completed']
+
+        self.assertTrue(pool.submit(threading.current_thread).result().name.startswith("password-hashing"))
+        self.assertTrue(self.client.login(username=self.test_user.username, password=self.user_pswd))
+
+        metrics = pool.metrics.snapshot()
+        self.assertEqual(metrics['completed'], completed + 2)
+        self.assertEqual(metrics['pending'], 0)
+        self.assertGreater(metrics['max_latency_seconds'], 0)
+
+    # Test a login is refused with a retry message when the hashing queue is full
+    @override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_MAX_PENDING=1)
+    def test_full_queue_rejects_login(self):
+        pool = get_hashing_pool()
+        release = threading.Event()
+        blocker = pool.submit(release.wait)
+
+        try:
+            response = self.client.post(reverse('login'), {'username': self.test_user.username, 'password': self.user_pswd})
+        finally:
+            release.set()
+            blocker.result()
+
+        self.assertContains(response, "please try again in a moment")
+        self.assertEqual(pool.metrics.snapshot()['rejected'], 1)
+        self.assertTrue(self.client.login(username=self.test_user.username, password=self.user_pswd))
+
+    # Test changing the hasher profile upgrades the stored hashes on the next login
+    def test_profile_change_upgrades_hash(self):
+        self.assertTrue(self.test_user.password.startswith("pbkdf2_sha256$1000$"))
+
+        with self.settings(PASSWORD_HASHERS=['todo_list_app.hashing.PooledScryptPasswordHasher', 'todo_list_app.hashing.PooledPBKDF2PasswordHasher']):
+            self.assertTrue(self.client.login(username=self.test_user.username, password=self.user_pswd))
+
+        self.test_user.refresh_from_db()
+        self.assertTrue(self.test_user.password.startswith("scrypt$1024$"))
+
+@override_settings(DASHBOARD_LIVE_UPDATES=True)
+class TestDashboardEvents(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_task = ListItem.objects.create(list=self.test_list, text= "Dummy test text")
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Test the live updates are off unless enabled, the sync stream would hold a worker thread
+    def test_live_updates_setting(self):
+        self.assertContains(self.client.get(self.list_url), 'data-events-url="%s"' % reverse('dashboard_events'))
+
+        with self.settings(DASHBOARD_LIVE_UPDATES=False):
+            self.assertNotContains(self.client.get(self.list_url), "data-events-url")
+            self.assertEqual(self.client.get(reverse('dashboard_events')).status_code, 404)
+
+    # Test the committed changes are published to the user's streams only
+    def test_changes_are_published_to_owner(self):
+        broker = get_event_broker()
+        subscription = broker.subscribe(self.test_user.pk)
+        other_subscription = broker.subscribe(self.test_user.pk + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ListItem.objects.create(list=self.test_list, text= "Fresh task")
+            self.assertIsNone(subscription.get(timeout=0))
+
+        event = subscription.get(timeout=0)
+        self.assertEqual(event['list_id'], self.test_list.id)
+        self.assertEqual(event['version'], get_dashboard_version(self.test_user.pk))
+        self.assertIsNone(other_subscription.get(timeout=0))
+
+        broker.unsubscribe(subscription)
+        broker.unsubscribe(other_subscription)
+        self.assertEqual(broker.subscriptions, {})
+
+    # Test the stream sends the published events and unsubscribes once closed
+    def test_event_stream(self):
+        stream = dashboard_event_stream(self.test_user.pk)
+        self.assertTrue(next(stream).startswith("retry: "))
+
+        list_id = self.test_list.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test_list.delete()
+
+        message = next(stream)
+        self.assertIn("event: dashboard", message)
+        self.assertIn(f'"list_id": {list_id}', message)
+
+        stream.close()
+        self.assertEqual(get_event_broker().subscriptions, {})
+
+    # Test a re-connecting client that missed changes is asked to refresh everything
+    @override_settings(DASHBOARD_EVENTS_MAX_SECONDS=0)
+    def test_reconnect_resyncs(self):
+        response = self.client.get(reverse('dashboard_events'), headers={'Last-Event-ID': "1"})
+        content = b"".join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], "text/event-stream")
+        self.assertIn('data: {"list_id": null}', content)
+
+        version = get_dashboard_version(self.test_user.pk)
+        response = self.client.get(reverse('dashboard_events'), headers={'Last-Event-ID': str(version)})
+        self.assertNotIn("event: dashboard", b"".join(response.streaming_content).decode())
+
+    # Test the side-bar and the task list fragments refreshed by dashboard.js
+    def test_refreshed_fragments(self):
+        response = self.client.get(self.list_url, {'fragment': "sidebar"}, headers={'X-Requested-With': "XMLHttpRequest"})
+        self.assertContains(response, "Test_List")
+        self.assertNotContains(response, "Dummy test text")
+
+        response = self.client.get(self.list_url, {'fragment': "tasks"}, headers={'X-Requested-With': "XMLHttpRequest"})
+        self.assertContains(response, "Dummy test text")
+        self.assertNotContains(response, "Your Lists")
+
+    # Test the async stream receives the events published from other threads
+    async def test_async_event_stream(self):
+        stream = adashboard_event_stream(self.test_user.pk)
+        self.assertTrue((await anext(stream)).startswith("retry: "))
+
+        await sync_to_async(get_event_broker().publish, thread_sensitive=False)(self.test_user.pk, {'list_id': self.test_list.id, 'version': 1})
+
+        self.assertIn(f'"list_id": {self.test_list.id}', await anext(stream))
+        await stream.aclose()
+        self.assertEqual(get_event_broker().subscriptions, {})
+
+class TestTaskFragments(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client(headers={'X-Requested-With': "XMLHttpRequest"})
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_task = ListItem.objects.create(list=self.test_list, text= "Dummy test text")
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+        self.task_url = reverse('toggle_task', kwargs={'list_id': self.test_list.id, 'task_id': self.test_task.id})
+
+    # Test an added task is answered with its row and the list's side-bar entry
+    def test_add_task_returns_row(self):
+        response = self.client.post(self.list_url, {'form_type': 'add_list_item', 'list_item_text': "Fresh task"})
+        new_task = ListItem.objects.get(text="Fresh task")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Dashboard-Version', response)
+        self.assertContains(response, f'id="task-{new_task.id}"')
+        self.assertContains(response, f'id="sidebar-list-{self.test_list.id}"')
+        self.assertContains(response, "2 items")
+        self.assertNotContains(response, "Dummy test text")
+        self.assertNotContains(response, "<html")
+
+    # Test a toggled task is answered with its updated row and counters
+    def test_toggle_task_returns_row(self):
+        response = self.client.post(self.task_url, {'form_type': 'toggle_task'})
+
+        self.assertContains(response, f'id="task-{self.test_task.id}"')
+        self.assertContains(response, "check-circle")
+        self.assertContains(response, "1 of 1 completed")
+
+    # Test a deleted task is answered with its removal and the empty list message
+    def test_delete_task_returns_removal(self):
+        response = self.client.post(self.task_url, {'form_type': 'delete_task'})
+
+        self.assertContains(response, f'<div id="task-{self.test_task.id}" data-removed></div>', html=True)
+        self.assertContains(response, "No tasks in this list yet")
+        self.assertContains(response, "0 items")
+        self.assertFalse(ListItem.objects.filter(id=self.test_task.id).exists())
+
+    # Test the forms sent without JavaScript are still redirected
+    def test_plain_form_redirects(self):
+        client = Client()
+        client.login(username=self.test_user.username, password=self.user_pswd)
+        response = client.post(self.task_url, {'form_type': 'toggle_task'})
+
+        self.assertRedirects(response, self.list_url)
+
+    # Test the async dashboard answers the task forms with the same fragments
+    async def test_async_fragments(self):
+        client = AsyncClient()
+        await client.aforce_login(self.test_user)
+
+        with self.settings(ROOT_URLCONF=build_urlconf(async_views)):
+            response = await client.post(self.task_url, {'form_type': 'toggle_task'}, headers={'X-Requested-With': "XMLHttpRequest"})
+
+        self.assertContains(response, f'id="task-{self.test_task.id}"')
+        self.assertContains(response, "1 of 1 completed")
+
+
+# Testing the delta sync API
+class TestDeltaSync(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.other_user = User.objects.create_user(username= "other_username", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.test_tasks = [ListItem.objects.create(list=self.test_list, text=f"Task {item_index}") for item_index in range(3)]
+        self.other_list = ToDoList.objects.create(user= self.other_user, name= "Other_List")
+        ListItem.objects.create(list=self.other_list, text= "Other task")
+        self.sync_url = reverse('api_sync')
+
+    def sync(self, since=None):
+        response = self.client.get(self.sync_url, {'since': since} if since is not None else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    # Helper fetching the pages of a sync of limit rows until the last one, calling between_pages after each page but the last
+    def sync_pages(self, limit, since=None, between_pages=None):
+        pages = []
+        params = {'limit': limit, **({'since': since} if since is not None else {})}
+        while True:
+            page = self.client.get(self.sync_url, params).json()
+            pages.append(page)
+            if not page['has_more']:
+                return pages
+            if between_pages:
+                between_pages(len(pages))
+            params = {'limit': limit, 'after': page['next_cursor']}
+
+    # Test the first sync returns a full snapshot of the user's data only
+    def test_initial_sync_is_full(self):
+        changes = self.sync()
+
+        self.assertTrue(changes['full'])
+        self.assertEqual(changes['revision'], UserRevision.objects.get(user=self.test_user).revision)
+        self.assertEqual([todo_list['name'] for todo_list in changes['lists']], ["Test_List"])
+        self.assertEqual([item['text'] for item in changes['items']], ["Task 0", "Task 1", "Task 2"])
+        self.assertEqual(changes['deleted'], {'lists': [], 'items': []})
+
+    # Test a sync only returns the rows changed since the given revision
+    def test_delta_after_changes(self):
+        revision = self.sync()['revision']
+
+        self.test_tasks[0].isCompleted = True
+        self.test_tasks[0].save(update_fields=['isCompleted'])
+        new_task = ListItem.objects.create(list=self.test_list, text= "New task")
+        deleted_task_id = self.test_tasks[1].id
+        self.test_tasks[1].delete()
+
+        changes = self.sync(revision)
+
+        self.assertFalse(changes['full'])
+        self.assertEqual(changes['revision'], revision + 3)
+        self.assertEqual({item['id'] for item in changes['items']}, {self.test_tasks[0].id, new_task.id})
+        self.assertEqual(changes['deleted']['items'], [deleted_task_id])
+        self.assertEqual([todo_list['completed_count'] for todo_list in changes['lists']], [1])
+
+        # Nothing has changed since the last sync
+        self.assertEqual(self.sync(changes['revision'])['items'], [])
+
+    # Test the bulk operations stamp the rows and bury the deleted ones
+    def test_bulk_operations_are_synced(self):
+        revision = self.sync()['revision']
+
+        self.test_list.complete_all()
+        changes = self.sync(revision)
+        self.assertEqual(len(changes['items']), 3)
+        self.assertTrue(all(item['isCompleted'] for item in changes['items']))
+
+        self.test_list.clear_completed()
+        changes = self.sync(changes['revision'])
+        self.assertEqual(sorted(changes['deleted']['items']), sorted(task.id for task in self.test_tasks))
+
+        ListItem.objects.apply_batch(self.test_list, create=["Batched task"])
+        changes = self.sync(changes['revision'])
+        self.assertEqual([item['text'] for item in changes['items']], ["Batched task"])
+
+    # Test a deleted list is reported as deleted
+    def test_deleted_list(self):
+        revision = self.sync()['revision']
+        list_id = self.test_list.id
+        self.test_list.delete()
+
+        changes = self.sync(revision)
+
+        self.assertEqual(changes['deleted']['lists'], [list_id])
+        self.assertEqual(changes['lists'], [])
+        self.assertFalse(Tombstone.objects.filter(user=self.other_user).exists())
+
+    # Test the changes are paginated in (revision, id) order, each page with the same queries and outside of a transaction
+    def test_sync_pages(self):
+        ListItem.objects.apply_batch(self.test_list, create=[f"Batched task {index}" for index in range(4)])
+        snapshot = self.sync()
+
+        with CaptureQueriesContext(connection) as queries:
+            pages = self.sync_pages(limit=3)
+
+        self.assertEqual([len(page['lists']) + len(page['items']) for page in pages], [3, 3, 2])
+        self.assertTrue(all(page['full'] for page in pages))
+        self.assertEqual([item for page in pages for item in page['items']], snapshot['items'])
+        self.assertEqual([todo_list for page in pages for todo_list in page['lists']], snapshot['lists'])
+        self.assertEqual(pages[-1]['revision'], snapshot['revision'])
+        self.assertIsNone(pages[-1]['next_cursor'])
+
+        # session, user, revision, lists, items and deletions of every page
+        self.assertEqual(len(queries), 6 * len(pages))
+        self.assertFalse([query for query in queries.captured_queries if 'SAVEPOINT' in query['sql']])
+
+    # Test the rows changed or deleted between two pages are sent again in a later page
+    def test_changes_between_pages(self):
+        revision = self.sync()['revision']
+        ListItem.objects.apply_batch(self.test_list, create=["Batched task 0", "Batched task 1"])
+        sent_task, deleted_task_id = self.test_tasks[0], self.test_tasks[1].id
+
+        def change_sent_rows(page_count):
+            if page_count == 1:
+                sent_task.isCompleted = True
+                sent_task.save(update_fields=['isCompleted'])
+                self.test_tasks[1].delete()
+
+        pages = self.sync_pages(limit=1, between_pages=change_sent_rows)
+        items = {item['id']: item for page in pages for item in page['items']}
+        deleted_items = [item_id for page in pages for item_id in page['deleted']['items']]
+
+        self.assertEqual(pages[0]['items'][0]['id'], sent_task.id)
+        self.assertEqual([item['id'] for page in pages for item in page['items']].count(sent_task.id), 2)
+        self.assertTrue(items[sent_task.id]['isCompleted'])
+        self.assertEqual(deleted_items, [deleted_task_id])
+        self.assertEqual(pages[-1]['revision'], UserRevision.objects.get(user=self.test_user).revision)
+
+        # A delta sync is paginated the same way
+        pages = self.sync_pages(limit=1, since=revision)
+        self.assertFalse(pages[0]['full'])
+        self.assertEqual(sum(len(page['items']) + len(page['deleted']['items']) for page in pages), 4)
+
+    # Test a malformed cursor, and a sync whose deletions have been pruned since its first page, are refused
+    def test_invalid_sync_cursor(self):
+        self.assertEqual(self.client.get(self.sync_url, {'after': "not a cursor"}).status_code, 400)
+
+        revision = self.sync()['revision']
+        cursor = self.client.get(self.sync_url, {'since': revision - 3, 'limit': 1}).json()['next_cursor']
+        self.test_tasks[0].delete()
+        call_command('prune_tombstones', days=0, stdout=StringIO())
+
+        self.assertEqual(self.client.get(self.sync_url, {'after': cursor}).status_code, 410)
+
+    # Test a client older than the pruned tombstones receives a full snapshot
+    def test_pruned_tombstones_force_full_sync(self):
+        revision = self.sync()['revision']
+        self.test_tasks[0].delete()
+
+        call_command('prune_tombstones', days=0, stdout=StringIO())
+
+        changes = self.sync(revision)
+        self.assertTrue(changes['full'])
+        self.assertEqual(len(changes['items']), 2)
+        self.assertFalse(Tombstone.objects.exists())
+
+
+# Testing the export and import of the lists
+class TestListTransfer(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.other_user = User.objects.create_user(username= "other_username", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Groceries, weekly")
+        ListItem.objects.create(list=self.test_list, text= "Milk")
+        ListItem.objects.create(list=self.test_list, text= 'Eggs "large"', isCompleted=True)
+        self.empty_list = ToDoList.objects.create(user= self.test_user, name= "Empty")
+        other_list = ToDoList.objects.create(user= self.other_user, name= "Other_List")
+        ListItem.objects.create(list=other_list, text= "Other task")
+
+    def export(self, export_format):
+        response = self.client.get(reverse('api_export'), {'format': export_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def upload(self, name, content, **data):
+        return self.client.post(reverse('api_import'), {'file': SimpleUploadedFile(name, content), **data})
+
+    # Test the CSV export holds the user's items and empty lists only
+    def test_csv_export(self):
+        lines = self.export('csv').decode().splitlines()
+
+        self.assertEqual(lines, [
+            "list_id,list_name,text,isCompleted",
+            f'{self.test_list.id},"Groceries, weekly",Milk,false',
+            f'{self.test_list.id},"Groceries, weekly","Eggs ""large""",true',
+            f"{self.empty_list.id},Empty,,",
+        ])
+
+    # Test an NDJSON export imported again recreates the lists with their counters
+    def test_ndjson_round_trip(self):
+        exported = self.export('ndjson')
+        self.assertEqual(len(exported.splitlines()), 3)
+
+        with self.settings(TRANSFER_CHUNK_SIZE=2):
+            response = self.upload("backup.ndjson", exported)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['imported'], {'lists': 2, 'items': 2})
+
+        imported_list = ToDoList.objects.filter(user=self.test_user, name="Groceries, weekly").exclude(pk=self.test_list.pk).get()
+        self.assertEqual((imported_list.item_count, imported_list.completed_count), (2, 1))
+        self.assertEqual(list(imported_list.listitem_set.order_by('id').values_list('text', flat=True)), ["Milk", 'Eggs "large"'])
+        self.assertTrue(ToDoList.objects.filter(user=self.test_user, name="Empty").exclude(pk=self.empty_list.pk).exists())
+
+    # Test an invalid row is reported with its line, the previous chunks stay imported
+    def test_import_invalid_row(self):
+        content = "list_name,text,isCompleted\nChores,Dishes,false\nChores,Laundry,1\nChores,Ironing,maybe\n"
+
+        with self.settings(TRANSFER_CHUNK_SIZE=2):
+            response = self.upload("chores.csv", content.encode())
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Line 4", response.json()['error'])
+        self.assertEqual(response.json()['imported'], {'lists': 1, 'items': 2})
+        self.assertEqual(ToDoList.objects.get(name="Chores").completed_count, 1)
+
+    # Test the import command
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix=".csv", delete=False) as import_file:
+            import_file.write("list_name,text\n" + "".join(f"Big list,Task {item_index}\n" for item_index in range(25)))
+        self.addCleanup(os.remove, import_file.name)
+
+        out = StringIO()
+        call_command('import_lists', import_file.name, user=self.other_user.username, chunk_size=10, stdout=out)
+
+        self.assertIn("Imported 1 list(s) and 25 item(s)", out.getvalue())
+        self.assertEqual(ToDoList.objects.get(user=self.other_user, name="Big list").item_count, 25)
+
+
+# Testing the background deletion of the lists
+class TestBackgroundListDeletion(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", email="test_email@gmail.com", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Big_List")
+        ListItem.objects.bulk_create(ListItem(list=self.test_list, text=f"Task {item_index}") for item_index in range(12))
+        ToDoList.objects.filter(pk=self.test_list.pk).rebuild_counters()
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Test a deleted list is hidden from the pages and the API before its purge
+    def test_deleted_list_is_hidden(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.list_url, {'form_type': 'delete_list'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ListItem.objects.filter(list=self.test_list).count(), 12)
+        self.assertEqual(Job.objects.get().payload, {'list_id': self.test_list.id})
+
+        self.assertEqual(self.client.get(self.list_url).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('dashboard')), "Big_List")
+        self.assertEqual(self.client.get(reverse('api_lists')).json()['results'], [])
+        self.assertEqual(self.client.get(reverse('api_search'), {'q': "Task"}).json()['results'], [])
+
+    # Test the purge deletes the items in bounded batches, then the list
+    @override_settings(PURGE_BATCH_SIZE=5)
+    def test_purge_in_batches(self):
+        self.test_list.soft_delete()
+
+        # 1 existence check, 3 batches and 1 empty batch (savepoint, select, delete, release),
+        # the list delete (select, cascade over the remaining items, delete)
+        with self.assertNumQueries(1 + 3 * 4 + 3 + 3):
+            from .jobs import purge_list
+            purge_list(self.test_list.id)
+
+        self.assertFalse(ToDoList.objects.filter(pk=self.test_list.pk).exists())
+        self.assertFalse(ListItem.objects.exists())
+
+    # Test a failing job is retried later, and given up after its last attempt
+    def test_failed_job_is_retried(self):
+        job = Job.objects.enqueue('purge_list', list_id=self.test_list.id)
+        Job.objects.filter(pk=job.pk).update(max_attempts=2)
+
+        with mock.patch.dict('todo_list_app.jobs.JOB_HANDLERS', {'purge_list': mock.Mock(side_effect=RuntimeError("disk full"))}):
+            with self.assertLogs('todo_list_app.jobs', 'ERROR'):
+                self.assertEqual(run_pending_jobs(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.last_error), (Job.QUEUED, 1, "disk full"))
+
+            # Not due before the retry delay
+            self.assertEqual(run_pending_jobs(), 0)
+            Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+            with self.assertLogs('todo_list_app.jobs', 'ERROR'):
+                run_pending_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    # Test a job whose worker died is claimed again once its lock expires
+    def test_expired_lock_is_reclaimed(self):
+        job = Job.objects.enqueue('purge_list', list_id=self.test_list.id)
+        first_claim = Job.objects.claim()
+        self.assertEqual([claimed.pk for claimed in first_claim], [job.pk])
+        self.assertEqual(Job.objects.claim(), [])
+
+        Job.objects.filter(pk=job.pk).update(locked_until=job.created_at)
+        second_claim = Job.objects.claim()
+
+        self.assertEqual(second_claim[0].attempts, 2)
+        self.assertEqual(first_claim[0].complete(), 0)
+        self.assertEqual(second_claim[0].complete(), 1)
+
+    # Test the purge command, which can queue the missing purges
+    def test_purge_command(self):
+        ToDoList.objects.filter(pk=self.test_list.pk).update(deleted_at=self.test_list.updated_at)
+
+        out = StringIO()
+        call_command('purge_deleted_lists', stdout=out)
+        self.assertIn("Ran 0 purge job(s)", out.getvalue())
+
+        call_command('purge_deleted_lists', requeue=True, stdout=out)
+        self.assertIn("Ran 1 purge job(s)", out.getvalue())
+        self.assertFalse(ToDoList.objects.exists())
+
+
+# Testing the background job worker, its threads need the data to be committed. A single thread is used:
+# the in-memory test database rejects concurrent writers instead of waiting for its lock.
+class TestJobWorker(TransactionTestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.test_user = User.objects.create_user(username= "test_username", password="123456789")
+        self.test_lists = ToDoList.objects.bulk_create(ToDoList(user=self.test_user, name=f"List {list_index}") for list_index in range(3))
+        ListItem.objects.bulk_create(ListItem(list=todo_list, text=f"Task {item_index}") for todo_list in self.test_lists for item_index in range(4))
+
+    # Test the worker runs the queued jobs of every kind on its threads
+    def test_runworker_burst(self):
+        enqueue('rebuild_counters')
+        for todo_list in self.test_lists[:2]:
+            ToDoList.objects.filter(pk=todo_list.pk).update(deleted_at=todo_list.updated_at)
+            enqueue('purge_list', list_id=todo_list.pk)
+
+        out = StringIO()
+        call_command('runworker', burst=True, concurrency=1, batch_size=2, stdout=out)
+
+        self.assertIn("3 job(s) succeeded, 0 failed", out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 3)
+        self.assertEqual(list(ToDoList.objects.values_list('item_count', flat=True)), [4])
+
+    # Test a failing job is retried with a growing delay, the other jobs keep running
+    @override_settings(JOBS_RETRY_DELAY=10, JOBS_MAX_RETRY_DELAY=30)
+    def test_failed_job_backoff(self):
+        self.assertEqual([retry_delay(attempts) for attempts in range(1, 5)], [10, 20, 30, 30])
+
+        enqueue('purge_list', list_id="not an id")
+        enqueue('rebuild_counters')
+
+        with self.assertLogs('todo_list_app.jobs', 'ERROR'):
+            stats = Worker(concurrency=1).run(burst=True)
+
+        self.assertEqual((stats['succeeded'], stats['failed']), (1, 1))
+        failed_job = Job.objects.get(kind='purge_list')
+        self.assertEqual((failed_job.status, failed_job.attempts), (Job.QUEUED, 1))
+        self.assertAlmostEqual((failed_job.run_after - failed_job.updated_at).total_seconds(), 10, delta=1)
+
+    # Test the jobs claimed by a stopping worker go back to the queue, and the heartbeat extends the locks
+    def test_release_and_extend_locks(self):
+        for todo_list in self.test_lists:
+            enqueue('rebuild_counters', list_ids=[todo_list.pk])
+
+        claimed = Job.objects.claim(limit=2, lock_seconds=5)
+        self.assertEqual(len(claimed), 2)
+
+        tokens = Job.objects.filter(lock_token=claimed[0].lock_token)
+        self.assertEqual(tokens.extend_locks(lock_seconds=600), 2)
+        self.assertGreater(Job.objects.get(pk=claimed[0].pk).locked_until, claimed[0].locked_until)
+
+        self.assertEqual(tokens.release(), 2)
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED, attempts=0).count(), 3)
+        self.assertEqual(Worker(batch_size=2).run(max_jobs=3)['succeeded'], 3)
+
+
+# Testing the retry of the requests failing on a locked database
+@override_settings(DATABASE_BUSY_RETRIES=2, DATABASE_BUSY_RETRY_DELAY=0)
+class TestRetryOnBusy(SimpleTestCase):
+
+    def failing_view(self, *errors):
+        view = mock.Mock(side_effect=[*errors, "response"])
+        return view, retry_on_busy(view)
+
+    # Test a locked read-only request is run again until it succeeds
+    def test_locked_request_is_retried(self):
+        view, retried_view = self.failing_view(OperationalError("database is locked"), OperationalError("database is locked"))
+
+        self.assertEqual(retried_view(RequestFactory().get("/")), "response")
+        self.assertEqual(view.call_count, 3)
+
+    # Test the other database errors, the requests locked too many times and the POST requests are raised
+    def test_errors_are_raised(self):
+        view, retried_view = self.failing_view(OperationalError("no such table: todo_list_app_todolist"))
+        with self.assertRaises(OperationalError):
+            retried_view(RequestFactory().get("/"))
+        self.assertEqual(view.call_count, 1)
+
+        view, retried_view = self.failing_view(*[OperationalError("database is locked")] * 3)
+        with self.assertRaises(OperationalError):
+            retried_view(RequestFactory().get("/"))
+        self.assertEqual(view.call_count, 3)
+
+        view, retried_view = self.failing_view(OperationalError("database is locked"))
+        with self.assertRaises(OperationalError):
+            retried_view(RequestFactory().post("/"))
+        self.assertEqual(view.call_count, 1)
+
+    # Test the async views are retried too
+    async def test_async_view_is_retried(self):
+        calls = []
+
+        @retry_on_busy
+        async def view(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return "response"
+
+        self.assertEqual(await view(RequestFactory().get("/")), "response")
+        self.assertEqual(len(calls), 2)
+
+
+# Testing the retry of the write transactions of the dashboard forms, outside of a test transaction
+@override_settings(DATABASE_BUSY_RETRIES=2, DATABASE_BUSY_RETRY_DELAY=0)
+class TestWriteRetry(TransactionTestCase):
+
+    # setUp Method
+    def setUp(self):
+        User = get_user_model()
+        self.test_user = User.objects.create_user(username= "test_username", password="123456789")
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.client = Client()
+        self.client.force_login(self.test_user)
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Test a write transaction locked before its commit is rolled back and run again
+    def test_locked_write_is_retried(self):
+        save = ListItem.save
+        calls = []
+
+        def locked_save(task, *args, **kwargs):
+            calls.append(task)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return save(task, *args, **kwargs)
+
+        with mock.patch.object(ListItem, 'save', locked_save):
+            atomic_with_retry(lambda: ListItem.objects.create(list=self.test_list, text="Retried task"))
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(list(ListItem.objects.values_list('text', flat=True)), ["Retried task"])
+        self.assertEqual(ToDoList.objects.get(id=self.test_list.id).item_count, 1)
+
+    # Test a lock error after the commit, reading the list or in an on_commit callback, does not add the task again
+    def test_lock_after_commit_is_not_retried(self):
+        headers = {'X-Requested-With': "XMLHttpRequest"}
+        with mock.patch.object(ToDoList.objects, 'for_sidebar', side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                self.client.post(self.list_url, {'form_type': 'add_list_item', 'list_item_text': "Only once"}, headers=headers)
+
+        self.assertEqual(ListItem.objects.filter(text="Only once").count(), 1)
+
+        def locked_callback():
+            raise OperationalError("database is locked")
+
+        def write():
+            task = ListItem.objects.create(list=self.test_list, text="Committed once")
+            transaction.on_commit(locked_callback)
+            return task
+
+        with self.assertRaises(OperationalError):
+            atomic_with_retry(write)
+        self.assertEqual(ListItem.objects.filter(text="Committed once").count(), 1)
+
+
+# Testing the routing of the read-only requests to the read replica, the test replica database is not
+# replicated so it shows what the requests read
+@override_settings(READ_REPLICA_ALIAS='replica')
+class TestReplicaRouting(TestCase):
+    databases = {'default', 'replica'}
+
+    # setUp Method
+    def setUp(self):
+        get_dashboard_cache().clear()
+        User = get_user_model()
+        self.client = Client()
+        self.test_user = User.objects.create_user(username= "test_username", password="123456789")
+        self.client.force_login(self.test_user)
+
+        # The replica lags behind: it has the user but an older list
+        User.objects.using('replica').bulk_create([User(id=self.test_user.id, username=self.test_user.username, password=self.test_user.password, date_joined=self.test_user.date_joined)])
+        replica_list, = ToDoList.objects.using('replica').bulk_create([ToDoList(user_id=self.test_user.id, name="Replica_List")])
+        ListItem.objects.using('replica').create(list=replica_list, text="Replica task")
+        ToDoList.objects.create(user=self.test_user, name="Primary_List")
+
+    # Test the dashboard GET reads from the replica
+    def test_get_reads_replica(self):
+        response = self.client.get(reverse('dashboard'))
+
+        self.assertContains(response, "Replica_List")
+        self.assertNotContains(response, "Primary_List")
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+
+    # Test the browser that wrote reads its writes from the primary
+    def test_write_pins_browser_to_primary(self):
+        response = self.client.post(reverse('dashboard'), {'form_type': 'add_list', 'list_name': "New_List"})
+        self.assertEqual(response.cookies[PRIMARY_PIN_COOKIE]['max-age'], 5)
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, "New_List")
+        self.assertContains(response, "Primary_List")
+
+    # Test the other devices of a user whose data has changed read from the primary
+    def test_change_pins_user_to_primary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ToDoList.objects.create(user=self.test_user, name="Changed_List")
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, "Changed_List")
+
+    # Test the search matches the replica index, or the replica fallback when only the primary has FTS5
+    def test_search_reads_replica(self):
+        self.assertContains(self.client.get(reverse('dashboard'), {'q': "replica"}), "Replica task")
+
+        with mock.patch.dict(fts_support, {'default': True, 'replica': False}):
+            with CaptureQueriesContext(connections['replica']) as replica_queries:
+                response = self.client.get(reverse('dashboard'), {'q': "replica"})
+
+        self.assertContains(response, "Replica task")
+        self.assertFalse(any(FTS_TABLE in query['sql'] for query in replica_queries.captured_queries))
+
+    # Test the pages rendered from the replica store no fragment and send no ETag, they may lag behind the version
+    def test_replica_pages_are_not_cached(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, "Replica_List")
+        self.assertNotIn('ETag', response)
+
+        # The same page read from the primary (the pin has expired on the other device) renders its own fragments
+        self.client.cookies[PRIMARY_PIN_COOKIE] = '1'
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, "Primary_List")
+        self.assertNotContains(response, "Replica_List")
+        etag = response['ETag']
+
+        # Which the replica requests may reuse, and a primary ETag is still answered with a 304
+        del self.client.cookies[PRIMARY_PIN_COOKIE]
+        self.assertContains(self.client.get(reverse('dashboard')), "Primary_List")
+        self.assertEqual(self.client.get(reverse('dashboard'), headers={'If-None-Match': etag}).status_code, 304)
+
+    # Test the async dashboard does not send the ETag of a page rendered from the replica either
+    def test_async_replica_pages_are_not_cached(self):
+        async_client = AsyncClient()
+        async_client.cookies = self.client.cookies
+
+        with override_settings(ROOT_URLCONF=build_urlconf(async_views)):
+            response = async_to_sync(async_client.get)(reverse('dashboard'))
+
+        self.assertContains(response, "Replica_List")
+        self.assertNotIn('ETag', response)
+
+    # Test a read replica refuses a dashboard cache private to each process, even with DEBUG
+    def test_requires_shared_dashboard_cache(self):
+        from todo_list_project import settings as settings_module
+        try:
+            with mock.patch.dict(os.environ, {'TODO_DEBUG': "1", 'TODO_DASHBOARD_CACHE_BACKEND': "locmem", 'TODO_DATABASE_REPLICA_PATH': "replica.sqlite3"}):
+                with self.assertRaises(ImproperlyConfigured):
+                    importlib.reload(settings_module)
+        finally:
+            importlib.reload(settings_module)
+
+
+# Testing the decisions of the replica router, without a replica database
+@override_settings(READ_REPLICA_ALIAS='replica')
+class TestReplicaRouter(SimpleTestCase):
+
+    # Test the writes, and the reads outside of the read-only requests, use the primary
+    def test_router_defaults_to_primary(self):
+        router = ReplicaRouter()
+
+        self.assertIsNone(router.db_for_read(ToDoList))
+        self.assertEqual(router.db_for_write(ToDoList), 'default')
+
+        token = use_replica.set(True)
+        try:
+            self.assertEqual(router.db_for_read(ListItem), 'replica')
+            self.assertIsNone(router.db_for_read(Session))
+            self.assertEqual(router.db_for_write(ToDoList), 'default')
+        finally:
+            use_replica.reset(token)
+
+
+# Testing the cached sessions and users (opt-in, on a shared cache in production)
+@override_settings(SESSION_ENGINE='todo_list_app.session_store', AUTH_USER_CACHE_TIMEOUT=300)
+class TestCachedSessions(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        get_dashboard_cache().clear()
+        User = get_user_model()
+        self.client = Client()
+        self.user_pswd = "123456789"
+        self.test_user = User.objects.create_user(username= "test_username", password=self.user_pswd)
+        self.client.login(username=self.test_user.username, password=self.user_pswd)
+        self.client.get(reverse('dashboard'))
+
+    # Test the anonymous pages neither read a session nor a user
+    def test_anonymous_pages_run_no_query(self):
+        anonymous_client = Client()
+        for url_name in ('home', 'login', 'register'):
+            with self.assertNumQueries(0):
+                response = anonymous_client.get(reverse(url_name))
+            self.assertEqual(response.status_code, 200)
+
+    # Test a logged in request reads its session and its user from the cache
+    def test_logged_in_request_skips_identity_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, "Dashboard")
+
+        # The database sessions read both on every request
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db', AUTH_USER_CACHE_TIMEOUT=0):
+            db_client = Client()
+            db_client.login(username=self.test_user.username, password=self.user_pswd)
+            with self.assertNumQueries(2):
+                db_client.get(reverse('home'))
+
+    # Test the login writes the new session through to the database
+    def test_login_writes_session_through(self):
+        session = Session.objects.get(session_key=self.client.session.session_key)
+
+        self.assertEqual(session.get_decoded()['_auth_user_id'], str(self.test_user.id))
+
+    # Test the changes of an existing session are written behind, in one query for all the pending sessions
+    @override_settings(SESSION_WRITE_BEHIND_SECONDS=3600)
+    def test_changes_are_written_behind(self):
+        pending_session_writes.flush()
+        session_key = self.client.session.session_key
+
+        store = SessionStore(session_key)
+        store['theme'] = "dark"
+        with self.assertNumQueries(0):
+            store.save()
+
+        self.assertEqual(SessionStore(session_key)['theme'], "dark")
+        self.assertNotIn('theme', Session.objects.get(session_key=session_key).get_decoded())
+
+        with self.assertNumQueries(1):
+            self.assertEqual(pending_session_writes.flush(), 1)
+        self.assertEqual(Session.objects.get(session_key=session_key).get_decoded()['theme'], "dark")
+
+    # Test a pending write never brings back a session deleted by a logout
+    @override_settings(SESSION_WRITE_BEHIND_SECONDS=3600)
+    def test_logout_drops_pending_write(self):
+        session_key = self.client.session.session_key
+        store = SessionStore(session_key)
+        store['theme'] = "dark"
+        store.save()
+
+        self.client.logout()
+        pending_session_writes.flush()
+
+        self.assertFalse(Session.objects.filter(session_key=session_key).exists())
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 302)
+
+    # Test the pending writes are flushed by a timer, even when no later save comes
+    @override_settings(SESSION_WRITE_BEHIND_SECONDS=0.01)
+    def test_timer_flushes_pending_writes(self):
+        pending_session_writes.flush()
+        flushed = threading.Event()
+        store = SessionStore(self.client.session.session_key)
+        store['theme'] = "dark"
+
+        with mock.patch.object(pending_session_writes, 'flush_from_timer', flushed.set):
+            store.save()
+            self.assertTrue(flushed.wait(5))
+        pending_session_writes.flush()
+        self.assertIsNone(pending_session_writes.timer)
+
+    # Test the cached sessions and users refuse to run on a cache private to each process
+    def test_requires_shared_cache(self):
+        from todo_list_project import settings as settings_module
+        try:
+            with mock.patch.dict(os.environ, {'TODO_SESSION_BACKEND': "cache", 'TODO_SESSION_CACHE_BACKEND': "locmem"}):
+                with self.assertRaises(ImproperlyConfigured):
+                    importlib.reload(settings_module)
+            with mock.patch.dict(os.environ, {'TODO_SESSION_BACKEND': "cache", 'TODO_SESSION_CACHE_BACKEND': "redis"}):
+                self.assertEqual(importlib.reload(settings_module).SESSION_ENGINE, 'todo_list_app.session_store')
+        finally:
+            importlib.reload(settings_module)
+
+    # Test the pending writes queued for a database since replaced (e.g. a destroyed test database) are dropped
+    @override_settings(SESSION_WRITE_BEHIND_SECONDS=3600)
+    def test_pending_writes_of_replaced_database_are_dropped(self):
+        pending_session_writes.flush()
+        session_key = self.client.session.session_key
+        store = SessionStore(session_key)
+        store['theme'] = "dark"
+        store.save()
+
+        pending_session_writes.database = ('default', "replaced.sqlite3")
+        with self.assertNumQueries(0):
+            self.assertEqual(pending_session_writes.flush(), 0)
+        self.assertNotIn('theme', Session.objects.get(session_key=session_key).get_decoded())
+
+    # Test a saved user is dropped from the cache, so a password change logs the other sessions out
+    def test_user_save_drops_cached_user(self):
+        self.assertIsNotNone(get_user_cache().get(user_cache_key(self.test_user.id)))
+
+        self.test_user.set_password("a new password")
+        self.test_user.save()
+
+        self.assertIsNone(get_user_cache().get(user_cache_key(self.test_user.id)))
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 302)
+
+
+# Testing the request metrics and the /metrics endpoint
+class TestRequestMetrics(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        for histogram in REQUEST_HISTOGRAMS:
+            histogram.clear()
+        get_dashboard_cache().clear()
+        User = get_user_model()
+        self.client = Client()
+        self.test_user = User.objects.create_user(username= "test_username", password="123456789")
+        self.client.force_login(self.test_user)
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Helper returning the series of a histogram for a view, a method and a form_type
+    def series(self, histogram, method, form_type="", view="todo_list_app.views.dashboard_view"):
+        return histogram.series[(('view', view), ('method', method), ('form_type', form_type))]
+
+    # Test each dashboard branch gets its own series, with the request's queries
+    def test_dashboard_branches_are_labelled(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.list_url, {'form_type': 'add_list_item', 'list_item_text': "New task"})
+        self.assertEqual(self.series(REQUEST_QUERIES, "POST", "add_list_item")['sum'], len(queries))
+
+        self.client.post(self.list_url, {'form_type': 'unknown_form'})
+        self.client.get(self.list_url)
+
+        self.assertEqual(self.series(REQUEST_DURATION, "POST", "other")['count'], 1)
+        self.assertGreater(self.series(REQUEST_TEMPLATE_DURATION, "GET")['sum'], 0)
+        self.assertEqual(self.series(REQUEST_TEMPLATE_DURATION, "POST", "add_list_item")['sum'], 0)
+
+    # Test the queries of the async views, run in worker threads, are counted
+    def test_async_view_queries_are_counted(self):
+        async_client = AsyncClient()
+        async_client.cookies = self.client.cookies
+
+        with override_settings(ROOT_URLCONF=build_urlconf(async_views)):
+            with CaptureQueriesContext(connection) as queries:
+                async_to_sync(async_client.get)(self.list_url)
+
+        series = self.series(REQUEST_QUERIES, "GET", view="todo_list_app.async_views.dashboard_view")
+        self.assertEqual(series['sum'], len(queries))
+        self.assertGreater(series['sum'], 0)
+
+    # Test the endpoint serves the histograms in the Prometheus text format
+    @override_settings(METRICS_TOKEN="secret-token")
+    def test_metrics_endpoint(self):
+        self.client.get(self.list_url)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer secret-token")
+        content = response.content.decode()
+
+        self.assertEqual(response['Content-Type'], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn("# TYPE todo_request_duration_seconds histogram", content)
+        self.assertIn('todo_request_db_queries_bucket{view="todo_list_app.views.dashboard_view",method="GET",form_type="",le="+Inf"} 1', content)
+
+    # Test the endpoint requires the bearer token
+    @override_settings(METRICS_TOKEN="secret-token")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer wrong-token").status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer secret-token").status_code, 200)
+
+    # Test the endpoint does not exist without a token or with the metrics disabled
+    def test_metrics_not_public(self):
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer ").status_code, 404)
+        with override_settings(METRICS_ENABLED=False, METRICS_TOKEN="secret-token"):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer secret-token").status_code, 404)
+
+
+# Testing the request profiling and its report
+class TestRequestProfiling(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        self.profiles_dir = self.enterContext(tempfile.TemporaryDirectory())
+        User = get_user_model()
+        self.test_user = User.objects.create_user(username= "test_username", password="123456789")
+        self.test_list = ToDoList.objects.create(user= self.test_user, name= "Test_List")
+        self.list_url = reverse('view_list_items', kwargs={'list_id': self.test_list.id})
+
+    # Helper returning a logged in client whose middleware is loaded with the current settings
+    def logged_in_client(self):
+        client = Client()
+        client.force_login(self.test_user)
+        return client
+
+    # Test a sampled request leaves a pstats dump tagged with its view and form_type
+    def test_sampled_request_is_profiled(self):
+        with self.settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.profiles_dir):
+            response = self.logged_in_client().post(self.list_url, {'form_type': 'add_list_item', 'list_item_text': "New task"})
+
+        self.assertEqual(os.listdir(self.profiles_dir), [response[PROFILE_HEADER]])
+        self.assertTrue(response[PROFILE_HEADER].endswith("__todo_list_app.views.dashboard_view__add_list_item.prof"))
+
+    # Test only a validly signed header asks for the profile of an unsampled request
+    def test_signed_header(self):
+        with self.settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0, PROFILING_DIR=self.profiles_dir):
+            client = self.logged_in_client()
+            self.assertNotIn(PROFILE_HEADER, client.get(self.list_url))
+            self.assertNotIn(PROFILE_HEADER, client.get(self.list_url, HTTP_X_TODO_PROFILE="forged"))
+            self.assertIn(PROFILE_HEADER, client.get(self.list_url, HTTP_X_TODO_PROFILE=profile_token()))
+
+        self.assertEqual(len(os.listdir(self.profiles_dir)), 1)
+
+    # Test the report merges the cProfile dumps and the sampled stacks
+    def test_profile_report(self):
+        with self.settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.profiles_dir):
+            self.logged_in_client().get(self.list_url)
+            with self.settings(PROFILER='sampler', PROFILING_SAMPLE_INTERVAL=0.0005):
+                self.logged_in_client().get(self.list_url)
+
+        collapsed_path = os.path.join(self.profiles_dir, "merged.txt")
+        out = StringIO()
+        call_command('profile_report', dir=self.profiles_dir, view="dashboard_view", collapsed_output=collapsed_path, stdout=out)
+
+        self.assertIn("2  todo_list_app.views.dashboard_view [-]", out.getvalue())
+        self.assertIn("cProfile, 1 requests", out.getvalue())
+        self.assertIn("Sampled stacks, 1 requests", out.getvalue())
+        with open(collapsed_path) as collapsed_file:
+            self.assertIn("todo_list_app.views.dashboard_view", collapsed_file.read())
+
+
+# Testing the synthetic data generator
+class TestSeedPerf(TestCase):
+
+    # Helper seeding the database and returning the output of the command
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_perf', users=3, lists=4, items=25, chunk_size=7, stdout=out, **options)
+        return out.getvalue()
+
+    # Test the command creates N users, M lists per user and K items per list with correct counters
+    def test_seed_creates_rows(self):
+        output = self.seed()
+
+        self.assertIn("Created 3 users, 12 lists and 300 items", output)
+        self.assertEqual(ToDoList.objects.filter(user__username__startswith="perf_user_").count(), 12)
+        self.assertEqual(ListItem.objects.count(), 300)
+        self.assertEqual(UserRevision.objects.filter(revision=1).count(), 3)
+        self.assertFalse(ToDoList.objects.with_actual_counters().exclude(item_count=F('actual_item_count')).exists())
+        self.assertFalse(ToDoList.objects.with_actual_counters().exclude(completed_count=F('actual_completed_count')).exists())
+        self.assertTrue(all(0 < len(text) <= 100 for text in ListItem.objects.values_list('text', flat=True)))
+
+    # Test the seeded users can log in with the shared password
+    def test_seeded_users_can_log_in(self):
+        self.seed(password="Seeded_Passw0rd")
+
+        self.assertTrue(self.client.login(username="perf_user_2", password="Seeded_Passw0rd"))
+
+    # Test the same seed generates the same data
+    def test_seed_is_deterministic(self):
+        self.seed(seed=7, username_prefix="first_")
+        self.seed(seed=7, username_prefix="second_")
+
+        def generated(prefix):
+            return list(ListItem.objects.filter(list__user__username__startswith=prefix).order_by('id').values_list('list__name', 'text', 'isCompleted'))
+
+        self.assertEqual(generated("first_"), generated("second_"))
+
+        with self.assertRaises(CommandError):
+            self.seed(username_prefix="first_")
+
+
+# Testing the benchmark harness and its regression check
+class TestBenchActions(TestCase):
+
+    # setUp Method
+    def setUp(self):
+        get_dashboard_cache().clear()
+        self.baseline = {'scales': {'small': {
+            'dashboard': {'p50_ms': 4.0, 'p95_ms': 6.0, 'queries': 1.0},
+            'add_list': {'p50_ms': 6.0, 'p95_ms': 10.0, 'queries': 5.0},
+        }}}
+
+    # Helper returning results differing from the baseline by the given changes
+    def results(self, **changes):
+        scales = {'small': {action: dict(result) for action, result in self.baseline['scales']['small'].items()}}
+        for action, result in changes.items():
+            scales['small'][action].update(result)
+        return {'scales': scales}
+
+    # Test an extra query per request is a regression
+    def test_extra_query_is_regression(self):
+        regressions = find_regressions(self.results(add_list={'queries': 6.0}), self.baseline, 0.25, 2.0)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("small/add_list: 6.0 queries per request", regressions[0])
+
+    # Test a latency growth is a regression only beyond the threshold, the minimum delta, and on both p50 and p95
+    def test_latency_regression(self):
+        slower = self.results(add_list={'p50_ms': 9.0, 'p95_ms': 14.0})
+        self.assertEqual(len(find_regressions(slower, self.baseline, 0.25, 2.0)), 1)
+        self.assertEqual(find_regressions(slower, self.baseline, 0.5, 2.0), [])
+        self.assertEqual(find_regressions(slower, self.baseline, 0.25, 5.0), [])
+
+        # A single slow request only moves the p95
+        outlier = self.results(dashboard={'p95_ms': 30.0})
+        self.assertEqual(find_regressions(outlier, self.baseline, 0.25, 2.0), [])
+
+        # The actions missing from the baseline are not compared
+        new_action = self.results()
+        new_action['scales']['small']['home'] = {'p50_ms': 100.0, 'p95_ms': 100.0, 'queries': 10.0}
+        self.assertEqual(find_regressions(new_action, self.baseline, 0.25, 2.0), [])
+
+    # Test a scale run seeds the data and measures every action with its queries per request
+    def test_run_scale_measures_every_action(self):
+        command = BenchActionsCommand(stdout=StringIO())
+        options = {'requests': 2, 'actions': None, 'handler': 'wsgi', 'seed': 1}
+        results = command.run_scale({'users': 2, 'lists': 2, 'items': 3}, options)
+
+        self.assertEqual(list(results), list(ACTIONS))
+        for result in results.values():
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+            self.assertGreater(result['rps'], 0)
+        self.assertEqual(results['home']['queries'], 0)
+        self.assertEqual(results['dashboard']['queries'], 3)
+        self.assertEqual(results['add_list_item']['queries'], 9)
+
+    # Test the committed baselines cover every action of the default scales, with the queries the actions run
+    def test_committed_baselines(self):
+        for handler in ('wsgi', 'asgi'):
+            with open(baseline_path(DEFAULT_BASELINE, handler)) as baseline_file:
+                baseline = json.load(baseline_file)
+
+            self.assertEqual(baseline['handler'], handler)
+            for scale in ('small', 'medium'):
+                self.assertEqual(sorted(baseline['scales'][scale]), sorted(ACTIONS))
+                self.assertEqual(baseline['scales'][scale]['dashboard']['queries'], 3)
+                # Outside of a test transaction, the form's transaction adds a savepoint around the model's
+                self.assertEqual(baseline['scales'][scale]['add_list_item']['queries'], 11)
+        self.assertEqual(baseline_path("other.json", 'wsgi'), "other.json")
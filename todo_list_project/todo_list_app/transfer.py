@@ -0,0 +1,216 @@
+import csv
+import json
+from collections import Counter
+from itertools import islice
+from django.db import transaction
+from .models import ListItem, ToDoList, UserRevision
+from .signals import notify_dashboard_changed
+
+# Export and import of a user's lists as CSV or NDJSON (one JSON object per line). Both formats hold
+# one row per item with the list it belongs to, a list without items is a row without text:
+#   list_id, list_name, text, isCompleted
+# The exports are streamed from a server-side cursor and the imports are parsed as a stream, so the
+# memory used does not grow with the size of the file.
+
+TRANSFER_COLUMNS = ('list_id', 'list_name', 'text', 'isCompleted')
+
+# Content type of each supported format
+TRANSFER_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Size of the chunks of text yielded by the streamed exports
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+# Values accepted for isCompleted in the imported files
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('', '0', 'false', 'no')
+
+class ImportFileError(Exception):
+    """ Raised when a row of an imported file is invalid, the rows of the previous chunks stay imported.
+
+    Attributes:
+        line(int): Number of the invalid line in the file.
+        imported(dict): Number of lists and items imported before the error.
+    """
+
+    def __init__(self, line, message, imported=None):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+        self.imported = imported or {'lists': 0, 'items': 0}
+
+def export_rows(user, chunk_size):
+    """
+    Brief: Returns an iterator over the export rows of a user's lists and items.
+
+    Details: A single query joins the lists to their items (lists without items are kept),
+             in list then item order. The rows are fetched chunk_size at a time.
+
+    Args:
+        user: The user whose lists are exported.
+        chunk_size: The number of rows fetched per round-trip to the database.
+    """
+    rows = ToDoList.objects.owned_by(user).order_by('id', 'listitem__id').values_list(
+        'id', 'name', 'listitem__text', 'listitem__isCompleted',
+    )
+
+    # The database is chosen now, the rows are read while the response streams, after the request's routing has ended
+    return rows.using(rows.db).iterator(chunk_size=chunk_size)
+
+def buffered(lines):
+    """ Joins the lines of a streamed export into chunks of about EXPORT_BUFFER_SIZE characters. """
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+class EchoBuffer:
+    """ A file-like object returning what is written to it, so csv.writer formats one row at a time. """
+
+    def write(self, value):
+        return value
+
+def csv_lines(rows):
+    """ Formats the export rows as CSV lines, starting with the header. """
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(TRANSFER_COLUMNS)
+    for list_id, list_name, text, is_completed in rows:
+        yield writer.writerow([list_id, list_name, text or '', '' if is_completed is None else str(is_completed).lower()])
+
+def ndjson_lines(rows):
+    """ Formats the export rows as NDJSON lines. """
+    for row in rows:
+        yield json.dumps(dict(zip(TRANSFER_COLUMNS, row))) + "\n"
+
+def stream_export(user, export_format, chunk_size):
+    """ Returns a generator of the chunks of text of a user's export in the given format ('csv' or 'ndjson'). """
+    format_lines = csv_lines if export_format == 'csv' else ndjson_lines
+    return buffered(format_lines(export_rows(user, chunk_size)))
+
+def parse_csv(lines):
+    """ Yields the line number and the dict of every row of a CSV file, whose first row holds the column names. """
+    reader = csv.DictReader(lines)
+    try:
+        for row in reader:
+            yield reader.line_num, row
+    except csv.Error as error:
+        raise ImportFileError(reader.line_num, f"Malformed CSV ({error}).")
+
+def parse_ndjson(lines):
+    """ Yields the line number and the object of every non-blank line of an NDJSON file. """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise ImportFileError(line_number, "Malformed JSON.")
+        if not isinstance(row, dict):
+            raise ImportFileError(line_number, "Every line must be a JSON object.")
+        yield line_number, row
+
+IMPORT_PARSERS = {
+    'csv': parse_csv,
+    'ndjson': parse_ndjson,
+}
+
+def clean_import_row(line_number, row):
+    """
+    Brief: Validates an imported row and returns its list key, list name, text and status.
+
+    Details: The rows are grouped into lists by their list_id (ids of the exporting account,
+             not of this one) or, without list_id, by their list name. A row without text only
+             creates its list.
+
+    Args:
+        line_number: Number of the row's line in the file.
+        row: The dict of the row.
+    """
+    list_name = str(row.get('list_name') or '').strip()
+    if not list_name or len(list_name) > ToDoList._meta.get_field('name').max_length:
+        raise ImportFileError(line_number, "'list_name' is required and limited to 64 characters.")
+
+    list_id = row.get('list_id')
+    list_key = ('id', str(list_id)) if list_id not in (None, '') else ('name', list_name)
+
+    text = str(row.get('text') or '').strip()
+    if len(text) > ListItem._meta.get_field('text').max_length:
+        raise ImportFileError(line_number, "'text' is limited to 100 characters.")
+
+    is_completed = row.get('isCompleted')
+    if not isinstance(is_completed, bool):
+        is_completed = str(is_completed if is_completed is not None else '').strip().lower()
+        if is_completed not in TRUE_VALUES + FALSE_VALUES:
+            raise ImportFileError(line_number, "'isCompleted' must be true or false.")
+        is_completed = is_completed in TRUE_VALUES
+
+    return list_key, list_name, text, is_completed
+
+def import_lists(user, rows, chunk_size):
+    """
+    Brief: Imports parsed rows as new lists and items of a user.
+
+    Details: The rows are read chunk_size at a time. Each chunk is validated, then written in
+             its own transaction: one bulk insert for its new lists, one for its items and one
+             counters UPDATE per list it touched, all stamped with one sync revision. A long
+             import therefore never holds the database write lock for long. If a row is
+             invalid, ImportFileError is raised and the previous chunks stay imported.
+             Returns the number of imported lists and items.
+
+    Args:
+        user: The user the lists are imported for.
+        rows: Iterable of (line number, row dict) pairs, see parse_csv and parse_ndjson.
+        chunk_size: The number of rows written per transaction.
+    """
+    list_ids = {}
+    imported = {'lists': 0, 'items': 0}
+    rows = iter(rows)
+
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            cleaned_rows = [clean_import_row(line_number, row) for line_number, row in chunk]
+
+            with transaction.atomic():
+                revision = UserRevision.objects.allocate(user.pk)
+
+                new_lists = {}
+                for list_key, list_name, _, _ in cleaned_rows:
+                    if list_key not in list_ids and list_key not in new_lists:
+                        new_lists[list_key] = ToDoList(user=user, name=list_name, revision=revision)
+                if new_lists:
+                    ToDoList.objects.bulk_create(new_lists.values(), batch_size=chunk_size)
+
+                new_items = []
+                items_counts = Counter()
+                completed_counts = Counter()
+                for list_key, _, text, is_completed in cleaned_rows:
+                    if not text:
+                        continue
+                    list_id = list_ids.get(list_key) or new_lists[list_key].pk
+                    new_items.append(ListItem(list_id=list_id, text=text, isCompleted=is_completed, revision=revision))
+                    items_counts[list_id] += 1
+                    completed_counts[list_id] += is_completed
+                ListItem.objects.bulk_create(new_items, batch_size=chunk_size)
+
+                for list_id, items_count in items_counts.items():
+                    ToDoList.objects.filter(pk=list_id).adjust_counters(items=items_count, completed=completed_counts[list_id], revision=revision)
+
+            list_ids.update((list_key, todo_list.pk) for list_key, todo_list in new_lists.items())
+            imported['lists'] += len(new_lists)
+            imported['items'] += len(new_items)
+    except ImportFileError as error:
+        error.imported = imported
+        raise
+    finally:
+        if imported['lists']:
+            notify_dashboard_changed(sender=ListItem, user_id=user.pk)
+
+    return imported
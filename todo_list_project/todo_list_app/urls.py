@@ -1,17 +1,47 @@
+import types
 from django.urls import path
-from django.urls import path, reverse_lazy
+from django.urls import include, path, reverse_lazy
+from django.conf import settings
 from django.contrib.auth import views as auth_views
-from . import views
+from . import views, api, metrics
 
-urlpatterns = [
-    path('', views.home_view, name="home"),
-    path('login/', views.login_view, name="login"),
-    path('register/', views.register_view, name="register"),
-    path('dashboard/', views.dashboard_view, name="dashboard"),
-    path('dashboard/<int:list_id>/', views.dashboard_view, name="view_list_items"),
-    path('dashboard/<int:list_id>/', views.dashboard_view, name="delete_list"),
-    path('dashboard/<int:list_id>/', views.dashboard_view, name="add_list_item"),
-    path('dashboard/<int:list_id>/<int:task_id>/', views.dashboard_view, name="delete_task"),
-    path('dashboard/<int:list_id>/<int:task_id>/', views.dashboard_view, name="toggle_task"), 
-    path('logout/', auth_views.LogoutView.as_view(next_page=reverse_lazy('home')), name='logout'),
-]
\ No newline at end of file
+def build_urlpatterns(page_views):
+    """ Returns the URL patterns of the app, with the login, register and dashboard pages served by the given views module. """
+    return [
+        path('', views.home_view, name="home"),
+        path('login/', page_views.login_view, name="login"),
+        path('register/', page_views.register_view, name="register"),
+        path('dashboard/', page_views.dashboard_view, name="dashboard"),
+        path('dashboard/events/', page_views.dashboard_events_view, name="dashboard_events"),
+        path('dashboard/<int:list_id>/', page_views.dashboard_view, name="view_list_items"),
+        path('dashboard/<int:list_id>/', page_views.dashboard_view, name="delete_list"),
+        path('dashboard/<int:list_id>/', page_views.dashboard_view, name="add_list_item"),
+        path('dashboard/<int:list_id>/', page_views.dashboard_view, name="batch_tasks"),
+        path('dashboard/<int:list_id>/', page_views.dashboard_view, name="complete_all"),
+        path('dashboard/<int:list_id>/', page_views.dashboard_view, name="reopen_all"),
+        path('dashboard/<int:list_id>/', page_views.dashboard_view, name="clear_completed"),
+        path('dashboard/<int:list_id>/<int:task_id>/', page_views.dashboard_view, name="delete_task"),
+        path('dashboard/<int:list_id>/<int:task_id>/', page_views.dashboard_view, name="toggle_task"),
+        path('api/v1/lists/', api.lists_view, name="api_lists"),
+        path('api/v1/lists/<int:list_id>/items/', api.list_items_view, name="api_list_items"),
+        path('api/v1/lists/<int:list_id>/items/batch/', api.list_items_batch_view, name="api_list_items_batch"),
+        path('api/v1/search/', api.search_view, name="api_search"),
+        path('api/v1/sync/', api.sync_view, name="api_sync"),
+        path('api/v1/export/', api.export_view, name="api_export"),
+        path('api/v1/import/', api.import_view, name="api_import"),
+        path('metrics', metrics.metrics_view, name="metrics"),
+        path('logout/', auth_views.LogoutView.as_view(next_page=reverse_lazy('home')), name='logout'),
+    ]
+
+def build_urlconf(page_views):
+    """ Returns a URLconf module (usable as ROOT_URLCONF) serving the pages of the app with the given views module. """
+    urlconf = types.ModuleType(f"todo_list_app_urls_{page_views.__name__}")
+    urlconf.urlpatterns = [path('', include(build_urlpatterns(page_views)))]
+    return urlconf
+
+# Under ASGI the async page views avoid the sync adapter (see asgi.py)
+if settings.ASYNC_VIEWS:
+    from . import async_views
+    urlpatterns = build_urlpatterns(async_views)
+else:
+    urlpatterns = build_urlpatterns(views)
@@ -1,14 +1,239 @@
 from django.contrib.auth import login
 from django.contrib import messages
-from django.db.models import Count
-from .forms import RegisterForm, LoginForm, AddListForm, AddListItemForm
+from .forms import RegisterForm, LoginForm, AddListForm, AddListItemForm, BatchTasksForm, HASHING_BUSY_MESSAGE
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.vary import vary_on_headers
+from django.views.decorators.http import condition
 from .models import ListItem, ToDoList
+from .dashboard_cache import get_fragment_cache_context, get_dashboard_version, dashboard_etag
+from .pagination import parse_cursor
+from .search import search_items
+from .hashing import PasswordHashingBusy
+from .database import atomic_with_retry, retry_on_busy
+from .events import dashboard_event_stream
+from .routers import reads_from_replica
+from functools import wraps
+from django.http import Http404, StreamingHttpResponse
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.shortcuts import redirect, render, get_object_or_404
 
 # Create your views here.
 
+def wants_fragment(request):
+    """ Whether the request has been sent by dashboard.js and expects a partial HTML response. """
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+# Fragments of the dashboard dashboard.js can fetch (?fragment=<name>), to refresh them after a live update
+DASHBOARD_FRAGMENTS = {
+    'sidebar': 'todo_list_app/partials/sidebar_lists.html',
+    'tasks': 'todo_list_app/partials/task_list.html',
+}
+
+def fragment_template(request, list_id):
+    """
+    Brief: Returns the template of the dashboard fragment requested by dashboard.js, None for a full page.
+
+    Details: The side-bar can be requested with or without a selected list, the task list
+             (first page) and the next pages of items only with a selected list.
+
+    Args:
+        request: The received request.
+        list_id: Id of the selected list, None if no list is selected.
+    """
+    if not wants_fragment(request):
+        return None
+
+    fragment = request.GET.get('fragment')
+    if fragment == 'sidebar':
+        return DASHBOARD_FRAGMENTS[fragment]
+    if list_id:
+        return DASHBOARD_FRAGMENTS.get(fragment, 'todo_list_app/partials/task_page.html')
+    return None
+
+def task_page_arguments(request, list_id):
+    """
+    Brief: Returns the after, page_size and until arguments of load_dashboard for a request.
+
+    Details: A live update re-fetches the task list up to the last task dashboard.js has loaded
+             (?fragment=tasks&until=<id>), so the pages loaded with "Load more" stay on the page,
+             up to DASHBOARD_ITEMS_REFRESH_LIMIT tasks. The other requests get one page of tasks.
+
+    Args:
+        request: The received request.
+        list_id: Id of the selected list, None if no list is selected.
+    """
+    after = parse_cursor(request.GET.get('after'))
+    until = parse_cursor(request.GET.get('until'))
+    if until and fragment_template(request, list_id) == DASHBOARD_FRAGMENTS['tasks']:
+        return {'after': after, 'page_size': settings.DASHBOARD_ITEMS_REFRESH_LIMIT, 'until': until}
+    return {'after': after, 'page_size': settings.DASHBOARD_ITEMS_PAGE_SIZE}
+
+# Rows and side-bar entry changed by a task mutation, swapped in the page by dashboard.js
+TASK_MUTATION_TEMPLATE = 'todo_list_app/partials/task_mutation.html'
+
+def task_mutation_response(request, current_list, task=None, removed_task_id=None):
+    """
+    Brief: Renders the partial HTML answering a task added, toggled or deleted by dashboard.js.
+
+    Details: Replaces the POST-redirect-GET of the forms: only the changed row and the side-bar
+             entry of the list (with its updated counters) are rendered. The new dashboard version
+             is sent in a header, so the page ignores the live update event of its own change.
+
+    Args:
+        request: The received request.
+        current_list: The changed list, loaded with its side-bar fields.
+        task: The added or toggled task, None if a task has been deleted.
+        removed_task_id: Id of the deleted task, None otherwise.
+    """
+    context = {'current_list': current_list, 'task': task, 'removed_task_id': removed_task_id}
+    response = render(request, template_name=TASK_MUTATION_TEMPLATE, context=context)
+    response['X-Dashboard-Version'] = get_dashboard_version(request.user.pk)
+    return response
+
+def get_owned_list(request, list_id):
+    """ Returns the list of the user with the given id (only its id and owner), raises Http404 otherwise. """
+    return get_object_or_404(ToDoList.objects.owned_by(request.user).only('id', 'user_id'), id=list_id)
+
+def get_owned_task(request, list_id, task_id, *fields):
+    """ Returns the task of the user's list loaded with the given fields, a single joined query checks both ownerships. """
+    return get_object_or_404(ListItem.objects.owned_by(request.user).for_mutation(*fields), id=task_id, list_id=list_id)
+
+def toggle_task(task):
+    """ Marks a task as completed, or as not completed again, and returns it. """
+    task.isCompleted = not task.isCompleted
+    task.save(update_fields=['isCompleted'])
+    return task
+
+def add_list_action(request, list_id, task_id):
+    """ Adds the list of the add_list form to the user. """
+    add_list_form = AddListForm(request.POST)
+    if add_list_form.is_valid():
+        added_list_name = add_list_form.cleaned_data.get('list_name')
+        atomic_with_retry(lambda: ToDoList.objects.create(name = added_list_name, user= request.user))
+        messages.success(request, 'New list added successfully!')
+        return redirect('dashboard')
+
+def delete_list_action(request, list_id, task_id):
+    """ Moves the selected list to the trash. """
+    if list_id:
+        atomic_with_retry(lambda: get_owned_list(request, list_id).soft_delete())
+        messages.success(request, 'Selected list deleted successfully!')
+        return redirect('dashboard')
+
+def add_list_item_action(request, list_id, task_id):
+    """ Adds the task of the add_list_item form to the selected list. """
+    add_list_item_form = AddListItemForm(request.POST)
+    if list_id and add_list_item_form.is_valid():
+        list_item_text = add_list_item_form.cleaned_data.get('list_item_text')
+        task = atomic_with_retry(lambda: ListItem.objects.create(list = get_owned_list(request, list_id), text=list_item_text))
+        if wants_fragment(request):
+            return task_mutation_response(request, ToDoList.objects.for_sidebar().get(id=list_id), task=task)
+        messages.success(request, 'New list item added successfully!')
+        return redirect('view_list_items', list_id = list_id)
+
+def batch_tasks_action(request, list_id, task_id):
+    """ Applies the action of the batch_tasks form to all the selected tasks, in one transaction and one statement. """
+    batch_tasks_form = BatchTasksForm(request.POST)
+    if list_id and batch_tasks_form.is_valid():
+        batch_action = batch_tasks_form.cleaned_data.get('batch_action')
+        task_ids = batch_tasks_form.cleaned_data.get('task_ids')
+        atomic_with_retry(lambda: ListItem.objects.apply_batch(get_owned_list(request, list_id), **{batch_action: task_ids}))
+        messages.success(request, 'Selected tasks updated successfully!')
+        return redirect('view_list_items', list_id = list_id)
+
+def list_operation_action(request, list_id, task_id):
+    """ Completes, reopens or clears the tasks of the selected list, as a single UPDATE or DELETE over its items. """
+    if list_id:
+        list_operations = {
+            'complete_all': ToDoList.complete_all,
+            'reopen_all': ToDoList.reopen_all,
+            'clear_completed': ToDoList.clear_completed,
+        }
+        list_operation = list_operations[request.POST.get('form_type')]
+        atomic_with_retry(lambda: list_operation(get_owned_list(request, list_id)))
+        messages.success(request, 'Selected list updated successfully!')
+        return redirect('view_list_items', list_id = list_id)
+
+def delete_task_action(request, list_id, task_id):
+    """ Deletes the selected task. """
+    if list_id and task_id:
+        atomic_with_retry(lambda: get_owned_task(request, list_id, task_id, 'isCompleted').delete())
+        if wants_fragment(request):
+            return task_mutation_response(request, ToDoList.objects.for_sidebar().get(id=list_id), removed_task_id=task_id)
+        messages.success(request, 'Selected list deleted successfully!')
+        return redirect('view_list_items', list_id = list_id)
+
+def toggle_task_action(request, list_id, task_id):
+    """ Marks the selected task as completed, or as not completed again. """
+    if list_id and task_id:
+        task = atomic_with_retry(lambda: toggle_task(get_owned_task(request, list_id, task_id, 'isCompleted', 'text')))
+        if wants_fragment(request):
+            return task_mutation_response(request, ToDoList.objects.for_sidebar().get(id=list_id), task=task)
+        return redirect('view_list_items', list_id = list_id)
+
+# Handler of each form of the dashboard (form_type), shared by the sync and the async dashboard views
+DASHBOARD_ACTIONS = {
+    'add_list': add_list_action,
+    'delete_list': delete_list_action,
+    'add_list_item': add_list_item_action,
+    'batch_tasks': batch_tasks_action,
+    'complete_all': list_operation_action,
+    'reopen_all': list_operation_action,
+    'clear_completed': list_operation_action,
+    'delete_task': delete_task_action,
+    'toggle_task': toggle_task_action,
+}
+
+def handle_dashboard_post(request, list_id=None, task_id=None):
+    """
+    Brief: Handles a form posted to the dashboard, returns its response.
+
+    Details: Returns None when the form is unknown or invalid, or when the list or the task it
+             needs is not selected: the dashboard is then rendered as for a GET request.
+             The ownership checks and the writes of each form run in one transaction, retried
+             when the database is locked (atomic_with_retry); the response rendered after the
+             commit is not, so a lock error there never repeats the write.
+             Blocking, the async dashboard view calls it in a worker thread.
+
+    Args:
+        request: The received request.
+        list_id: Id of the selected list, None if no list is selected.
+        task_id: Id of the selected task, None if no task is selected.
+    """
+    action = DASHBOARD_ACTIONS.get(request.POST.get('form_type'))
+    if action is None:
+        return None
+    return action(request, list_id, task_id)
+
+def without_replica_etag(view_func):
+    """
+    Brief: A decorator removing the ETag of the dashboard pages rendered from the read replica.
+
+    Details: The ETag names the current dashboard version, but the replica may not have caught up
+             with it yet: a client revalidating a stale page with that ETag would be answered 304
+             until the next change. The 304 responses to the primary's ETags are kept.
+
+    Args:
+        view_func: The decorated view, wrapping the condition() decorator.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if reads_from_replica() and response.status_code != 304:
+            del response['ETag']
+        return response
+
+    return wrapper
+
+def event_stream_response(stream):
+    """ Wraps a Server-Sent Events stream in a response that is never buffered nor cached. """
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 # Home Page View 
 def home_view(request):
     return render(request, template_name='todo_list_app/home.html')
@@ -58,11 +283,14 @@ def register_view(request):
             registered_email = register_form.cleaned_data.get('email') 
             registered_password = register_form.cleaned_data.get('password')
 
-            # Create a new user in the DB 
-            User.objects.create_user(registered_user_name, registered_email, registered_password)
-
-            # Redirect to the dashboard view to start creating To-Do Lists.
-            return redirect('login')
+            # Create a new user in the DB, its password is hashed on the hashing pool
+            try:
+                User.objects.create_user(registered_user_name, registered_email, registered_password)
+            except PasswordHashingBusy:
+                register_form.add_error(None, HASHING_BUSY_MESSAGE)
+            else:
+                # Redirect to the dashboard view to start creating To-Do Lists.
+                return redirect('login')
     else: 
         register_form = RegisterForm()
         
@@ -71,6 +299,11 @@ def register_view(request):
 
 # Dashboard Page View 
 @login_required
+@cache_control(private=True, no_cache=True)
+@vary_on_headers('X-Requested-With')
+@without_replica_etag
+@condition(etag_func=dashboard_etag)
+@retry_on_busy
 def dashboard_view(request, list_id=None, task_id=None):
     """
     Brief: A view method that handles the dashboard view.
@@ -80,83 +313,68 @@ def dashboard_view(request, list_id=None, task_id=None):
              of a selected list from the DB and handles the addition, deletion and toggeling
              of a selected list item within the list.  
              This view function is restricted to only accept HTTP request POST. 
+             GET requests carrying a matching ETag are answered with 304 Not Modified without
+             loading the lists or rendering the template. No Last-Modified date is sent: its whole
+             seconds cannot tell apart the changes made within the same second. The pages rendered
+             from the read replica are not cached, neither their fragments nor with an ETag.
+             The items of the selected list are rendered one page at a time (?after=<id>),
+             dashboard.js fetches the next pages as HTML fragments.
+             A ?q= parameter searches the text of all the user's tasks.
+             The tasks added, toggled or deleted by dashboard.js are answered with the changed
+             row and side-bar entry instead of a redirect.
     
     Args:
         request: The received request.
         list_id: Id of the selected/current list, initially is none.
     """ 
-    # All the lists owned by the logged in user 
-    lists = ToDoList.objects.filter(user=request.user).annotate(list_items_count=Count('listitem'))
-
     # Context for the view 
     context = {
-        'lists': lists, 
         'add_list_form': None,
         'add_list_item_form': None, 
-        'current_list': None,
-        'task': None,
+        'live_updates': settings.DASHBOARD_LIVE_UPDATES,
     }
 
-    # Handle the addition and the deletion of the list items 
+    # Handle the addition and the deletion of the lists and of the list items
     if request.method == "POST": 
-       form_type = request.POST.get('form_type')
-       if form_type == 'add_list':
-          # Create an object from the Form
-          add_list_form = AddListForm(request.POST)
-          if add_list_form.is_valid():
-                added_list_name = add_list_form.cleaned_data.get('list_name')
-                ToDoList.objects.create(name = added_list_name, user= request.user)
-                context['add_list_form'] =  add_list_form
-                messages.success(request, 'New list added successfully!')
-                return redirect('dashboard')
-       elif form_type == 'delete_list':
-            if list_id: 
-                current_list = get_object_or_404(ToDoList, id=list_id, user= request.user) 
-                context['current_list'] = current_list
-                current_list.delete()
-                context['current_list'] = None
-                messages.success(request, 'Selected list deleted successfully!')
-                return redirect('dashboard')
-       elif form_type == 'add_list_item':
-            add_list_item_form = AddListItemForm(request.POST)
-            if add_list_item_form.is_valid():
-                    list_item_text =  add_list_item_form.cleaned_data.get('list_item_text')
-                    if list_id:
-                        current_list = get_object_or_404(ToDoList, id=list_id, user= request.user) 
-                        context['current_list'] = current_list
-                        context['add_list_item_form'] = add_list_item_form
-                        ListItem.objects.create(list = current_list, text=list_item_text )
-                        messages.success(request, 'New list item added successfully!')
-                        return redirect('view_list_items', list_id = list_id)
-       elif form_type == 'delete_task':
-            if list_id and task_id: 
-                current_list = get_object_or_404(ToDoList, id=list_id, user= request.user) 
-                task = get_object_or_404(ListItem, id=task_id, list=current_list)
-                task.delete()
-                messages.success(request, 'Selected list deleted successfully!')
-                return redirect('view_list_items', list_id = list_id)
-       elif form_type == 'toggle_task':
-            if list_id and task_id: 
-                current_list = get_object_or_404(ToDoList, id=list_id, user= request.user) 
-                task = get_object_or_404(ListItem, id=task_id, list=current_list)
-                task.isCompleted = not task.isCompleted
-                task.save()
-                return redirect('view_list_items', list_id = list_id)
+        response = handle_dashboard_post(request, list_id, task_id)
+        if response is not None:
+            return response
 
-    else: 
-        add_list_form = AddListForm()
-        add_list_item_form = AddListItemForm()  
+    # Load the side-bar lists, the selected list and one page of its items (if a list_id is provided in the URL)
+    # and the selected task (if a task_id is provided in the URL) in a fixed number of queries.
+    context.update(ToDoList.objects.load_dashboard(request.user, list_id=list_id, task_id=task_id, **task_page_arguments(request, list_id)))
 
-    # Handle the selection of a list from the side-bar
-    # If a list_id is provided in the URL, fetch the corresponding list and its items
-    if list_id:
-        current_list = get_object_or_404(ToDoList, id=list_id, user=request.user)
-        context['current_list'] = current_list
+    # Search across all the tasks of the user (?q=<words>&page=<number>)
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        context['search_query'] = search_query
+        context['search'] = search_items(request.user, search_query, page=parse_cursor(request.GET.get('page')), page_size=settings.DASHBOARD_SEARCH_PAGE_SIZE)
+
+    # The next pages of items and the refreshed fragments are fetched by dashboard.js, only render them
+    template_name = fragment_template(request, list_id)
+    if template_name:
+        return render(request, template_name=template_name, context=context)
+
+    # Keys of the cached side-bar and task list fragments, the querysets are not executed on a cache hit
+    context.update(get_fragment_cache_context(request, store=not reads_from_replica()))
 
-    # Handle the selection of a list item from the selected list view.
-    # If a task_id is provided in the URL, fetch the corresponding list and its items
-    if task_id and list_id: 
-        task = get_object_or_404(ListItem, id=task_id, list=current_list)
-        context['task'] = task
+    return render(request, template_name='todo_list_app/dashboard.html', context=context)
+
+# Dashboard Live Updates View
+@login_required
+def dashboard_events_view(request):
+    """
+    Brief: A view method that streams the changes of the user's dashboard as Server-Sent Events.
+
+    Details: dashboard.js opens the stream and refreshes the side-bar and the open list when they
+             change, in an other tab or on an other device. Each open stream holds a worker thread,
+             the async version of this view (served with ASGI) does not. Raises Http404 unless
+             DASHBOARD_LIVE_UPDATES is on.
+
+    Args:
+        request: The received request.
+    """
+    if not settings.DASHBOARD_LIVE_UPDATES:
+        raise Http404("Live dashboard updates are disabled.")
 
-    return render(request, template_name='todo_list_app/dashboard.html', context=context)     
\ No newline at end of file
+    return event_stream_response(dashboard_event_stream(request.user.pk, request.headers.get('Last-Event-ID')))
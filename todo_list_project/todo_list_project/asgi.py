@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_list_project.settings')
 
+# Route the pages to their async views, so they run on the event loop instead of a sync thread
+os.environ.setdefault('TODO_ASYNC_VIEWS', '1')
+
 application = get_asgi_application()
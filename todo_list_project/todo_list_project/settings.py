@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os 
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,7 +25,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-d9=j=w*(r&nz*5_i-ph*a#3rwiw@1&o1^zo0+rrkff3g+(h^lt'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('TODO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = []
 
@@ -42,8 +43,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'todo_list_app.metrics.RequestMetricsMiddleware',
+    'todo_list_app.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'todo_list_app.routers.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -55,7 +59,8 @@ ROOT_URLCONF = 'todo_list_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The Django templates, with their rendering time recorded by the request metrics
+        'BACKEND': 'todo_list_app.metrics.MeasuredDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,10 +82,223 @@ WSGI_APPLICATION = 'todo_list_project.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('TODO_DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Database profile: 'development' (plain SQLite) or 'production' (SQLite tuned for concurrent workers).
+# `python manage.py bench_sqlite` compares the throughput of both under concurrent writes.
+DATABASE_PROFILE = os.environ.get('TODO_DATABASE_PROFILE', 'development')
+
+# Pragmas run on every new connection of the production profile:
+# - journal_mode=WAL: the readers and the writer no longer block each other
+# - synchronous=NORMAL: with WAL, fsync at checkpoints instead of at every commit (a power loss may
+#   lose the last commits, never corrupt the database)
+# - busy_timeout: milliseconds a writer waits for the write lock before failing with "database is locked"
+# - mmap_size: bytes of the database file read through memory mapping instead of read() calls
+# - cache_size: page cache of each connection, negative values are in KiB
+# - temp_store=MEMORY: sorts and temporary indexes are kept in memory
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('TODO_SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+if DATABASE_PROFILE == 'production':
+    DATABASES['default'].update({
+        # Persistent connections: the pragmas and the page cache survive across requests
+        'CONN_MAX_AGE': int(os.environ.get('TODO_DATABASE_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ";".join(f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()),
+            # Write transactions take the write lock at BEGIN, where busy_timeout applies, instead of
+            # failing at once when a deferred transaction tries to upgrade its read lock
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+
+# Read replica: with TODO_DATABASE_REPLICA_PATH set, the GET requests read the lists, items and users
+# from a second SQLite file (kept up to date by `manage.py sync_replica` or an external replication),
+# see todo_list_app/routers.py. The reads of a user that has just written stay on 'default' for
+# REPLICA_PIN_SECONDS. Without it there is no 'replica' alias.
+DATABASE_REPLICA_PATH = os.environ.get('TODO_DATABASE_REPLICA_PATH')
+if DATABASE_REPLICA_PATH:
+    DATABASES['replica'] = {**DATABASES['default'], 'NAME': DATABASE_REPLICA_PATH}
+READ_REPLICA_ALIAS = 'replica' if DATABASE_REPLICA_PATH else None
+REPLICA_PIN_SECONDS = int(os.environ.get('TODO_REPLICA_PIN_SECONDS', 5))
+
+DATABASE_ROUTERS = ['todo_list_app.routers.ReplicaRouter']
+
+# Attempts and first delay (in seconds, doubled at each attempt) of the dashboard write transactions,
+# and of the read-only dashboard requests, that fail because the database is locked by another writer
+DATABASE_BUSY_RETRIES = 3
+DATABASE_BUSY_RETRY_DELAY = 0.05
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Backend of the dashboard fragments cache and versions: 'file' or 'db' (requires `manage.py createcachetable`)
+# are shared by every worker process on the node, so a change made through one of them invalidates the
+# pages of all of them. 'locmem' is private to each process, only allowed with DEBUG (see below).
+DASHBOARD_CACHE_BACKEND = os.environ.get('TODO_DASHBOARD_CACHE_BACKEND', 'file')
+SHARED_DASHBOARD_CACHE_BACKENDS = ('file', 'db')
+
+DASHBOARD_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'todo-dashboard',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('TODO_DASHBOARD_CACHE_LOCATION', BASE_DIR / 'cache' / 'dashboard'),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ.get('TODO_DASHBOARD_CACHE_LOCATION', 'todo_dashboard_cache'),
+    },
+}
+
+# Backend of the sessions and users cache: 'redis' (requires redis) or 'memcached' (requires pymemcache),
+# shared by every process, so a logout or a password change is seen by all of them at once. 'locmem'
+# is private to each process, the cached sessions and users refuse to run on it (see below).
+SESSION_CACHE_BACKEND = os.environ.get('TODO_SESSION_CACHE_BACKEND', 'locmem')
+
+SESSION_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'todo-sessions',
+        # Bounded size: once MAX_ENTRIES is reached 1/CULL_FREQUENCY of the entries are evicted
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('TODO_SESSION_CACHE_MAX_ENTRIES', 10000)),
+            'CULL_FREQUENCY': 3,
+        },
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('TODO_SESSION_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.environ.get('TODO_SESSION_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+}
+SHARED_SESSION_CACHE_BACKENDS = ('redis', 'memcached')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        **DASHBOARD_CACHE_BACKENDS[DASHBOARD_CACHE_BACKEND],
+        # Bounded size: once MAX_ENTRIES is reached 1/CULL_FREQUENCY of the entries are evicted
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('TODO_DASHBOARD_CACHE_MAX_ENTRIES', 5000)),
+            'CULL_FREQUENCY': 3,
+        },
+    },
+    'sessions': SESSION_CACHE_BACKENDS[SESSION_CACHE_BACKEND],
+}
+
+# A per-process cache would keep answering 304 and serving the fragments of the other processes' past versions,
+# and would only pin a user who has just written to the primary in one of them (see todo_list_app/routers.py)
+if DASHBOARD_CACHE_BACKEND not in SHARED_DASHBOARD_CACHE_BACKENDS and (not DEBUG or DATABASE_REPLICA_PATH):
+    raise ImproperlyConfigured(
+        "The dashboard cache must be shared by the worker processes without DEBUG or with a read replica: "
+        f"set TODO_DASHBOARD_CACHE_BACKEND to {' or '.join(SHARED_DASHBOARD_CACHE_BACKENDS)}."
+    )
+
+# Cache alias and timeout (in seconds) of the dashboard side-bar and task list fragments
+DASHBOARD_CACHE_ALIAS = 'dashboard'
+DASHBOARD_CACHE_TIMEOUT = 600
+
+# Sessions: 'db' reads and writes every session in the database. The opt-in 'cache' serves them from
+# the 'sessions' cache and writes their changes behind to the database (see todo_list_app/session_store.py).
+SESSION_BACKEND = os.environ.get('TODO_SESSION_BACKEND', 'db')
+SESSION_ENGINE = {
+    'cache': 'todo_list_app.session_store',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Seconds before the changes of a cached session reach the database (0 writes them through), and
+# number of pending sessions that triggers an earlier write
+SESSION_WRITE_BEHIND_SECONDS = float(os.environ.get('TODO_SESSION_WRITE_BEHIND_SECONDS', 5))
+SESSION_WRITE_BEHIND_MAX_PENDING = 500
+
+# Seconds a logged in user is served from the 'sessions' cache instead of the database (0 disables it),
+# enabled with the cached sessions by default
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('TODO_AUTH_USER_CACHE_TIMEOUT', 300 if SESSION_BACKEND == 'cache' else 0))
+
+# A per-process cache would keep serving a session logged out, or a user changed, through an other process
+if (SESSION_BACKEND == 'cache' or AUTH_USER_CACHE_TIMEOUT) and SESSION_CACHE_BACKEND not in SHARED_SESSION_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        "The cached sessions and users need a shared cache: set TODO_SESSION_CACHE_BACKEND to "
+        f"{' or '.join(SHARED_SESSION_CACHE_BACKENDS)}, or TODO_SESSION_BACKEND=db and TODO_AUTH_USER_CACHE_TIMEOUT=0."
+    )
+
+# Number of items rendered per page of the dashboard task list, and maximum number of items
+# re-rendered when a live update refreshes the pages already loaded by dashboard.js
+DASHBOARD_ITEMS_PAGE_SIZE = 50
+DASHBOARD_ITEMS_REFRESH_LIMIT = 1000
+
+# Number of results per page of the task search
+DASHBOARD_SEARCH_PAGE_SIZE = 20
+
+# Live dashboard updates (Server-Sent Events): broker class, events queued per open stream,
+# seconds between keep-alive comments, seconds before a stream is closed and re-opened by the
+# browser, and delay (in milliseconds) before the browser re-connects
+DASHBOARD_EVENTS_BROKER = 'todo_list_app.events.InProcessBroker'
+DASHBOARD_EVENTS_MAX_QUEUED = 100
+DASHBOARD_EVENTS_HEARTBEAT = 15
+DASHBOARD_EVENTS_MAX_SECONDS = 300
+DASHBOARD_EVENTS_RETRY_MS = 3000
+
+# Number of rows read per query by the exports, and inserted per transaction by the imports
+TRANSFER_CHUNK_SIZE = 2000
+
+# Background jobs: seconds a claimed job stays locked to its worker (it is claimed again after,
+# if the worker died), and seconds before a failed job is retried (doubled at every attempt, up
+# to JOBS_MAX_RETRY_DELAY)
+JOBS_LOCK_SECONDS = 300
+JOBS_RETRY_DELAY = 60
+JOBS_MAX_RETRY_DELAY = 3600
+
+# Defaults of `manage.py runworker`: jobs run in parallel, jobs claimed per query, and seconds
+# between two polls of an empty queue. With SQLite, parallel jobs still write one at a time.
+JOBS_WORKER_CONCURRENCY = int(os.environ.get('TODO_JOBS_WORKER_CONCURRENCY', 2))
+JOBS_WORKER_BATCH_SIZE = 10
+JOBS_WORKER_POLL_INTERVAL = 1.0
+
+# Number of items of a deleted list removed per transaction by its background purge
+PURGE_BATCH_SIZE = 500
+
+# Request metrics served at /metrics in the Prometheus text format (see todo_list_app/metrics.py).
+# The scrapers must send METRICS_TOKEN as a bearer token; without a token the endpoint is a 404.
+METRICS_ENABLED = os.environ.get('TODO_METRICS_ENABLED', '1') == '1'
+METRICS_TOKEN = os.environ.get('TODO_METRICS_TOKEN', '')
+
+# Opt-in request profiling (see todo_list_app/profiling.py): PROFILING_SAMPLE_RATE of the requests, and
+# the requests sending a signed X-Todo-Profile header (`manage.py profile_report --print-token`, valid
+# PROFILING_TOKEN_MAX_AGE seconds), are profiled with PROFILER: 'cprofile' (pstats dumps) or 'sampler'
+# (collapsed stacks sampled every PROFILING_SAMPLE_INTERVAL seconds). One file per request in PROFILING_DIR.
+PROFILING_ENABLED = os.environ.get('TODO_PROFILING_ENABLED', '0') == '1'
+PROFILER = os.environ.get('TODO_PROFILER', 'cprofile')
+PROFILING_SAMPLE_RATE = float(os.environ.get('TODO_PROFILING_SAMPLE_RATE', 0))
+PROFILING_SAMPLE_INTERVAL = 0.005
+PROFILING_TOKEN_MAX_AGE = 3600
+PROFILING_DIR = os.environ.get('TODO_PROFILING_DIR', BASE_DIR / 'profiles')
+
+# Serve the login, register and dashboard pages with their async views (enabled by asgi.py)
+ASYNC_VIEWS = os.environ.get('TODO_ASYNC_VIEWS', '0') == '1'
+
+# Live dashboard updates: the open dashboards keep an event stream open. Only the async view waits
+# for the events without holding a worker thread, so they are on by default under ASGI only.
+DASHBOARD_LIVE_UPDATES = os.environ.get('TODO_DASHBOARD_LIVE_UPDATES', '1' if ASYNC_VIEWS else '0') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -100,6 +318,46 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+AUTHENTICATION_BACKENDS = [
+    'todo_list_app.backends.PooledModelBackend',
+]
+
+# Password hashing profile: 'pbkdf2', 'scrypt' or 'argon2' (requires argon2-cffi).
+# The stored hashes of the other profiles are still accepted and upgraded on the next login.
+PASSWORD_HASHER_PROFILE = os.environ.get('TODO_PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHER_PARAMETERS = {
+    'pbkdf2': {
+        'iterations': int(os.environ.get('TODO_PBKDF2_ITERATIONS', 1_000_000)),
+    },
+    'scrypt': {
+        'work_factor': int(os.environ.get('TODO_SCRYPT_WORK_FACTOR', 2 ** 14)),
+        'block_size': int(os.environ.get('TODO_SCRYPT_BLOCK_SIZE', 8)),
+        'parallelism': int(os.environ.get('TODO_SCRYPT_PARALLELISM', 1)),
+    },
+    'argon2': {
+        'time_cost': int(os.environ.get('TODO_ARGON2_TIME_COST', 2)),
+        'memory_cost': int(os.environ.get('TODO_ARGON2_MEMORY_COST', 102400)),
+        'parallelism': int(os.environ.get('TODO_ARGON2_PARALLELISM', 8)),
+    },
+}
+
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'todo_list_app.hashing.PooledPBKDF2PasswordHasher',
+    'scrypt': 'todo_list_app.hashing.PooledScryptPasswordHasher',
+    'argon2': 'todo_list_app.hashing.PooledArgon2PasswordHasher',
+}
+
+# The first hasher hashes the new passwords
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER_PROFILE]] + [
+    hasher for profile, hasher in PASSWORD_HASHER_CLASSES.items() if profile != PASSWORD_HASHER_PROFILE
+] + ['todo_list_app.hashing.PooledPBKDF2SHA1PasswordHasher']
+
+# Threads hashing the passwords and maximum number of hashes queued or running,
+# a login or a registration past that limit is asked to retry
+PASSWORD_HASHING_WORKERS = int(os.environ.get('TODO_PASSWORD_HASHING_WORKERS', min(4, os.cpu_count() or 1)))
+PASSWORD_HASHING_MAX_PENDING = int(os.environ.get('TODO_PASSWORD_HASHING_MAX_PENDING', 64))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/